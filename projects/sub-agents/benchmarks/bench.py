@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""ベンチマーク - ルーティングと文書・スライド生成の性能を計測する
+
+合成したコーパスで以下を計測し、実行時間（中央値）とピークメモリ（tracemalloc）を記録する。
+ベースラインのJSONと比較し、しきい値を超えて遅く・重くなったものがあれば終了コード1で失敗する。
+ネットワークは使わない（python-docx / python-pptx がなければ該当のベンチマークはスキップ）。
+
+    - analyze_task のスループット（短文・長文、判定キャッシュなし）
+    - execute_plan のオーバーヘッド（何もしないワーカー、逐次・並列）
+    - DocumentWriterWorker._create_document（10/100/1000セクション、メモリへの出力、大きな表）
+    - PresentationBuilderWorker._create_presentation（10/100/1000枚）
+    - slide_generator.generate_pptx（10/100/1000枚）
+
+使い方:
+    python3 bench.py                       # 計測してベースラインと比較
+    python3 bench.py --save                # 全ケースを計測してベースラインを上書き保存
+    python3 bench.py --filter document     # 名前に document を含むものだけ
+    python3 bench.py --quick               # 1000件のケースを省略
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional
+
+BASE_DIR = Path(__file__).parent.parent
+BENCH_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+sys.path.insert(0, str(BASE_DIR / "orchestrator"))
+sys.path.insert(0, str(BASE_DIR / "tools"))
+
+from orchestrator import Orchestrator  # noqa: E402
+
+# 短すぎて誤差の大きいケースは、この秒数までの悪化を許容する
+MIN_TIME_SLACK_SEC = 0.005
+
+
+class Benchmark:
+    """1つのベンチマークケース"""
+
+    def __init__(self, name: str, run: Callable[[], Any], setup: Optional[Callable[[], Any]] = None,
+                 size: int = 0, requires: Optional[str] = None):
+        """初期化（setup の戻り値が run の引数になる）"""
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.size = size
+        self.requires = requires
+
+    def available(self) -> bool:
+        """必要なライブラリがあるか"""
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+    def _call(self) -> float:
+        """1回実行して経過時間を返す"""
+        arg = self.setup() if self.setup else None
+        started = time.perf_counter()
+        self.run(arg) if self.setup else self.run()
+        return time.perf_counter() - started
+
+    def measure(self, repeat: int) -> Dict[str, Any]:
+        """repeat 回の実行時間の中央値と、1回分のピークメモリを計測"""
+        self._call()  # ウォームアップ（遅延インポートやキャッシュを済ませる）
+        times = [self._call() for _ in range(repeat)]
+
+        tracemalloc.start()
+        try:
+            self._call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "time_sec": statistics.median(times),
+            "min_time_sec": min(times),
+            "peak_kb": peak / 1024,
+            "size": self.size
+        }
+
+
+def _quiet_orchestrator(**config) -> Orchestrator:
+    """ログを抑えたオーケストレーター"""
+    orchestrator = Orchestrator()
+    orchestrator.verbose = False
+    orchestrator.config.update(config)
+    return orchestrator
+
+
+def _load_worker(name: str, class_name: str):
+    """ワーカーをインスタンス化"""
+    path = BASE_DIR / "workers" / name / "worker.py"
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, class_name)()
+
+
+class _Silence:
+    """ワーカーの print を捨てる"""
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def __exit__(self, *exc):
+        sys.stdout.close()
+        sys.stdout = self._stdout
+
+
+# ---- コーパス ----
+
+SHORT_TASKS = [
+    "プレゼンの構成を提案してください",
+    "報告書の文書を作成してください",
+    "詳細なコードレビューをしてください",
+    "議事録をWordで作成",
+    "テストを実行してください",
+    "コードを書いてレビューして",
+    "報告書とプレゼン資料を作成してください",
+    "電卓プログラムを実装してください",
+]
+
+
+def short_corpus(count: int) -> List[str]:
+    """短いタスク文（判定キャッシュに当たらないよう番号を付ける）"""
+    return [f"{SHORT_TASKS[i % len(SHORT_TASKS)]} #{i}" for i in range(count)]
+
+
+def long_corpus(count: int, length: int = 20000) -> List[str]:
+    """仕様書の貼り付けを模した長いタスク文"""
+    filler = "本システムは既存の業務フローを置き換えるものであり、利用者の操作手順を大きく変えないことを前提とする。"
+    body = (filler * (length // len(filler) + 1))[:length]
+    return [f"{body} #{i} 上記の仕様で報告書の文書を作成してください" for i in range(count)]
+
+
+def document_task(sections: int, output_path: str, table_rows: int = 0) -> Dict[str, Any]:
+    """create_document のタスク"""
+    content_sections = [
+        {"title": f"セクション {i + 1}", "type": "content",
+         "content": "本文の段落です。\n" * 3}
+        for i in range(sections)
+    ]
+    if table_rows:
+        content_sections.append({
+            "title": "データ", "type": "table",
+            "table_data": [["項目", "値", "備考"]] + [[f"項目{i}", str(i), "-"] for i in range(table_rows)]
+        })
+    return {
+        "type": "create_document", "doc_type": "report", "title": "ベンチマーク",
+        "output_path": output_path, "description": "ベンチマーク",
+        "content": {"metadata": {"company": "bench", "author": "bench", "date": "-"},
+                    "sections": content_sections}
+    }
+
+
+def presentation_task(slides: int, output_path: str) -> Dict[str, Any]:
+    """create_presentation のタスク"""
+    return {
+        "type": "create_presentation", "topic": "ベンチマーク", "output_path": output_path,
+        "description": "ベンチマーク",
+        "slides": [{"layout": "title", "title": "ベンチマーク", "subtitle": "bench"}] + [
+            {"layout": "content", "title": f"スライド {i + 1}", "content": "本文です"}
+            for i in range(slides - 1)
+        ]
+    }
+
+
+def slide_json(slides: int, output_dir: str) -> Dict[str, Any]:
+    """slide_generator のJSON"""
+    return {
+        "title": "bench", "output_dir": output_dir, "style": "default",
+        "slides": [{"layout": "title", "title": "ベンチマーク", "subtitle": "bench"}] + [
+            {"layout": "bullet_points", "title": f"スライド {i + 1}", "body": "本文です",
+             "bullets": ["ポイント1", "ポイント2", "ポイント3"]}
+            for i in range(slides - 1)
+        ]
+    }
+
+
+class NoopWorker:
+    """何もしないワーカー（execute_plan のオーバーヘッド計測用）"""
+
+    name = "noop"
+    version = "0"
+
+    def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": "success", "worker": self.name, "output": None}
+
+
+def noop_plan(orchestrator: Orchestrator, steps: int, chain: bool) -> List[Dict[str, Any]]:
+    """何もしないワーカーの実行計画（chain なら1列の依存関係）"""
+    orchestrator.workers["noop"] = {"enabled": True}
+    orchestrator.worker_instances["noop"] = NoopWorker()
+    subtasks = [
+        {"id": i, "type": "noop", "worker": "noop", "description": f"noop {i}", "model": "haiku",
+         "depends_on": [i - 1] if chain and i else []}
+        for i in range(steps)
+    ]
+    return orchestrator.create_execution_plan(subtasks)
+
+
+# ---- ベンチマークの定義 ----
+
+def build_benchmarks(work_dir: str, quick: bool) -> List[Benchmark]:
+    """ベンチマークの一覧を作る"""
+    sizes = [10, 100] if quick else [10, 100, 1000]
+    benchmarks = []
+
+    # analyze_task（判定キャッシュを無効にしてルーティングそのものを測る）
+    router = _quiet_orchestrator(decision_cache={"enabled": False})
+    router.decision_cache = None
+    short = short_corpus(2000)
+    long = long_corpus(50)
+    benchmarks.append(Benchmark(
+        "analyze_task.short_x2000", lambda: [router.analyze_task(t) for t in short], size=len(short)))
+    benchmarks.append(Benchmark(
+        "analyze_task.long20k_x50", lambda: [router.analyze_task(t) for t in long], size=len(long)))
+
+    # execute_plan のオーバーヘッド
+    sequential = _quiet_orchestrator(parallel_execution=False)
+    parallel = _quiet_orchestrator(parallel_execution=True, max_workers=4)
+    plan_seq = noop_plan(sequential, 200, chain=True)
+    plan_par = noop_plan(parallel, 200, chain=False)
+    benchmarks.append(Benchmark(
+        "execute_plan.noop_chain_200", lambda: sequential.execute_plan(plan_seq), size=200))
+    benchmarks.append(Benchmark(
+        "execute_plan.noop_parallel_200", lambda: parallel.execute_plan(plan_par), size=200))
+
+    # 文書・PPTXの生成
+    document_writer = _load_worker("document_writer", "DocumentWriterWorker")
+    presentation_builder = _load_worker("presentation_builder", "PresentationBuilderWorker")
+
+    def run_document(task):
+        with _Silence():
+            result = document_writer._create_document(task)
+        assert result["status"] == "success", result
+
+    def run_presentation(task):
+        with _Silence():
+            result = presentation_builder._create_presentation(task)
+        assert result["status"] == "success", result
+
+    def run_slide_generator(json_path):
+        import slide_generator
+        with _Silence():
+            output_path = slide_generator.generate_pptx(json_path)
+        os.remove(output_path)
+
+    for n in sizes:
+        doc_path = os.path.join(work_dir, f"doc_{n}.docx")
+        benchmarks.append(Benchmark(
+            f"document.sections_{n}", run_document,
+            setup=lambda n=n, p=doc_path: document_task(n, p), size=n, requires="docx"))
+    benchmarks.append(Benchmark(
+        "document.sections_100_bytes", run_document,
+        setup=lambda: {**document_task(100, ""), "output_mode": "bytes"}, size=100, requires="docx"))
+    rebuilds = itertools.count()
+
+    def rebuild_task():
+        # 同じ報告書を1セクションだけ変えて作り直す（他のセクションは断片キャッシュから差し込む）
+        task = {**document_task(100, os.path.join(work_dir, "rebuild.docx"), 1000), "fragment_cache": True}
+        task["content"]["sections"][0]["content"] = f"更新 {next(rebuilds)}"
+        return task
+
+    benchmarks.append(Benchmark(
+        "document.rebuild_100_1changed", run_document, setup=rebuild_task, size=100, requires="docx"))
+    merge_rows = 10 if quick else 50
+
+    def run_render_many(rows):
+        # プロセス数は環境で変わるため、1プロセスで差し込みと作成の合計を測る
+        template = {**document_task(10, os.path.join(work_dir, "merge_{{id}}.docx")), "title": "{{title}}"}
+        with _Silence():
+            result = document_writer.render_many(template, rows, processes=1)
+        assert result["status"] == "success", result
+
+    benchmarks.append(Benchmark(
+        f"document.render_many_{merge_rows}", run_render_many,
+        setup=lambda: [{"id": i, "title": f"文書{i}"} for i in range(merge_rows)], size=merge_rows, requires="docx"))
+    # 2000行は表の組み立てを一括にする前からのケース（5000行は従来の方法では数十秒かかるため後から追加）
+    for table_rows in ([500] if quick else [2000, 5000]):
+        benchmarks.append(Benchmark(
+            f"document.table_rows_{table_rows}", run_document,
+            setup=lambda n=table_rows: document_task(1, os.path.join(work_dir, "table.docx"), n),
+            size=table_rows, requires="docx"))
+
+    for n in sizes:
+        pptx_path = os.path.join(work_dir, f"slides_{n}.pptx")
+        benchmarks.append(Benchmark(
+            f"presentation.slides_{n}", run_presentation,
+            setup=lambda n=n, p=pptx_path: presentation_task(n, p), size=n, requires="pptx"))
+
+    for n in sizes:
+        json_path = os.path.join(work_dir, f"slides_{n}.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(slide_json(n, os.path.join(work_dir, "generated")), f, ensure_ascii=False)
+        benchmarks.append(Benchmark(
+            f"slide_generator.slides_{n}", run_slide_generator,
+            setup=lambda p=json_path: p, size=n, requires="pptx"))
+
+    return benchmarks
+
+
+# ---- 比較 ----
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            time_threshold: float, memory_threshold: float) -> List[str]:
+    """ベースラインより悪化したものを返す"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        time_limit = max(base["time_sec"] * (1 + time_threshold), base["time_sec"] + MIN_TIME_SLACK_SEC)
+        if current["time_sec"] > time_limit:
+            regressions.append(f"{name}: 時間 {base['time_sec'] * 1000:.1f} ms → {current['time_sec'] * 1000:.1f} ms"
+                               f"（上限 {time_limit * 1000:.1f} ms）")
+        memory_limit = base["peak_kb"] * (1 + memory_threshold) + 64
+        if current["peak_kb"] > memory_limit:
+            regressions.append(f"{name}: ピークメモリ {base['peak_kb']:.0f} KB → {current['peak_kb']:.0f} KB"
+                               f"（上限 {memory_limit:.0f} KB）")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="sub-agents のベンチマーク")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="ベースラインのJSON")
+    parser.add_argument("--save", action="store_true",
+                        help="全ケースを計測し、ベースラインを上書き保存（--filter / --quick とは併用できない）")
+    parser.add_argument("--filter", default=None, help="名前にこの文字列を含むものだけ実行")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（中央値を採用）")
+    parser.add_argument("--quick", action="store_true", help="1000件のケースを省略")
+    parser.add_argument("--time-threshold", type=float, default=0.5,
+                        help="許容する実行時間の悪化率（0.5 = +50%%）")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="許容するピークメモリの悪化率（0.25 = +25%%）")
+    parser.add_argument("--output", default=None, help="計測結果を書き出すJSON")
+    args = parser.parse_args()
+    if args.save and (args.filter or args.quick):
+        # ベースラインは1回の実行の結果だけで作る（以前の実行の結果と混ぜない）
+        parser.error("--save は --filter / --quick と併用できません（全ケースを1回で計測して保存します）")
+
+    work_dir = tempfile.mkdtemp(prefix="sub-agents-bench-")
+    try:
+        benchmarks = build_benchmarks(work_dir, args.quick)
+        results = {}
+        for benchmark in benchmarks:
+            if args.filter and args.filter not in benchmark.name:
+                continue
+            if not benchmark.available():
+                print(f"  - {benchmark.name}: スキップ（{benchmark.requires} がありません）")
+                continue
+            results[benchmark.name] = benchmark.measure(args.repeat)
+            r = results[benchmark.name]
+            print(f"  {benchmark.name:<36} {r['time_sec'] * 1000:>10.1f} ms  {r['peak_kb']:>10.0f} KB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"[+] ベースラインを保存しました: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"[*] ベースラインがありません（--save で作成）: {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    if regressions:
+        print("[!] 性能が悪化しました:", file=sys.stderr)
+        for line in regressions:
+            print(f"    {line}", file=sys.stderr)
+        return 1
+
+    print(f"[+] OK（{len(results)} 件、時間 +{args.time_threshold:.0%} / メモリ +{args.memory_threshold:.0%} 以内）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""表の組み立てが線形にスケールすることを確認するベンチマーク
+
+DocumentWriterWorker._add_table で 1,000〜100,000 セルの表を組み立て、1セルあたりの時間を比べる。
+最大サイズの1セルあたりの時間が 10,000 セルのときの --max-ratio 倍を超えたら（二次的に遅くなっていたら）
+終了コード1で失敗する。python-docx がなければスキップする。
+
+使い方:
+    python3 table_scaling.py
+    python3 table_scaling.py --legacy        # セルごとに書き込む従来の方法（10,000セルまで）とも比べる
+    python3 table_scaling.py --cells 1000 10000 100000 --max-ratio 1.5
+"""
+
+import argparse
+import importlib.util
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+COLUMNS = 10
+
+
+def _load_worker_module():
+    """document_writer のワーカーモジュールをロード"""
+    path = BASE_DIR / "workers" / "document_writer" / "worker.py"
+    spec = importlib.util.spec_from_file_location("bench_document_writer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def table_rows(cells: int):
+    """見出し + データ行（cells セル分）"""
+    yield [f"列{j + 1}" for j in range(COLUMNS)]
+    for i in range(cells // COLUMNS - 1):
+        yield [f"{i}-{j}" for j in range(COLUMNS)]
+
+
+def legacy_add_table(document_class, table_data):
+    """従来の方法（行数分の表を作り、セルごとに text を設定する）"""
+    doc = document_class()
+    table = doc.add_table(rows=len(table_data), cols=len(table_data[0]))
+    table.style = 'Light Grid Accent 1'
+    for i, row_data in enumerate(table_data):
+        row = table.rows[i]
+        for j, cell_data in enumerate(row_data):
+            row.cells[j].text = str(cell_data)
+            if i == 0:
+                row.cells[j].paragraphs[0].runs[0].font.bold = True
+
+
+def measure(fn, repeat: int) -> float:
+    """repeat 回の実行時間の中央値"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="表の組み立ての線形スケーリングの確認")
+    parser.add_argument("--cells", type=int, nargs="*", default=[1000, 10000, 25000, 50000, 100000],
+                        help="計測するセル数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（中央値を採用）")
+    parser.add_argument("--max-ratio", type=float, default=1.5,
+                        help="最大サイズの1セルあたりの時間が 10,000 セルのときの何倍まで許容するか")
+    parser.add_argument("--legacy", action="store_true", help="従来の方法とも比べる（10,000セルまで）")
+    args = parser.parse_args()
+
+    module = _load_worker_module()
+    if not module._import_docx():
+        print("[*] python-docx がないためスキップします")
+        return 0
+    worker = module.DocumentWriterWorker()
+    Document = module.Document
+
+    per_cell = {}
+    print(f"  {'セル数':>8}  {'時間':>10}  {'1セルあたり':>12}" + (f"  {'従来':>10}" if args.legacy else ""))
+    for cells in sorted(args.cells):
+        elapsed = measure(lambda: worker._add_table(Document(), table_rows(cells)), args.repeat)
+        per_cell[cells] = elapsed / cells
+        line = f"  {cells:>8}  {elapsed * 1000:>8.1f}ms  {per_cell[cells] * 1e6:>10.2f}us"
+        if args.legacy and cells <= 10000:
+            data = list(table_rows(cells))
+            legacy = measure(lambda: legacy_add_table(Document, data), 1)
+            line += f"  {legacy * 1000:>8.1f}ms（{legacy / elapsed:.0f}倍）"
+        print(line)
+
+    reference = 10000 if 10000 in per_cell else min(per_cell)
+    largest = max(per_cell)
+    ratio = per_cell[largest] / per_cell[reference]
+    if ratio > args.max_ratio:
+        print(f"[!] 線形にスケールしていません: {largest} セルの1セルあたりの時間が {reference} セルの {ratio:.2f} 倍"
+              f"（上限 {args.max_ratio} 倍）", file=sys.stderr)
+        return 1
+    print(f"[+] OK: {largest} セルの1セルあたりの時間は {reference} セルの {ratio:.2f} 倍（上限 {args.max_ratio} 倍）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Aggregator - ステップ結果の逐次集計
+
+ステップの結果を完了した順に受け取り、成功数とサマリーをその都度更新する。
+全ステップの完了を待たずに途中経過を取り出せる。
+"""
+
+import threading
+from typing import Dict, List, Any, Optional
+
+from results import PlanResult
+
+SUMMARY_HEADER = "\n=== 実行結果サマリー ==="
+
+
+class ResultAggregator:
+    """ステップ結果を逐次集計する"""
+
+    def __init__(self, total_steps: Optional[int] = None):
+        """初期化（total_steps は進捗表示用。不明なら None）"""
+        self.total_steps = total_steps
+        self.successful_steps = 0
+        self._results = {}  # ステップ番号 -> 結果
+        self._lines = {}    # ステップ番号 -> サマリーの行
+        self._lock = threading.Lock()
+
+    def add(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """ステップの結果を1つ追加し、その時点の進捗を返す"""
+        status_icon = "[+]" if result["status"] == "success" else "[!]"
+        line = f"{status_icon} ステップ {result['step']}: {result['output']}"
+        with self._lock:
+            previous = self._results.get(result["step"])
+            if previous is not None and previous["status"] == "success":
+                self.successful_steps -= 1
+            self._results[result["step"]] = result
+            self._lines[result["step"]] = line
+            if result["status"] == "success":
+                self.successful_steps += 1
+            return self._progress()
+
+    def _progress(self) -> Dict[str, Any]:
+        """進捗（ロック取得済み）"""
+        return {
+            "completed_steps": len(self._results),
+            "successful_steps": self.successful_steps,
+            "total_steps": self.total_steps if self.total_steps is not None else len(self._results)
+        }
+
+    def progress(self) -> Dict[str, Any]:
+        """完了・成功したステップ数"""
+        with self._lock:
+            return self._progress()
+
+    def results(self) -> List[Dict[str, Any]]:
+        """これまでの結果（ステップ順）"""
+        with self._lock:
+            return [self._results[step] for step in sorted(self._results)]
+
+    def summary(self) -> str:
+        """これまでの結果のサマリー（ステップ順）"""
+        with self._lock:
+            return "\n".join([SUMMARY_HEADER] + [self._lines[step] for step in sorted(self._lines)])
+
+    def integrated(self) -> PlanResult:
+        """統合結果（integrate_results と同じ形）"""
+        return PlanResult(self.results(), self.summary())
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Broker - ステップを複数ホストのワーカーエージェントに分配するバックエンド
+
+ワーカーエージェントは自分がホストするワーカーと同時実行数をブローカーに登録し、
+割り当てられたタスクを取り出して実行し、結果を返す。ブローカーは負荷（実行中の数 / 同時実行数）が
+最も低いエージェントにタスクを割り当てる。
+
+- LocalBroker: 同じプロセス内のブローカー（エージェントはスレッド）
+- ManagerBroker: multiprocessing.managers で TCP 越しに共有するブローカー（参照実装は 127.0.0.1）
+
+認証キーは設定の authkey か環境変数 SUB_AGENTS_BROKER_AUTHKEY で渡す（組み込みの既定値はない）。
+
+使い方:
+    export SUB_AGENTS_BROKER_AUTHKEY=...
+    python3 broker.py serve --address 127.0.0.1:50000
+    python3 broker.py agent --address 127.0.0.1:50000 --workers document_writer presentation_builder --capacity 2
+    python3 broker.py stats --address 127.0.0.1:50000
+"""
+
+import argparse
+import importlib.util
+import ipaddress
+import itertools
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from registry import PluginRegistry
+
+# 設定で authkey を指定しない場合に認証キーを読む環境変数
+AUTHKEY_ENV = "SUB_AGENTS_BROKER_AUTHKEY"
+
+DEFAULT_BROKER = {
+    "type": "local",               # local / manager
+    "address": "127.0.0.1:50000",  # manager の場合の接続先
+    "authkey": None,               # None なら環境変数 SUB_AGENTS_BROKER_AUTHKEY
+    "local_agents": [{"workers": None, "capacity": 2}],  # local の場合のエージェント（None なら全ワーカー）
+    "agent_ttl_sec": 30,
+    "result_timeout_sec": None
+}
+
+
+class BrokerState:
+    """エージェントの登録・タスクの割り当て・結果の受け渡し（ブローカーの本体）"""
+
+    def __init__(self, agent_ttl_sec: float = 30.0):
+        """初期化（agent_ttl_sec 秒問い合わせ・ハートビートのないエージェントは離脱扱い）"""
+        self.agent_ttl_sec = agent_ttl_sec
+        self._agents = {}    # エージェントID -> 登録情報と負荷
+        self._queues = {}    # エージェントID -> 割り当て済みのタスク
+        self._assigned = {}  # リクエストID -> エージェントID（結果待ち）
+        self._results = {}   # リクエストID -> 結果
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self.dispatched = 0
+        self.completed = 0
+        self.lost = 0
+
+    def register_agent(self, agent_id: str, workers: List[str], capacity: int = 1,
+                       host: Optional[str] = None) -> None:
+        """エージェントを登録（ホストするワーカーと同時実行数）"""
+        with self._cond:
+            self._agents[agent_id] = {
+                "workers": list(workers),
+                "capacity": max(1, int(capacity)),
+                "host": host,
+                "inflight": 0,
+                "completed": 0,
+                "last_seen": time.monotonic()
+            }
+            self._queues.setdefault(agent_id, deque())
+            self._cond.notify_all()
+
+    def unregister_agent(self, agent_id: str) -> None:
+        """エージェントの登録を解除（割り当て済みのタスクはエラーで返す）"""
+        with self._cond:
+            self._drop_agent(agent_id, "エージェントが登録を解除しました")
+
+    def heartbeat(self, agent_id: str) -> bool:
+        """エージェントの生存を知らせる（登録が外れていれば False）"""
+        with self._cond:
+            info = self._agents.get(agent_id)
+            if info is None:
+                return False
+            info["last_seen"] = time.monotonic()
+            return True
+
+    def dispatch(self, worker_name: str, task: Dict[str, Any]) -> Optional[int]:
+        """負荷の最も低いエージェントにタスクを割り当て、リクエストIDを返す（ホストするエージェントがなければ None）"""
+        with self._cond:
+            self._expire_agents()
+            candidates = [
+                (info["inflight"] / info["capacity"], info["inflight"], agent_id)
+                for agent_id, info in self._agents.items()
+                if worker_name in info["workers"]
+            ]
+            if not candidates:
+                return None
+            _, _, agent_id = min(candidates)
+
+            request_id = next(self._ids)
+            self._agents[agent_id]["inflight"] += 1
+            self._queues[agent_id].append((request_id, worker_name, task))
+            self._assigned[request_id] = agent_id
+            self.dispatched += 1
+            self._cond.notify_all()
+            return request_id
+
+    def next_task(self, agent_id: str, timeout: float = 1.0) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+        """エージェントが割り当て済みのタスクを取り出す（timeout 秒待ってなければ None）"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                info = self._agents.get(agent_id)
+                if info is None:
+                    return None
+                info["last_seen"] = time.monotonic()
+                if self._queues[agent_id]:
+                    return self._queues[agent_id].popleft()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def put_result(self, agent_id: str, request_id: int, result: Dict[str, Any]) -> None:
+        """エージェントが実行結果を返す"""
+        with self._cond:
+            info = self._agents.get(agent_id)
+            if info is not None:
+                info["inflight"] = max(0, info["inflight"] - 1)
+                info["completed"] += 1
+                info["last_seen"] = time.monotonic()
+            if self._assigned.pop(request_id, None) is not None:
+                self._results[request_id] = result
+                self.completed += 1
+            self._cond.notify_all()
+
+    def wait_result(self, request_id: int, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """結果を待つ（timeout 秒以内に返らなければ破棄して None）"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while request_id not in self._results:
+                self._expire_agents()
+                if request_id not in self._assigned and request_id not in self._results:
+                    return None
+                remaining = deadline - time.monotonic() if deadline is not None else 1.0
+                if remaining <= 0:
+                    # 遅れて届いた結果は put_result で捨てる
+                    self._assigned.pop(request_id, None)
+                    return None
+                self._cond.wait(min(remaining, 1.0))
+            return self._results.pop(request_id)
+
+    def hosts(self, worker_name: str) -> bool:
+        """そのワーカーをホストするエージェントがいるか"""
+        with self._cond:
+            return any(worker_name in info["workers"] for info in self._agents.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """エージェントごとの負荷と全体の件数"""
+        with self._cond:
+            self._expire_agents()
+            return {
+                "dispatched": self.dispatched,
+                "completed": self.completed,
+                "lost": self.lost,
+                "agents": {
+                    agent_id: {
+                        "host": info["host"],
+                        "workers": info["workers"],
+                        "capacity": info["capacity"],
+                        "inflight": info["inflight"],
+                        "completed": info["completed"]
+                    }
+                    for agent_id, info in self._agents.items()
+                }
+            }
+
+    def _expire_agents(self):
+        """しばらく問い合わせ・ハートビートのないエージェントを離脱扱いにする（ロック取得済み）"""
+        now = time.monotonic()
+        for agent_id, info in list(self._agents.items()):
+            if now - info["last_seen"] > self.agent_ttl_sec:
+                self._drop_agent(agent_id, "エージェントからの応答がなくなりました")
+
+    def _drop_agent(self, agent_id: str, reason: str):
+        """エージェントを外し、結果待ちのタスクをエラーで返す（ロック取得済み）"""
+        self._agents.pop(agent_id, None)
+        self._queues.pop(agent_id, None)
+        for request_id, assigned in list(self._assigned.items()):
+            if assigned == agent_id:
+                del self._assigned[request_id]
+                self._results[request_id] = {"status": "error", "error": reason, "agent": agent_id}
+                self.lost += 1
+        self._cond.notify_all()
+
+
+class Broker:
+    """ステップの分配先（LocalBroker / ManagerBroker の共通部分）"""
+
+    def __init__(self, state, result_timeout_sec: Optional[float] = None):
+        """初期化（state は BrokerState かそのプロキシ）"""
+        self.state = state
+        self.result_timeout_sec = result_timeout_sec
+
+    def submit(self, worker_name: str, task: Dict[str, Any],
+               timeout: Optional[float] = None) -> Dict[str, Any]:
+        """タスクをエージェントに割り当て、結果を待って返す（制限時間を超えたら TimeoutError）"""
+        request_id = self.state.dispatch(worker_name, task)
+        if request_id is None:
+            raise LookupError(f"ワーカー '{worker_name}' をホストするエージェントがありません")
+        if timeout is None:
+            timeout = self.result_timeout_sec
+        result = self.state.wait_result(request_id, timeout)
+        if result is None:
+            raise TimeoutError()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """ブローカーの統計"""
+        return self.state.stats()
+
+    def close(self):
+        """終了"""
+
+
+class LocalBroker(Broker):
+    """同じプロセス内のブローカー（エージェントはスレッドで実行）"""
+
+    def __init__(self, base_path: Path, agents: Optional[List[Dict[str, Any]]] = None,
+                 agent_ttl_sec: float = 30.0, result_timeout_sec: Optional[float] = None):
+        """初期化（agents の各要素は {"workers": [...] or None, "capacity": N}）"""
+        super().__init__(BrokerState(agent_ttl_sec), result_timeout_sec)
+        registry = PluginRegistry(base_path)
+        self.agents = []
+        for index, agent_config in enumerate(agents or DEFAULT_BROKER["local_agents"]):
+            workers = agent_config.get("workers") or list(registry.workers)
+            agent = WorkerAgent(self.state, f"local-{index}", workers,
+                                capacity=agent_config.get("capacity", 2), registry=registry)
+            agent.start()
+            self.agents.append(agent)
+
+    def close(self):
+        """エージェントを停止"""
+        for agent in self.agents:
+            agent.stop()
+        self.agents = []
+
+
+class ManagerBroker(Broker):
+    """multiprocessing.managers の TCP サーバー上の BrokerState に接続するブローカー"""
+
+    def __init__(self, address: str = DEFAULT_BROKER["address"], authkey: Optional[str] = DEFAULT_BROKER["authkey"],
+                 result_timeout_sec: Optional[float] = None):
+        """初期化（address は "ホスト:ポート"。authkey が None なら環境変数から読み、なければ ValueError）"""
+        authkey = resolve_authkey(authkey)
+        if authkey is None:
+            raise ValueError(f"ブローカーの認証キーがありません（設定の broker.authkey か環境変数 {AUTHKEY_ENV} で指定してください）")
+        # multiprocessing.managers は重いため、接続するときにインポートする
+        from multiprocessing.managers import BaseManager
+
+        class _BrokerClientManager(BaseManager):
+            pass
+
+        _BrokerClientManager.register("broker")
+        manager = _BrokerClientManager(address=parse_address(address), authkey=authkey.encode())
+        manager.connect()
+        super().__init__(manager.broker(), result_timeout_sec)
+        self.address = address
+
+
+class BrokerWorker:
+    """ブローカー経由で実行するワーカー（オーケストレーターの worker_instances に入る）"""
+
+    def __init__(self, broker: Broker, worker_name: str):
+        """初期化"""
+        self.broker = broker
+        self.name = worker_name
+
+    def execute(self, task: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """エージェントでタスクを実行"""
+        return self.broker.submit(self.name, task, timeout)
+
+
+class WorkerAgent:
+    """ワーカーをホストし、ブローカーから割り当てられたタスクを実行するエージェント"""
+
+    def __init__(self, state, agent_id: str, workers: List[str], capacity: int = 1,
+                 registry: Optional[PluginRegistry] = None, poll_interval: float = 1.0,
+                 heartbeat_interval: float = 1.0):
+        """初期化（state は BrokerState かそのプロキシ。heartbeat_interval はブローカーの agent_ttl_sec より短くする）"""
+        self.state = state
+        self.agent_id = agent_id
+        self.capacity = max(1, int(capacity))
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.reregistrations = 0
+        self.registry = registry or PluginRegistry(Path(__file__).parent.parent)
+        # 登録前にワーカーをロードしておく（ロードできないワーカーはホストしない）
+        self.instances = {}
+        for worker_name in workers:
+            instance = self._load(worker_name)
+            if instance is not None:
+                self.instances[worker_name] = instance
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _load(self, worker_name: str):
+        """ワーカーをロード・インスタンス化（失敗したら None）"""
+        manifest = self.registry.get_worker(worker_name)
+        if manifest is None or not Path(manifest["path"]).exists():
+            print(f"[agent] ワーカーが見つかりません: {worker_name}", flush=True)
+            return None
+        try:
+            spec = importlib.util.spec_from_file_location(f"{worker_name}_worker", manifest["path"])
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return getattr(module, manifest["class_name"])()
+        except Exception as e:
+            print(f"[agent] ワーカーのロードに失敗: {worker_name}: {e}", flush=True)
+            return None
+
+    def _register(self):
+        """ブローカーに登録"""
+        self.state.register_agent(self.agent_id, list(self.instances), self.capacity, socket.gethostname())
+
+    def start(self):
+        """ブローカーに登録し、同時実行数だけ実行スレッドとハートビートのスレッドを起動"""
+        self._stop.clear()
+        self._register()
+        for index in range(self.capacity):
+            thread = threading.Thread(target=self._loop, name=f"{self.agent_id}:{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        # 全スレッドがタスクを実行中で問い合わせがなくても、離脱扱いにならないよう生存を知らせ続ける
+        thread = threading.Thread(target=self._heartbeat_loop, name=f"{self.agent_id}:heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        """実行中のタスクの完了を待って登録を解除"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.state.unregister_agent(self.agent_id)
+
+    def run_forever(self):
+        """Ctrl+C まで実行"""
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+    def _heartbeat_loop(self):
+        """一定間隔でハートビートを送り、離脱扱いにされていたら登録し直す"""
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                if self.state.heartbeat(self.agent_id):
+                    continue
+                print(f"[agent] {self.agent_id}: ブローカーから外されていたため登録し直します", flush=True)
+                self._register()
+                self.reregistrations += 1
+            except (OSError, EOFError) as e:
+                print(f"[agent] {self.agent_id}: ハートビートを送れません: {e}", flush=True)
+
+    def _loop(self):
+        """タスクを取り出して実行し、結果を返すループ"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            item = self.state.next_task(self.agent_id, self.poll_interval)
+            if item is None:
+                # 登録が外れていると待たずに None が返るため、問い合わせの間隔を空ける
+                self._stop.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
+                continue
+            request_id, worker_name, task = item
+            try:
+                result = self.instances[worker_name].execute(task)
+            except Exception as e:
+                result = {"status": "error", "worker": worker_name, "error": str(e)}
+            self.state.put_result(self.agent_id, request_id, result)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """"ホスト:ポート" を (ホスト, ポート) に変換"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def resolve_authkey(authkey: Optional[str]) -> Optional[str]:
+    """認証キー（指定がなければ環境変数 SUB_AGENTS_BROKER_AUTHKEY、どちらもなければ None）"""
+    return authkey or os.environ.get(AUTHKEY_ENV) or None
+
+
+def is_loopback(host: str) -> bool:
+    """ループバックアドレスか（localhost を含む）"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(address: str = DEFAULT_BROKER["address"], authkey: Optional[str] = DEFAULT_BROKER["authkey"],
+          agent_ttl_sec: float = 30.0):
+    """BrokerState を TCP で共有するサーバーを実行（ブロックする）
+
+    認証キーがなければ、ループバックでは使い捨てのキーを作って表示し、それ以外のアドレスでは ValueError で起動しない。
+    """
+    from multiprocessing.managers import BaseManager
+
+    host, _ = parse_address(address)
+    authkey = resolve_authkey(authkey)
+    if authkey is None:
+        if not is_loopback(host):
+            raise ValueError(f"ループバック以外のアドレス（{host}）で待ち受けるには認証キーが必要です"
+                             f"（--authkey か環境変数 {AUTHKEY_ENV} で指定してください）")
+        authkey = secrets.token_urlsafe(16)
+        print(f"[broker] 認証キーの指定がないため使い捨てのキーを作りました: {AUTHKEY_ENV}={authkey}", flush=True)
+
+    state = BrokerState(agent_ttl_sec)
+
+    class _BrokerServerManager(BaseManager):
+        pass
+
+    _BrokerServerManager.register("broker", callable=lambda: state)
+    manager = _BrokerServerManager(address=parse_address(address), authkey=authkey.encode())
+    server = manager.get_server()
+    print(f"[broker] {address} で待ち受けています", flush=True)
+    server.serve_forever()
+
+
+def main() -> int:
+    """コマンドライン: ブローカーの起動・エージェントの起動・統計の表示"""
+    parser = argparse.ArgumentParser(description="ステップを分配するブローカー")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--address", default=DEFAULT_BROKER["address"], help="ブローカーのアドレス（ホスト:ポート）")
+    common.add_argument("--authkey", default=DEFAULT_BROKER["authkey"],
+                        help=f"認証キー（省略時は環境変数 {AUTHKEY_ENV}）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", parents=[common], help="ブローカーを起動")
+    serve_parser.add_argument("--agent-ttl", type=float, default=30.0, help="エージェントを離脱扱いにするまでの秒数")
+
+    agent_parser = commands.add_parser("agent", parents=[common], help="ワーカーエージェントを起動")
+    agent_parser.add_argument("--workers", nargs="*", default=None, help="ホストするワーカー（省略時は全て）")
+    agent_parser.add_argument("--capacity", type=int, default=2, help="同時実行数")
+    agent_parser.add_argument("--id", default=None, help="エージェントID")
+
+    commands.add_parser("stats", parents=[common], help="ブローカーの統計を表示")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "serve":
+            serve(args.address, args.authkey, args.agent_ttl)
+            return 0
+        broker = ManagerBroker(args.address, args.authkey)
+    except ValueError as e:
+        print(f"[!] {e}", file=sys.stderr)
+        return 2
+
+    if args.command == "stats":
+        print(json.dumps(broker.stats(), ensure_ascii=False, indent=2))
+        return 0
+
+    registry = PluginRegistry(Path(__file__).parent.parent)
+    agent_id = args.id or f"{socket.gethostname()}:{os.getpid()}"
+    agent = WorkerAgent(broker.state, agent_id, args.workers or list(registry.workers),
+                        capacity=args.capacity, registry=registry)
+    print(f"[agent] {agent_id}: {sorted(agent.instances)} x {agent.capacity} でブローカー {args.address} に接続しました",
+          flush=True)
+    agent.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Cache - ルーティング・実行計画の判定結果キャッシュ
+
+サイズ上限付きのLRUキャッシュ。TTLで期限切れになり、
+設定のフィンガープリントが変わると自動的に全エントリを破棄する。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional
+
+
+class LRUCache:
+    """ヒット率統計付きのLRUキャッシュ"""
+
+    def __init__(self, max_size: int = 1024, ttl_sec: Optional[float] = None):
+        """初期化"""
+        self.max_size = max(1, int(max_size))
+        self.ttl_sec = ttl_sec
+        self._entries = OrderedDict()  # キー -> (格納時刻, 値)
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def validate(self, fingerprint: Hashable):
+        """フィンガープリントが変わっていればキャッシュを破棄"""
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._fingerprint = fingerprint
+
+    def get(self, key: Hashable) -> Any:
+        """値を取得（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if self.ttl_sec is not None and time.monotonic() - stored_at > self.ttl_sec:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """値を格納（上限を超えたら最も古いものを追い出す）"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """全エントリを破棄"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
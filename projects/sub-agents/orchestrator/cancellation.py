@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Cancellation - ステップの協調的キャンセル
+
+オーケストレーターがワーカーに渡すキャンセルトークン。ワーカーはセクションや
+スライドの合間に `cancelled` を確認し、立っていれば処理を打ち切る。
+"""
+
+import threading
+from typing import Optional
+
+
+class CancellationToken:
+    """キャンセル要求を伝えるトークン"""
+
+    def __init__(self):
+        """初期化"""
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: str = "cancelled"):
+        """キャンセルを要求"""
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """キャンセルが要求されているか"""
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """キャンセルされるまで待つ（キャンセルされたら True）"""
+        return self._event.wait(timeout)
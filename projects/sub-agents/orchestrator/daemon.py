@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Daemon - 永続ジョブキューを消費する常駐プロセス
+
+N 個の実行スレッドがジョブキューからリース付きでジョブを取得し、オーケストレーターで処理する。
+ステップの結果は完了するたびに保存するため、プロセスが途中で落ちても再起動後は
+未完了のステップだけを実行する。
+
+使い方:
+    python3 daemon.py submit "報告書を作成してください" ...
+    python3 daemon.py run [--executors 4] [--lease 60]
+    python3 daemon.py stats
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import JobQueue
+from results import to_dict
+
+
+class Daemon:
+    """ジョブキューを消費する実行スレッド群"""
+
+    def __init__(self, orchestrator, queue: JobQueue, executors: int = 2,
+                 lease_sec: float = 60.0, poll_interval: float = 0.5):
+        """初期化"""
+        self.orchestrator = orchestrator
+        self.queue = queue
+        self.executors = max(1, int(executors))
+        self.lease_sec = lease_sec
+        self.poll_interval = poll_interval
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._active = {}  # ジョブID -> 実行者名（リース延長の対象）
+        self._lock = threading.Lock()
+        self._threads = []
+        self.processed = 0
+        self.failed = 0
+
+    def _log(self, message: str):
+        """ログを表示"""
+        print(f"[daemon] {message}", flush=True)
+
+    def start(self):
+        """実行スレッドとリース延長スレッドを起動"""
+        self._stop.clear()
+        for index in range(self.executors):
+            owner = f"{self.owner_prefix}:{index}"
+            thread = threading.Thread(target=self._executor_loop, args=(owner,), name=owner, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        self._log(f"{self.executors} 個の実行スレッドで起動しました（リース {self.lease_sec:.0f} 秒）")
+
+    def stop(self, wait: bool = True):
+        """新しいジョブの取得を止め、実行中のジョブの完了を待つ"""
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def run_forever(self):
+        """SIGINT / SIGTERM を受けるまで実行"""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stop.set())
+        self.start()
+        try:
+            while not self._stop.wait(10):
+                stats = self.queue.stats()
+                self._log(f"待機 {stats['depth']} / 実行中 {stats['running']} / 完了 {stats['done']}"
+                          f" / 失敗 {stats['failed']} / 平均レイテンシ {stats['avg_latency_sec']:.2f} 秒")
+        except KeyboardInterrupt:
+            pass
+        self._log("停止中（実行中のジョブの完了を待ちます）...")
+        self.stop()
+
+    def run_until_empty(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """キューが空になるまで処理して停止（バッチ処理・検証用）"""
+        started = time.monotonic()
+        self.start()
+        while not self._stop.is_set():
+            stats = self.queue.stats()
+            if stats["depth"] == 0 and stats["running"] == 0:
+                break
+            if timeout is not None and time.monotonic() - started > timeout:
+                break
+            time.sleep(self.poll_interval)
+        self.stop()
+        return self.queue.stats()
+
+    def _executor_loop(self, owner: str):
+        """ジョブを取得して処理するループ"""
+        while not self._stop.is_set():
+            job = self.queue.claim(owner, self.lease_sec)
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            with self._lock:
+                self._active[job["id"]] = owner
+            try:
+                self._process_job(job, owner)
+            finally:
+                with self._lock:
+                    self._active.pop(job["id"], None)
+        self.queue.close()
+
+    def _heartbeat_loop(self):
+        """実行中のジョブのリースを定期的に延長"""
+        while not self._stop.wait(self.lease_sec / 3):
+            with self._lock:
+                active = list(self._active.items())
+            for job_id, owner in active:
+                if not self.queue.renew(job_id, owner, self.lease_sec):
+                    self._log(f"ジョブ {job_id} のリースを失いました（別の実行者が処理します）")
+        self.queue.close()
+
+    def _process_job(self, job: Dict[str, Any], owner: str):
+        """1ジョブを処理（完了済みのステップは再実行しない）"""
+        job_id = job["id"]
+        orchestrator = self.orchestrator
+        try:
+            plan = job["plan"]
+            if plan is None:
+                plan = orchestrator.create_execution_plan(orchestrator.analyze_task(job["task"]))
+                self.queue.save_plan(job_id, plan)
+
+            # 成功したステップだけを完了扱いにし、失敗・タイムアウトしたものは再実行する
+            completed = {
+                step: result for step, result in self.queue.load_steps(job_id).items()
+                if result["status"] == "success"
+            }
+            if completed:
+                self._log(f"ジョブ {job_id} を再開します（完了済みステップ {sorted(completed)}）")
+
+            # タスク本体はジョブの計画に保存済みなので、結果には task_id だけを書く
+            def checkpoint(result: Dict[str, Any]):
+                if result["status"] == "success":
+                    self.queue.save_step(job_id, to_dict(result, include_task=False))
+
+            results = orchestrator.execute_plan(plan, completed=completed, on_step=checkpoint)
+            integrated = orchestrator.integrate_results(results)
+        except Exception as e:
+            status = self.queue.fail(job_id, owner, str(e))
+            self.failed += 1
+            self._log(f"ジョブ {job_id} でエラー（{job['attempts']} 回目、{status}）: {e}")
+            return
+
+        if self.queue.complete(job_id, owner, to_dict(integrated, include_task=False)):
+            self.processed += 1
+            self._log(f"ジョブ {job_id} 完了: {integrated['successful_steps']}/{integrated['total_steps']} ステップ成功")
+        else:
+            self._log(f"ジョブ {job_id} は別の実行者に引き継がれていたため結果を破棄しました")
+
+
+def main() -> int:
+    """コマンドライン: ジョブの投入・デーモンの実行・統計の表示"""
+    parser = argparse.ArgumentParser(description="オーケストレーターのジョブキューデーモン")
+    parser.add_argument("--db", default="jobs.db", help="ジョブキューのSQLiteファイル")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="タスクを投入")
+    submit.add_argument("tasks", nargs="*", help="タスク（省略時は標準入力から1行1タスク）")
+    submit.add_argument("--max-attempts", type=int, default=3, help="最大試行回数")
+
+    run = commands.add_parser("run", help="デーモンを起動")
+    run.add_argument("--executors", type=int, default=2, help="実行スレッド数")
+    run.add_argument("--lease", type=float, default=60.0, help="リース時間（秒）")
+    run.add_argument("--until-empty", action="store_true", help="キューが空になったら終了")
+    run.add_argument("--config", default="config.json", help="オーケストレーターの設定ファイル")
+
+    commands.add_parser("stats", help="キューの統計を表示")
+
+    args = parser.parse_args()
+    queue = JobQueue(args.db)
+
+    if args.command == "submit":
+        tasks = args.tasks or [line.strip() for line in sys.stdin if line.strip()]
+        job_ids = queue.submit_many(tasks, args.max_attempts)
+        print(f"{len(job_ids)} 件のジョブを投入しました（ID {job_ids[0]}〜{job_ids[-1]}）" if job_ids
+              else "投入するタスクがありません")
+    elif args.command == "stats":
+        print(json.dumps(queue.stats(), ensure_ascii=False, indent=2))
+    else:
+        from orchestrator import Orchestrator
+
+        orchestrator = Orchestrator(args.config)
+        orchestrator.verbose = False
+        orchestrator.warm_up()  # prewarm.warm_set のワーカーを先にロード
+        daemon = Daemon(orchestrator, queue, executors=args.executors, lease_sec=args.lease)
+        try:
+            if args.until_empty:
+                print(json.dumps(daemon.run_until_empty(), ensure_ascii=False, indent=2))
+            else:
+                daemon.run_forever()
+        finally:
+            orchestrator.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Job Queue - SQLite（WALモード）による永続ジョブキュー
+
+投入されたタスクをジョブとして保存し、実行者はリース付きでジョブを取得する。
+リースが切れたジョブは別の実行者が取り直す（少なくとも1回の処理）。
+完了したステップの結果も保存し、再開時には未完了のステップだけを実行できるようにする。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    plan TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS steps (
+    job_id INTEGER NOT NULL,
+    step INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (job_id, step)
+);
+"""
+
+
+class JobQueue:
+    """SQLiteに保存する永続ジョブキュー"""
+
+    def __init__(self, db_path: str = "jobs.db", max_attempts: int = 3):
+        """初期化（テーブルがなければ作成）"""
+        self.db_path = str(db_path)
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """スレッドごとの接続を取得（sqlite3 の接続はスレッド間で共有しない）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, task: str, max_attempts: Optional[int] = None) -> int:
+        """タスクをジョブとして投入し、ジョブIDを返す"""
+        return self.submit_many([task], max_attempts)[0]
+
+    def submit_many(self, tasks: Iterable[str], max_attempts: Optional[int] = None) -> List[int]:
+        """複数のタスクを1トランザクションで投入"""
+        attempts = self.max_attempts if max_attempts is None else max_attempts
+        conn = self._conn()
+        now = time.time()
+        job_ids = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for task in tasks:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (task, max_attempts, created_at) VALUES (?, ?, ?)",
+                    (task, attempts, now)
+                )
+                job_ids.append(cursor.lastrowid)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_ids
+
+    def claim(self, owner: str, lease_sec: float = 60.0) -> Optional[Dict[str, Any]]:
+        """待機中またはリース切れのジョブを1つ取得してリースを設定（なければ None）"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 試行回数を使い切ったままリースが切れたジョブは失敗にする
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL,"
+                " error = COALESCE(error, 'リース期限切れ（試行回数の上限に達しました）')"
+                " WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued'"
+                " OR (status = 'running' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (owner, now + lease_sec, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return {
+            "id": row["id"],
+            "task": row["task"],
+            "plan": json.loads(row["plan"]) if row["plan"] else None,
+            "attempts": row["attempts"] + 1
+        }
+
+    def renew(self, job_id: int, owner: str, lease_sec: float = 60.0) -> bool:
+        """リースを延長（別の実行者に取られていたら False）"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (time.time() + lease_sec, job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def save_plan(self, job_id: int, plan: List[Dict[str, Any]]):
+        """実行計画を保存（再開時に同じステップ番号で実行するため）"""
+        self._conn().execute(
+            "UPDATE jobs SET plan = ? WHERE id = ?",
+            (json.dumps(plan, ensure_ascii=False, default=str), job_id)
+        )
+
+    def save_step(self, job_id: int, result: Dict[str, Any]):
+        """完了したステップの結果を保存"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO steps (job_id, step, result, finished_at) VALUES (?, ?, ?, ?)",
+            (job_id, result["step"], json.dumps(result, ensure_ascii=False, default=str), time.time())
+        )
+
+    def load_steps(self, job_id: int) -> Dict[int, Dict[str, Any]]:
+        """保存済みのステップ結果を取得（ステップ番号 -> 結果）"""
+        rows = self._conn().execute(
+            "SELECT step, result FROM steps WHERE job_id = ?", (job_id,)
+        ).fetchall()
+        return {row["step"]: json.loads(row["result"]) for row in rows}
+
+    def complete(self, job_id: int, owner: str, result: Dict[str, Any]) -> bool:
+        """ジョブを完了にする（リースを失っていたら False）"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, lease_owner = NULL"
+            " WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str) -> str:
+        """ジョブの失敗を記録（試行回数が残っていれば再投入）し、新しい状態を返す"""
+        conn = self._conn()
+        conn.execute(
+            "UPDATE jobs SET error = ?, lease_owner = NULL, lease_expires = NULL,"
+            " status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,"
+            " finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END"
+            " WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (error, time.time(), job_id, owner)
+        )
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else "unknown"
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """ジョブの状態と結果を取得"""
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("plan", "result"):
+            if job[key]:
+                job[key] = json.loads(job[key])
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        """キューの深さ・待ち時間・処理時間の統計"""
+        conn = self._conn()
+        now = time.time()
+        counts = {status: 0 for status in ("queued", "running", "done", "failed")}
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+
+        oldest = conn.execute("SELECT MIN(created_at) AS t FROM jobs WHERE status = 'queued'").fetchone()["t"]
+        done = conn.execute(
+            "SELECT AVG(finished_at - created_at) AS latency, MAX(finished_at - created_at) AS max_latency,"
+            " AVG(finished_at - started_at) AS run FROM jobs WHERE status = 'done'"
+        ).fetchone()
+        return {
+            "depth": counts["queued"],
+            "running": counts["running"],
+            "done": counts["done"],
+            "failed": counts["failed"],
+            "oldest_queued_sec": now - oldest if oldest is not None else 0.0,
+            "avg_latency_sec": done["latency"] or 0.0,
+            "max_latency_sec": done["max_latency"] or 0.0,
+            "avg_run_sec": done["run"] or 0.0
+        }
+
+    def close(self):
+        """このスレッドの接続を閉じる"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
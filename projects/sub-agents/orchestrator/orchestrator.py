@@ -8,10 +8,41 @@ Orchestrator - タスクを分析し、適切なワーカーに委譲する
 import json
 import sys
 import os
+import asyncio
+import contextvars
+import copy
+import hashlib
+import heapq
 import importlib.util
-from typing import Dict, List, Any
+import inspect
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from itertools import islice
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aggregator import ResultAggregator
+from broker import DEFAULT_BROKER, BrokerWorker, LocalBroker, ManagerBroker
+from cache import LRUCache
+from cancellation import CancellationToken
+from profiler import DEFAULT_PROFILE, StepProfiler
+from registry import PluginRegistry
+from result_cache import ResultCache
+from results import PlanResult, StepResult, to_dict
+from router import DEFAULT_ROUTING, KeywordRouter
+from scheduler import DEFAULT_SCHEDULER, TierScheduler
+from tracing import Tracer
+from worker_pool import WorkerProcessPool
+
+# 呼び出しごとのログ表示の上書き（None なら verbose に従う）。
+# process_tasks(quiet=...) はインスタンスの verbose を書き換えず、自分の処理のコンテキストでだけこれを設定する
+_log_verbose: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("orchestrator_log_verbose", default=None)
+
 
 class Orchestrator:
     """オーケストレーター"""
@@ -22,9 +53,62 @@ class Orchestrator:
         self.workers = {}
         self.worker_instances = {}
         self.model_mapping = self._load_model_mapping()
+        self.router = KeywordRouter(self.config.get("routing", DEFAULT_ROUTING))
         self.base_path = Path(__file__).parent.parent  # sub-agents/
+        # マニフェストだけを読む（ワーカーモジュールは実行時まで読み込まない）
+        self.registry = PluginRegistry(self.base_path)
+        self._worker_lock = threading.Lock()
+        self._prewarming = set()  # バックグラウンドでロード中の (ワーカー, 重い依存も読むか)
+        self._warmed = set()      # 事前ロードを済ませた（ロードできないワーカーは試みた）(ワーカー, 重い依存も読んだか)
+        self._prewarm_lock = threading.Lock()
+        self.worker_pools = {}
+        self.broker = None  # execution_backend: broker の場合に最初のワーカーのロード時に接続する
+        self.verbose = True
+        self.batch_stats = {}
+        self._fingerprint = None  # ((設定, ワーカー, モデルマッピング, ルーター), フィンガープリント)
+        result_cache_config = self.config.get("result_cache", {})
+        self.result_cache = ResultCache(
+            cache_dir=result_cache_config.get("dir", ".cache/results"),
+            max_bytes=result_cache_config.get("max_bytes", 500 * 1024 * 1024),
+            flush_interval=result_cache_config.get("flush_interval", 30.0)
+        ) if result_cache_config.get("enabled", False) else None
+        scheduler_config = self._scheduler_config()
+        self.scheduler = TierScheduler(scheduler_config) if scheduler_config.get("enabled", False) else None
+        tracing_config = self.config.get("tracing", {})
+        self.tracer = Tracer(
+            jsonl_path=tracing_config.get("jsonl_path"),
+            max_bytes=tracing_config.get("max_bytes", 10 * 1024 * 1024),
+            backup_count=tracing_config.get("backup_count", 3)
+        ) if tracing_config.get("enabled", False) else None
+        profile_config = self.config.get("profile", {})
+        self.profiler = StepProfiler(profile_config) if profile_config.get("enabled", False) else None
+        cache_config = self.config.get("decision_cache", {})
+        self.decision_cache = LRUCache(
+            max_size=cache_config.get("max_size", 1024),
+            ttl_sec=cache_config.get("ttl_sec")
+        ) if cache_config.get("enabled", True) else None
         self._register_workers()
 
+    def _scheduler_config(self) -> Dict[str, Any]:
+        """スケジューラの設定（旧設定の model_concurrency は階層の concurrency に読み替える）"""
+        config = dict(self.config.get("scheduler", {}))
+        legacy = self.config.get("model_concurrency")
+        if not legacy:
+            return config
+
+        user_tiers = config.get("tiers")
+        if config.get("enabled", False):
+            tiers = {name: dict(tier) for name, tier in (user_tiers or DEFAULT_SCHEDULER["tiers"]).items()}
+        else:
+            # スケジューラ無効時は同時実行数の制限だけを有効にする（レート制限・格下げなし）
+            tiers = {name: {"concurrency": tier["concurrency"]}
+                     for name, tier in (user_tiers or {}).items() if "concurrency" in tier}
+            config.update(enabled=True, downgrade=False)
+        for name, limit in legacy.items():
+            tiers.setdefault(name, {})["concurrency"] = limit
+        config["tiers"] = tiers
+        return config
+
     def _load_config(self, config_path: str) -> Dict:
         """設定をロード"""
         try:
@@ -62,52 +146,173 @@ class Orchestrator:
                 },
                 "execution_mode": "auto",
                 "parallel_execution": False,
+                "max_workers": 3,
+                "batch_size": 256,
+                "step_timeout_sec": None,
+                "plan_timeout_sec": None,
+                "execution_backend": "inprocess",
+                "process_pool": {
+                    "workers": {
+                        "document_writer": 2,
+                        "presentation_builder": 2
+                    },
+                    "default_size": 0
+                },
+                "broker": DEFAULT_BROKER,
+                "prewarm": {
+                    "enabled": True,
+                    "warm_set": []
+                },
+                "routing": DEFAULT_ROUTING,
+                "result_cache": {
+                    "enabled": False,
+                    "dir": ".cache/results",
+                    "max_bytes": 500 * 1024 * 1024,
+                    "flush_interval": 30.0,
+                    "task_types": ["create_document", "create_presentation"]
+                },
+                "scheduler": DEFAULT_SCHEDULER,
+                "tracing": {
+                    "enabled": False,
+                    "jsonl_path": None,
+                    "max_bytes": 10 * 1024 * 1024,
+                    "backup_count": 3
+                },
+                "profile": DEFAULT_PROFILE,
+                "decision_cache": {
+                    "enabled": True,
+                    "max_size": 1024,
+                    "ttl_sec": 3600
+                },
                 "default_model": "sonnet"
             }
 
+    def _log(self, message: str = ""):
+        """実行ログを表示（verbose=False の場合、または process_tasks(quiet=True) の処理中は抑制）"""
+        verbose = _log_verbose.get()
+        if self.verbose if verbose is None else verbose:
+            print(message)
+
+    def _span(self, name: str, **args):
+        """トレーシング有効時はスパンを記録（無効時は何もしない）"""
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span(name, **args)
+
     def _register_workers(self):
         """ワーカーを登録"""
         for worker_name, worker_config in self.config["workers"].items():
             if worker_config["enabled"]:
                 self.workers[worker_name] = worker_config
 
+        # プロセスプールバックエンドでは、設定されたワーカーを起動時にプロセスへ常駐させる
+        if self.config.get("execution_backend", "inprocess") == "process_pool":
+            for worker_name in self.config.get("process_pool", {}).get("workers", {}):
+                if worker_name in self.workers:
+                    self._load_worker(worker_name)
+
     def _load_worker(self, worker_name: str):
         """ワーカーモジュールを動的にロード"""
+        # 並列実行時に同じワーカーを二重にロードしないようロックする
+        with self._worker_lock:
+            return self._load_worker_unlocked(worker_name)
+
+    def _load_worker_unlocked(self, worker_name: str):
+        """ワーカーモジュールをロード（ロック取得済み）"""
         if worker_name in self.worker_instances:
             return self.worker_instances[worker_name]
 
         try:
-            # workers/worker_name/worker.py を探す
-            worker_path = self.base_path / "workers" / worker_name / "worker.py"
+            # レジストリから workers/worker_name/ のモジュールとクラス名を得る
+            manifest = self.registry.get_worker(worker_name)
 
-            if not worker_path.exists():
-                print(f"   [!] ワーカーファイルが見つかりません: {worker_path}")
+            if manifest is None or not Path(manifest["path"]).exists():
+                self._log(f"   [!] ワーカーファイルが見つかりません: {self.base_path / 'workers' / worker_name}")
                 return None
 
+            worker_path = Path(manifest["path"])
+            class_name = manifest["class_name"]
+
+            if self.config.get("execution_backend", "inprocess") == "broker":
+                # ブローカー経由でワーカーエージェントに実行させる
+                worker = BrokerWorker(self._get_broker(), worker_name)
+                self.worker_instances[worker_name] = worker
+                return worker
+
+            pool_size = self._process_pool_size(worker_name)
+            if pool_size:
+                # 子プロセスでロード・インスタンス化し、パイプ越しに実行する
+                pool = WorkerProcessPool(
+                    worker_name, worker_path, class_name, size=pool_size,
+                    start_method=self.config.get("process_pool", {}).get("start_method")
+                )
+                self.worker_pools[worker_name] = pool
+                self.worker_instances[worker_name] = pool
+                self._log(f"   ワーカープロセスを起動: {worker_name} x {pool_size}")
+                return pool
+
             # モジュールを動的にロード
             spec = importlib.util.spec_from_file_location(f"{worker_name}_worker", worker_path)
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
 
-            # ワーカークラスを探す（慣例: XxxYyyWorker）
-            class_name = "".join(word.capitalize() for word in worker_name.split("_")) + "Worker"
-
             if not hasattr(module, class_name):
-                print(f"   [!] ワーカークラスが見つかりません: {class_name}")
+                self._log(f"   [!] ワーカークラスが見つかりません: {class_name}")
                 return None
 
             # インスタンス化
             worker_class = getattr(module, class_name)
             worker_instance = worker_class()
+            # ワーカー内部の処理段階もオーケストレーターのトレーサーに記録する
+            worker_instance.tracer = self.tracer
 
             self.worker_instances[worker_name] = worker_instance
             return worker_instance
 
         except Exception as e:
-            print(f"   [!] ワーカーのロードに失敗: {worker_name}")
-            print(f"       エラー: {e}")
+            self._log(f"   [!] ワーカーのロードに失敗: {worker_name}")
+            self._log(f"       エラー: {e}")
             return None
 
+    def _get_broker(self):
+        """ブローカーを作成・接続（ロック取得済み）"""
+        if self.broker is None:
+            broker_config = {**DEFAULT_BROKER, **self.config.get("broker", {})}
+            if broker_config["type"] == "manager":
+                self.broker = ManagerBroker(broker_config["address"], broker_config.get("authkey"),
+                                            result_timeout_sec=broker_config["result_timeout_sec"])
+                self._log(f"   ブローカーに接続: {broker_config['address']}")
+            else:
+                self.broker = LocalBroker(self.base_path, broker_config["local_agents"],
+                                          agent_ttl_sec=broker_config["agent_ttl_sec"],
+                                          result_timeout_sec=broker_config["result_timeout_sec"])
+        return self.broker
+
+    def _process_pool_size(self, worker_name: str) -> int:
+        """プロセスプールで実行する場合のプロセス数（0 ならプロセス内で実行）"""
+        if self.config.get("execution_backend", "inprocess") != "process_pool":
+            return 0
+        pool_config = self.config.get("process_pool", {})
+        return int(pool_config.get("workers", {}).get(worker_name, pool_config.get("default_size", 0)))
+
+    def close(self):
+        """常駐しているワーカープロセス・ブローカーのエージェントを終了"""
+        if self.result_cache is not None:
+            self.result_cache.close()
+        with self._worker_lock:
+            for worker_name, pool in self.worker_pools.items():
+                pool.close()
+                self.worker_instances.pop(worker_name, None)
+            self.worker_pools = {}
+            if self.broker is not None:
+                self.broker.close()
+                self.broker = None
+                for worker_name, worker in list(self.worker_instances.items()):
+                    if isinstance(worker, BrokerWorker):
+                        del self.worker_instances[worker_name]
+        with self._prewarm_lock:
+            self._warmed.clear()
+
     def _load_model_mapping(self) -> Dict[str, str]:
         """タスクタイプとモデルのマッピングを定義"""
         return {
@@ -135,136 +340,42 @@ class Orchestrator:
 
     def _determine_model(self, task_type: str) -> str:
         """タスクタイプから適切なモデルを判定"""
-        return self.model_mapping.get(task_type, self.model_mapping["default"])
+        if task_type in self.model_mapping:
+            return self.model_mapping[task_type]
+        # マッピングにないタスクタイプはワーカーのマニフェストのヒントを使う
+        return self.registry.model_hints().get(task_type, self.model_mapping["default"])
 
     def analyze_task(self, task: str) -> List[Dict[str, Any]]:
         """タスクを分析してサブタスクに分割"""
-        print(f"\n[*] タスク分析中: {task}")
+        self._log(f"\n[*] タスク分析中: {task}")
+
+        # ルーターの照合と同じ正規化をキーにする（キャッシュからの判定が新規の判定と食い違わないように）
+        normalized = self.router.normalize(task)
+        cache_key = ("analyze", normalized)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            subtasks = copy.deepcopy(cached)
+            for subtask in subtasks:
+                # 正規化前の原文をワーカーに渡す
+                if "task" in subtask:
+                    subtask["task"] = task
+                self._log(f"   タスク: {subtask['type']} -> モデル: {subtask['model']}（キャッシュ）")
+            self._prewarm(subtasks)
+            return subtasks
+
+        # コンパイル済みルーターで全キーワードを1回の走査で検出
+        match = self.router.match(normalized, normalized=True)
+        modifiers = set(match["modifiers"])
 
-        # シンプルなキーワードベースの分析
         subtasks = []
 
-        # レビュー関連（優先度高: 先にチェック）
-        if any(keyword in task.lower() for keyword in ["レビュー", "確認", "チェック"]):
-            # 複雑なレビューか簡易レビューか判定
-            if any(keyword in task.lower() for keyword in ["詳細", "包括", "徹底"]):
-                task_type = "comprehensive_review"
-            else:
-                task_type = "review"
-
-            subtasks.append({
-                "type": task_type,
-                "worker": "code_reviewer",
-                "description": "コードをレビューする",
-                "task": task,
-                "model": self._determine_model(task_type)
-            })
-
-        # プレゼン関連
-        elif any(keyword in task.lower() for keyword in ["プレゼン", "スライド", "pptx", "powerpoint"]):
-            if any(keyword in task.lower() for keyword in ["構成", "提案", "アイデア"]):
-                task_type = "suggest_structure"
-                task_data = {
-                    "type": task_type,
-                    "topic": "プレゼンテーション",
-                    "audience": "一般",
-                    "duration": 15,
-                    "description": "プレゼン構成を提案する"
-                }
-            else:
-                task_type = "create_presentation"
-                task_data = {
-                    "type": task_type,
-                    "topic": "プレゼンテーション",
-                    "output_path": "presentation.pptx",
-                    "slides": [
-                        {"layout": "title", "title": "プレゼンテーション", "subtitle": "サンプル"},
-                        {"layout": "content", "title": "内容", "content": "自動生成されたプレゼンです"}
-                    ],
-                    "description": "プレゼン資料を作成する"
-                }
-
-            subtasks.append({
-                "type": task_type,
-                "worker": "presentation_builder",
-                "description": "プレゼン資料を作成する",
-                **task_data,
-                "model": self._determine_model(task_type)
-            })
-
-        # 文書関連
-        elif any(keyword in task.lower() for keyword in ["文書", "ドキュメント", "word", "報告書", "議事録", "提案書"]):
-            if any(keyword in task.lower() for keyword in ["構成", "提案", "アイデア"]):
-                task_type = "suggest_structure"
-                task_data = {
-                    "type": task_type,
-                    "doc_type": "report",
-                    "topic": "報告書",
-                    "purpose": "情報共有",
-                    "description": "文書構成を提案する"
-                }
-            else:
-                task_type = "create_document"
-                # 文書タイプを判定
-                if "議事録" in task.lower():
-                    doc_type = "minutes"
-                    title = "議事録"
-                elif "提案書" in task.lower():
-                    doc_type = "proposal"
-                    title = "提案書"
-                else:
-                    doc_type = "report"
-                    title = "報告書"
-
-                task_data = {
-                    "type": task_type,
-                    "doc_type": doc_type,
-                    "title": title,
-                    "output_path": f"{title}.docx",
-                    "content": {
-                        "metadata": {
-                            "company": "株式会社サンプル",
-                            "author": "システム",
-                            "date": "2025年1月"
-                        },
-                        "sections": [
-                            {
-                                "title": "概要",
-                                "type": "content",
-                                "content": "自動生成された文書です。"
-                            }
-                        ]
-                    },
-                    "description": "文書を作成する"
-                }
-
-            subtasks.append({
-                "type": task_type,
-                "worker": "document_writer",
-                "description": "文書を作成する",
-                **task_data,
-                "model": self._determine_model(task_type)
-            })
-
-        # コード関連
-        elif any(keyword in task.lower() for keyword in ["コード", "実装", "作成", "書く"]):
-            subtasks.append({
-                "type": "code_writing",
-                "worker": "code_writer",
-                "description": "コードを生成する",
-                "task": task,
-                "model": self._determine_model("code_writing")
-            })
-
-        # テスト関連
-        elif any(keyword in task.lower() for keyword in ["テスト", "検証"]):
-            subtasks.append({
-                "type": "testing",
-                "worker": "tester",
-                "description": "テストを実行する",
-                "task": task,
-                "model": self._determine_model("testing")
-            })
+        pipeline = self.router.match_pipeline(match)
+        if pipeline is not None:
+            # 複数のサブタスクに分解し、段の間の依存関係を付ける
+            subtasks.extend(self._build_pipeline_subtasks(task, pipeline, modifiers))
+        elif match["rules"]:
+            # 優先順位が最も高いルールを採用
+            subtasks.append(self._build_rule_subtask(task, self.router.get_rule(match["rules"][0]), modifiers))
 
         # デフォルト
         if not subtasks:
@@ -278,149 +389,992 @@ class Orchestrator:
 
         # モデル情報を表示
         for subtask in subtasks:
-            print(f"   タスク: {subtask['type']} -> モデル: {subtask['model']}")
+            depends = f"（{', '.join(subtask['depends_on'])} の後）" if subtask.get("depends_on") else ""
+            self._log(f"   タスク: {subtask['type']} -> モデル: {subtask['model']}{depends}")
 
+        self._cache_put(cache_key, copy.deepcopy(subtasks))
+        self._prewarm(subtasks)
         return subtasks
 
+    def _prewarm(self, subtasks: List[Dict[str, Any]]):
+        """ルーティングで決まったワーカーを、計画作成と並行してバックグラウンドでロード"""
+        if not self.config.get("prewarm", {}).get("enabled", True):
+            return
+        for subtask in subtasks:
+            worker_name = subtask["worker"]
+            if worker_name not in self.workers:
+                continue
+            # 重い依存は、それを使うタスクタイプ（manifest の heavy_task_types）のときだけインポートする
+            manifest = self.registry.get_worker(worker_name) or {}
+            heavy = subtask.get("type") in manifest.get("heavy_task_types", [])
+            key = (worker_name, heavy)
+            with self._prewarm_lock:
+                if key in self._warmed or key in self._prewarming:
+                    continue
+                self._prewarming.add(key)
+            threading.Thread(target=self._prewarm_worker, args=(key,),
+                             name=f"prewarm-{worker_name}", daemon=True).start()
+
+    def _prewarm_worker(self, key):
+        """ワーカーのロードと重い依存のインポート（実行時の _load_worker はロード完了を待つ）"""
+        worker_name, heavy = key
+        try:
+            with self._span("prewarm", worker=worker_name, heavy=heavy):
+                self._load_worker(worker_name)
+                if heavy:
+                    self._import_heavy_dependencies(worker_name)
+            self._mark_warmed(worker_name, heavy)
+        finally:
+            with self._prewarm_lock:
+                self._prewarming.discard(key)
+
+    def _mark_warmed(self, worker_name: str, heavy: bool):
+        """事前ロードを済ませたワーカーを記録（以降の analyze_task ではスレッドを起動しない）
+
+        ロードできなかったワーカーも記録する（実行時の _load_worker がもう一度試す）。
+        """
+        with self._prewarm_lock:
+            self._warmed.add((worker_name, False))
+            if heavy:
+                self._warmed.add((worker_name, True))
+
+    def _import_heavy_dependencies(self, worker_name: str):
+        """マニフェストの heavy_dependencies をインポート（別プロセスで実行するワーカーは不要）"""
+        if isinstance(self.worker_instances.get(worker_name), (WorkerProcessPool, BrokerWorker)):
+            return
+        manifest = self.registry.get_worker(worker_name) or {}
+        for module_name in manifest.get("heavy_dependencies", []):
+            try:
+                importlib.import_module(module_name)
+            except ImportError:
+                self._log(f"   [!] {module_name} がインストールされていません（{worker_name}）")
+
+    def warm_up(self, workers: Optional[Iterable[str]] = None) -> float:
+        """ワーカーのロードと重い依存のインポートを先に済ませ、かかった秒数を返す
+
+        workers を省略すると設定の prewarm.warm_set を使う（常駐サーバー・バッチ処理の起動時用）。
+        """
+        started = time.perf_counter()
+        if workers is None:
+            workers = self.config.get("prewarm", {}).get("warm_set", [])
+        for worker_name in workers:
+            with self._span("warm_up", worker=worker_name):
+                self._load_worker(worker_name)
+                self._import_heavy_dependencies(worker_name)
+            self._mark_warmed(worker_name, True)
+        return time.perf_counter() - started
+
+    def _cache_fingerprint(self) -> str:
+        """判定結果に影響する設定のフィンガープリント
+
+        ハッシュの計算は config・workers・model_mapping・router（ルーティング表）が差し替えられたときだけ行う。
+        これらをその場で書き換えた場合は decision_cache.clear() を呼ぶこと。
+        """
+        sources = (self.config, self.workers, self.model_mapping, self.router)
+        cached = self._fingerprint
+        # id ではなくオブジェクトそのものを保持して比べる（破棄されたオブジェクトの id が再利用されても取り違えない）
+        if cached is not None and all(old is new for old, new in zip(cached[0], sources)):
+            return cached[1]
+
+        source = json.dumps(
+            [self.workers, self.model_mapping, self.router.rules, self.router.modifiers, self.router.pipelines],
+            sort_keys=True, ensure_ascii=False
+        )
+        fingerprint = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        self._fingerprint = (sources, fingerprint)
+        return fingerprint
+
+    def _cache_get(self, key):
+        """判定キャッシュから取得（設定が変わっていれば破棄してから）"""
+        if self.decision_cache is None:
+            return None
+        self.decision_cache.validate(self._cache_fingerprint())
+        return self.decision_cache.get(key)
+
+    def _cache_put(self, key, value):
+        """判定キャッシュに格納"""
+        if self.decision_cache is not None:
+            self.decision_cache.put(key, value)
+
+    def _build_rule_subtask(self, task: str, rule: Dict[str, Any], modifiers: set) -> Dict[str, Any]:
+        """ルールのハンドラー（なければルール定義）からサブタスクを生成"""
+        build = getattr(self, f"_build_{rule['handler']}_subtask", None) if "handler" in rule else None
+        if build is not None:
+            return build(task, modifiers)
+        return self._build_generic_subtask(task, rule)
+
+    def _build_pipeline_subtasks(self, task: str, pipeline: Dict[str, Any],
+                                 modifiers: set) -> List[Dict[str, Any]]:
+        """分解パイプラインの各段をサブタスクにする（depends_on は段のID）"""
+        subtasks = []
+        for stage in pipeline["stages"]:
+            stage_modifiers = (modifiers | set(stage.get("add_modifiers", []))) - set(stage.get("remove_modifiers", []))
+            subtask = self._build_rule_subtask(task, self.router.get_rule(stage["rule"]), stage_modifiers)
+            subtask["id"] = stage["id"]
+            subtask["depends_on"] = list(stage.get("depends_on", []))
+            subtask["pipeline"] = pipeline["name"]
+            if "description" in stage:
+                subtask["description"] = stage["description"]
+            subtasks.append(subtask)
+        return subtasks
+
+    def _build_generic_subtask(self, task: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """ルール定義（worker/type/description）からサブタスクを生成"""
+        task_type = rule.get("type", "default")
+        return {
+            "type": task_type,
+            "worker": rule.get("worker", "code_writer"),
+            "description": rule.get("description", "タスクを実行する"),
+            "task": task,
+            "model": self._determine_model(task_type)
+        }
+
+    def _build_review_subtask(self, task: str, modifiers: set) -> Dict[str, Any]:
+        """レビューのサブタスクを生成"""
+        # 複雑なレビューか簡易レビューか判定
+        if "comprehensive" in modifiers:
+            task_type = "comprehensive_review"
+        else:
+            task_type = "review"
+
+        return {
+            "type": task_type,
+            "worker": "code_reviewer",
+            "description": "コードをレビューする",
+            "task": task,
+            "model": self._determine_model(task_type)
+        }
+
+    def _build_presentation_subtask(self, task: str, modifiers: set) -> Dict[str, Any]:
+        """プレゼンのサブタスクを生成"""
+        if "structure" in modifiers:
+            task_type = "suggest_structure"
+            task_data = {
+                "type": task_type,
+                "topic": "プレゼンテーション",
+                "audience": "一般",
+                "duration": 15,
+                "description": "プレゼン構成を提案する"
+            }
+        else:
+            task_type = "create_presentation"
+            task_data = {
+                "type": task_type,
+                "topic": "プレゼンテーション",
+                "output_path": "presentation.pptx",
+                "slides": [
+                    {"layout": "title", "title": "プレゼンテーション", "subtitle": "サンプル"},
+                    {"layout": "content", "title": "内容", "content": "自動生成されたプレゼンです"}
+                ],
+                "description": "プレゼン資料を作成する"
+            }
+
+        return {
+            "type": task_type,
+            "worker": "presentation_builder",
+            "description": "プレゼン資料を作成する",
+            **task_data,
+            "model": self._determine_model(task_type)
+        }
+
+    def _build_document_subtask(self, task: str, modifiers: set) -> Dict[str, Any]:
+        """文書のサブタスクを生成"""
+        # 文書タイプを判定（構成の提案でも同じ文書タイプのテンプレートを使う）
+        if "minutes" in modifiers:
+            doc_type = "minutes"
+            title = "議事録"
+        elif "proposal" in modifiers:
+            doc_type = "proposal"
+            title = "提案書"
+        else:
+            doc_type = "report"
+            title = "報告書"
+
+        if "structure" in modifiers:
+            task_type = "suggest_structure"
+            task_data = {
+                "type": task_type,
+                "doc_type": doc_type,
+                "topic": title,
+                "purpose": "情報共有",
+                "description": "文書構成を提案する"
+            }
+        else:
+            task_type = "create_document"
+            task_data = {
+                "type": task_type,
+                "doc_type": doc_type,
+                "title": title,
+                "output_path": f"{title}.docx",
+                "content": {
+                    "metadata": {
+                        "company": "株式会社サンプル",
+                        "author": "システム",
+                        "date": "2025年1月"
+                    },
+                    "sections": [
+                        {
+                            "title": "概要",
+                            "type": "content",
+                            "content": "自動生成された文書です。"
+                        }
+                    ]
+                },
+                "description": "文書を作成する"
+            }
+
+        return {
+            "type": task_type,
+            "worker": "document_writer",
+            "description": "文書を作成する",
+            **task_data,
+            "model": self._determine_model(task_type)
+        }
+
     def create_execution_plan(self, subtasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """実行計画を作成"""
-        print(f"\n[*] 実行計画を作成中...")
+        self._log(f"\n[*] 実行計画を作成中...")
+
+        # 計画の形はワーカー・モデル・依存関係だけで決まるので、それをキーにする
+        cache_key = ("plan", tuple(
+            (subtask.get("id", i + 1), subtask["worker"], subtask.get("model", "sonnet"),
+             tuple(subtask.get("depends_on", [])))
+            for i, subtask in enumerate(subtasks)
+        ))
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            plan = []
+            for index, step_number, depends_on in cached:
+                subtask = subtasks[index]
+                plan.append({
+                    "step": step_number,
+                    "worker": subtask["worker"],
+                    "model": subtask.get("model", "sonnet"),
+                    "task": subtask,
+                    "depends_on": list(depends_on),
+                    "status": "pending"
+                })
+                self._log(f"   ステップ {step_number}: {subtask['worker']} ({subtask.get('model', 'sonnet')}) "
+                          f"- {subtask['description']}（キャッシュ）")
+            return plan
 
+        # サブタスクID（未指定なら1始まりの位置）→ ステップ番号
+        step_numbers = {}
+        subtask_indices = []
         plan = []
         for i, subtask in enumerate(subtasks):
             worker_name = subtask["worker"]
             model = subtask.get("model", "sonnet")
 
             if worker_name in self.workers:
+                step_number = len(plan) + 1
+                step_numbers[subtask.get("id", i + 1)] = step_number
+                subtask_indices.append(i)
                 plan.append({
-                    "step": i + 1,
+                    "step": step_number,
                     "worker": worker_name,
                     "model": model,
                     "task": subtask,
+                    "depends_on": list(subtask.get("depends_on", [])),
                     "status": "pending"
                 })
-                print(f"   ステップ {i + 1}: {worker_name} ({model}) - {subtask['description']}")
+                self._log(f"   ステップ {step_number}: {worker_name} ({model}) - {subtask['description']}")
             else:
-                print(f"   [!] ワーカー '{worker_name}' が見つかりません（スキップ）")
+                self._log(f"   [!] ワーカー '{worker_name}' が見つかりません（スキップ）")
 
+        # 依存関係をステップ番号に変換（スキップされたサブタスクへの依存は除外）
+        for step in plan:
+            depends_on = []
+            for dep in step["depends_on"]:
+                if dep in step_numbers:
+                    depends_on.append(step_numbers[dep])
+                else:
+                    self._log(f"   [!] ステップ {step['step']}: 依存先 '{dep}' が計画にありません（無視）")
+            step["depends_on"] = depends_on
+            if depends_on:
+                self._log(f"   ステップ {step['step']} は ステップ {depends_on} の完了後に実行")
+
+        self._cache_put(cache_key, [
+            (index, step["step"], tuple(step["depends_on"]))
+            for index, step in zip(subtask_indices, plan)
+        ])
         return plan
 
-    def execute_plan(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """実行計画を実行"""
-        print(f"\n[*] 実行中...")
-
-        results = []
+    def execute_plan(self, plan: List[Dict[str, Any]],
+                     completed: Optional[Dict[int, Dict[str, Any]]] = None,
+                     on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """実行計画を実行
+
+        completed に渡したステップ（ステップ番号 -> 結果）は実行済みとして再実行しない。
+        on_step はステップの結果が確定するたびに呼ばれる（チェックポイントの保存用）。
+        依存関係が循環している場合は、どのステップも実行せずに ValueError を送出する。
+        """
+        self._log(f"\n[*] 実行中...")
+
+        results_by_step = dict(completed or {})
+        remaining = self._topological_order([step for step in plan if step["step"] not in results_by_step])
+
+        deadline = self._plan_deadline()
+        if self.config.get("parallel_execution", False) and len(remaining) > 1:
+            self._execute_parallel(remaining, deadline, results_by_step, on_step)
+        else:
+            self._execute_sequential(remaining, deadline, results_by_step, on_step)
+
+        # 完了順に関わらずステップ順で返す
+        return [results_by_step[step["step"]] for step in plan]
+
+    def _plan_deadline(self) -> Optional[float]:
+        """計画全体の期限（time.monotonic 基準、未設定なら None）"""
+        plan_timeout = self.config.get("plan_timeout_sec")
+        return time.monotonic() + plan_timeout if plan_timeout is not None else None
+
+    def _step_timeout(self, step: Dict[str, Any], deadline: Optional[float]) -> Optional[float]:
+        """ステップの制限時間（タスクの timeout_sec > step_timeout_sec、計画の残り時間で頭打ち）"""
+        timeout = step['task'].get("timeout_sec", self.config.get("step_timeout_sec"))
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _execute_sequential(self, plan: List[Dict[str, Any]], deadline: Optional[float] = None,
+                            results_by_step: Optional[Dict[int, Dict[str, Any]]] = None,
+                            on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[int, Dict[str, Any]]:
+        """ステップを1つずつ実行（plan は _topological_order で依存先が先に来るよう並べたもの）"""
+        results_by_step = {} if results_by_step is None else results_by_step
         for step in plan:
-            model = step.get('model', 'sonnet')
-            worker_name = step['worker']
-            print(f"\n   ステップ {step['step']}: {worker_name} ({model}) を実行中...")
-
-            # ワーカーをロード
+            failed = self._failed_dependencies(step, results_by_step)
+            if failed:
+                result = self._skipped_result(step, failed)
+            else:
+                result = self._run_step(self._with_inputs(step, results_by_step), deadline)
+            self._record_step(results_by_step, result, on_step)
+        return results_by_step
+
+    def _execute_parallel(self, plan: List[Dict[str, Any]], deadline: Optional[float] = None,
+                          results_by_step: Optional[Dict[int, Dict[str, Any]]] = None,
+                          on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[int, Dict[str, Any]]:
+        """依存関係(DAG)を満たしたステップからスレッドプールで並列実行（plan は _topological_order で並べたもの）"""
+        max_workers = max(1, int(self.config.get("max_workers", 3)))
+        self._log(f"   並列実行: 最大 {max_workers} ワーカー")
+
+        results_by_step = {} if results_by_step is None else results_by_step
+        # 同時に投入できるステップは、逐次実行と同じ順で投入する
+        pending = {step["step"]: step for step in plan}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                # 依存先がすべて終わったステップを投入する
+                for step_number, step in list(pending.items()):
+                    if any(dep not in results_by_step for dep in step["depends_on"]):
+                        continue
+                    del pending[step_number]
+                    failed = self._failed_dependencies(step, results_by_step)
+                    if failed:
+                        self._record_step(results_by_step, self._skipped_result(step, failed), on_step)
+                    else:
+                        step = self._with_inputs(step, results_by_step)
+                        # ログ表示の上書きなど、呼び出し元のコンテキストを引き継いで実行する
+                        running[pool.submit(contextvars.copy_context().run, self._run_step, step, deadline)] = step_number
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    self._record_step(results_by_step, future.result(), on_step)
+
+        return results_by_step
+
+    def _record_step(self, results_by_step: Dict[int, Dict[str, Any]], result: Dict[str, Any],
+                     on_step: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """ステップの結果を確定し、コールバックに通知"""
+        results_by_step[result["step"]] = result
+        if on_step is not None:
+            on_step(result)
+
+    def _with_inputs(self, step: Dict[str, Any],
+                     results_by_step: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """依存先ステップのワーカー出力をタスクの inputs（サブタスクID -> 出力）として渡す"""
+        if not step["depends_on"]:
+            return step
+        inputs = {}
+        for dep in step["depends_on"]:
+            result = results_by_step.get(dep)
+            if result is None:
+                continue
+            details = result["details"]
+            task_id = getattr(result, "task_id", None)
+            if task_id is None:
+                task_id = str(details.get("task_id", details.get("task", {}).get("id", dep)))
+            inputs[task_id] = details.get("worker_output")
+        return {**step, "task": {**step["task"], "inputs": inputs}}
+
+    def _topological_order(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """依存先が先に来るようにステップを並べる（逐次・並列・非同期の各経路で共通）
+
+        依存関係のないステップどうしは計画の順を保つ。計画にない依存先（実行済みのステップなど）は満たされているものとみなす。
+        依存関係が循環している場合は ValueError を送出する。
+        """
+        position = {step["step"]: index for index, step in enumerate(plan)}
+        waiting = {
+            step["step"]: {dep for dep in step["depends_on"] if dep in position}
+            for step in plan
+        }
+        dependents = {step_number: [] for step_number in position}
+        for step_number, deps in waiting.items():
+            for dep in deps:
+                dependents[dep].append(step_number)
+
+        # 依存先がすべて並んだステップのうち、計画で先にあるものから並べる（Kahn のアルゴリズム）
+        ready = [position[step_number] for step_number, deps in waiting.items() if not deps]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            step = plan[heapq.heappop(ready)]
+            order.append(step)
+            for step_number in dependents[step["step"]]:
+                waiting[step_number].discard(step["step"])
+                if not waiting[step_number]:
+                    heapq.heappush(ready, position[step_number])
+
+        if len(order) < len(plan):
+            blocked = sorted(step_number for step_number, deps in waiting.items() if deps)
+            raise ValueError(f"依存関係が循環しているため実行できません（ステップ {blocked}）")
+        return order
+
+    def _failed_dependencies(self, step: Dict[str, Any],
+                             results_by_step: Dict[int, Dict[str, Any]]) -> List[int]:
+        """成功しなかった依存先ステップを返す"""
+        return [
+            dep for dep in step.get("depends_on", [])
+            if dep in results_by_step and results_by_step[dep]["status"] != "success"
+        ]
+
+    def _skipped_result(self, step: Dict[str, Any], failed: List[int]) -> StepResult:
+        """依存先の失敗により実行しなかったステップの結果"""
+        worker_name = step["worker"]
+        self._log(f"\n   ステップ {step['step']}: {worker_name} は依存先 {failed} の失敗によりスキップ")
+        return StepResult(
+            step=step['step'],
+            worker=worker_name,
+            model=step.get('model', 'sonnet'),
+            status="skipped",
+            output=f"[{worker_name}] 依存ステップ {failed} が失敗したためスキップしました",
+            task=step['task'],
+            error=f"依存ステップ {failed} が失敗しました"
+        )
+
+    def _error_result(self, step: Dict[str, Any], output: str, error: str,
+                      status: str = "error") -> StepResult:
+        """エラー結果を生成"""
+        worker_name = step["worker"]
+        return StepResult(
+            step=step['step'],
+            worker=worker_name,
+            model=step.get('model', 'sonnet'),
+            status=status,
+            output=f"[{worker_name}] {output}",
+            task=step['task'],
+            error=error
+        )
+
+    def _run_step(self, step: Dict[str, Any], deadline: Optional[float] = None) -> StepResult:
+        """1ステップを実行"""
+        model = step.get('model', 'sonnet')
+        worker_name = step['worker']
+        self._log(f"\n   ステップ {step['step']}: {worker_name} ({model}) を実行中...")
+
+        # 同じ内容のタスクを実行済みなら、ワーカーをロードせずに保存済みの結果を返す
+        with self._span("result_cache_lookup", worker=worker_name):
+            cache_key, cached = self._result_cache_lookup(worker_name, step['task'])
+        if cached is not None:
+            return self._success_result(step, cached, cache="hit")
+
+        # ワーカーをロード
+        with self._span("load_worker", worker=worker_name):
             worker = self._load_worker(worker_name)
 
-            if worker is None:
-                # ワーカーがロードできない場合はスキップ
-                result = {
-                    "step": step['step'],
-                    "worker": worker_name,
-                    "model": model,
-                    "status": "error",
-                    "output": f"[{worker_name}] ワーカーのロードに失敗しました",
-                    "details": {
-                        "task": step['task'],
-                        "model_used": model,
-                        "error": "ワーカーがロードできませんでした"
-                    }
-                }
+        if worker is None:
+            # ワーカーがロードできない場合はスキップ
+            return self._error_result(
+                step, "ワーカーのロードに失敗しました", "ワーカーがロードできませんでした"
+            )
+
+        session = self._profile_session(step, worker)
+
+        # モデル階層の実行枠を確保（混雑時は下位の階層に格下げされることがある）
+        with self._tier_slot(model) as tier:
+            if tier != model:
+                self._log(f"   [*] {model} が混雑しているため {tier} で実行します")
+                step = {**step, "model": tier, "model_requested": model,
+                        "task": {**step["task"], "model": tier}}
+                model = tier
+
+            timeout = self._step_timeout(step, deadline)
+            try:
+                # ワーカーを実行
+                # タスク情報をワーカーに渡す
+                with self._span("execute", step=step['step'], worker=worker_name, model=model):
+                    worker_result = self._call_worker(worker, step['task'], timeout, session)
+                self._result_cache_store(cache_key, worker_result)
+                result = self._success_result(step, worker_result, cache="miss" if cache_key else None)
+
+            except TimeoutError:
+                result = self._timeout_result(step, timeout)
+
+            except Exception as e:
+                result = self._error_result(step, "実行中にエラーが発生しました", str(e))
+                self._log(f"   [!] {worker_name} エラー: {e}")
+
+        if session is not None:
+            result.profile = session.summary
+        return result
+
+    def _profile_session(self, step: Dict[str, Any], worker) -> Optional[Any]:
+        """プロファイル対象のステップなら計測セッションを返す（無効時は None）"""
+        profiler = step.get("profiler", self.profiler)
+        if profiler is None or not profiler.selects(step):
+            return None
+        if isinstance(worker, (WorkerProcessPool, BrokerWorker)) or inspect.iscoroutinefunction(getattr(worker, "execute_async", None)):
+            self._log(f"   [*] ステップ {step['step']} は子プロセス・エージェント・コルーチンで実行するためプロファイルしません")
+            return None
+        return profiler.session(step)
+
+    def _with_profiler(self, plan: List[Dict[str, Any]], profile: Any) -> List[Dict[str, Any]]:
+        """計画のステップにプロファイラーを指定（True なら設定の profile、False なら無効）"""
+        if profile is False:
+            profiler = None
+        else:
+            profiler = StepProfiler(profile if isinstance(profile, dict) else self.config.get("profile"))
+        return [{**step, "profiler": profiler} for step in plan]
+
+    @staticmethod
+    def _with_output_suffix(plan: List[Dict[str, Any]], suffix: Any) -> List[Dict[str, Any]]:
+        """output_path を持つステップの出力先に接尾辞を付ける（「報告書.docx」→「報告書_3.docx」）
+
+        サブタスクは同じタスク文の計画どうしで共有しているため、書き換えるステップのタスクはコピーする。
+        """
+        suffixed = []
+        for step in plan:
+            output_path = step["task"].get("output_path")
+            if output_path:
+                stem, ext = os.path.splitext(output_path)
+                step = {**step, "task": {**step["task"], "output_path": f"{stem}_{suffix}{ext}"}}
+            suffixed.append(step)
+        return suffixed
+
+    def _call_worker(self, worker, task: Dict[str, Any], timeout: Optional[float],
+                     session: Optional[Any] = None) -> Dict[str, Any]:
+        """ワーカーを実行（制限時間を超えたら TimeoutError、session があればその中で計測）"""
+        profiling = session if session is not None else nullcontext()
+        if timeout is None:
+            with profiling:
+                return worker.execute(task)
+        if timeout <= 0:
+            raise TimeoutError()
+
+        if isinstance(worker, (WorkerProcessPool, BrokerWorker)):
+            # 子プロセスは期限切れで強制終了・再起動される（エージェントの結果は破棄される）
+            return worker.execute(task, timeout=timeout)
+
+        # 別スレッドで実行し、期限切れならキャンセルトークンで打ち切りを要求して待つのをやめる
+        token = CancellationToken()
+        outcome = {}
+
+        def run():
+            try:
+                with profiling:
+                    outcome["result"] = self._execute_with_token(worker, task, token)
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, name=f"step-{task.get('type', 'task')}", daemon=True)
+        thread.start()
+        thread.join(timeout)
+
+        if thread.is_alive():
+            token.cancel("timeout")
+            raise TimeoutError()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _execute_with_token(self, worker, task: Dict[str, Any], token: CancellationToken) -> Dict[str, Any]:
+        """ワーカーがキャンセルトークンを受け取れるなら渡して実行"""
+        if "cancel_token" in inspect.signature(worker.execute).parameters:
+            return worker.execute(task, cancel_token=token)
+        return worker.execute(task)
+
+    def _timeout_result(self, step: Dict[str, Any], timeout: Optional[float]) -> StepResult:
+        """制限時間切れのステップ結果"""
+        worker_name = step["worker"]
+        limit = f"{max(timeout, 0):.1f}秒" if timeout is not None else "期限"
+        self._log(f"   [!] {worker_name} タイムアウト（{limit}）")
+        return self._error_result(
+            step, f"制限時間（{limit}）を超えたため打ち切りました", "timeout", status="timeout"
+        )
+
+    def _tier_slot(self, model: str):
+        """スケジューラ有効時はモデル階層の実行枠を確保（無効時は何もしない）"""
+        if self.scheduler is None:
+            return nullcontext(model)
+        return self.scheduler.acquire(model)
+
+    @asynccontextmanager
+    async def _tier_slot_async(self, model: str):
+        """_tier_slot の asyncio 版（同じスケジューラの実行枠を使う）"""
+        if self.scheduler is None:
+            yield model
+            return
+        async with self.scheduler.acquire_async(model) as tier:
+            yield tier
+
+    def _result_cache_lookup(self, worker_name: str, task: Dict[str, Any]):
+        """結果キャッシュを引く（キャッシュ対象外なら (None, None)）"""
+        if self.result_cache is None or task.get("cache") is False:
+            return None, None
+        # メモリ上・ストリームへの出力はファイルとして保存できないのでキャッシュしない
+        if "output_stream" in task or task.get("output_mode", "file") != "file":
+            return None, None
+
+        task_types = self.config.get("result_cache", {}).get(
+            "task_types", ["create_document", "create_presentation"]
+        )
+        if task.get("type") not in task_types:
+            return None, None
+
+        manifest = self.registry.get_worker(worker_name) or {}
+        key = self.result_cache.make_key(worker_name, manifest.get("version", "0"), task)
+        return key, self.result_cache.get(key, task.get("output_path"))
+
+    def _result_cache_store(self, key, worker_result: Dict[str, Any]):
+        """成功した結果を結果キャッシュに保存"""
+        if key is not None and worker_result.get("status") == "success":
+            self.result_cache.put(key, worker_result)
+
+    def _success_result(self, step: Dict[str, Any], worker_result: Dict[str, Any],
+                        cache: str = None) -> StepResult:
+        """ワーカーの実行結果からステップ結果を生成（タスク・出力はコピーせず参照する）"""
+        model = step.get('model', 'sonnet')
+        worker_name = step['worker']
+        task_data = step['task']
+
+        result = StepResult(
+            step=step['step'],
+            worker=worker_name,
+            model=model,
+            status=worker_result.get("status", "success"),
+            output=f"[{worker_name}] タスク '{task_data['description']}' を完了しました",
+            task=task_data,
+            worker_output=worker_result,
+            cache=cache,
+            model_requested=step.get("model_requested")
+        )
+
+        self._log(f"   [+] {worker_name} ({model}) 完了{'（キャッシュ）' if cache == 'hit' else ''}")
+        return result
+
+    async def execute_plan_async(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """実行計画を非同期に実行（依存関係を満たしたステップから同時に実行、循環していれば ValueError）"""
+        self._log(f"\n[*] 実行中（async）...")
+
+        order = self._topological_order(plan)
+        deadline = self._plan_deadline()
+        loop = asyncio.get_running_loop()
+        done = {step["step"]: loop.create_future() for step in plan}
+
+        async def run(step: Dict[str, Any]) -> None:
+            deps = [done[dep] for dep in step["depends_on"] if dep in done]
+            dep_results = await asyncio.gather(*deps)
+            failed = [r["step"] for r in dep_results if r["status"] != "success"]
+            if failed:
+                result = self._skipped_result(step, failed)
             else:
-                try:
-                    # ワーカーを実行
-                    # タスク情報をワーカーに渡す
-                    task_data = step['task']
-                    worker_result = worker.execute(task_data)
-
-                    result = {
-                        "step": step['step'],
-                        "worker": worker_name,
-                        "model": model,
-                        "status": worker_result.get("status", "success"),
-                        "output": f"[{worker_name}] タスク '{task_data['description']}' を完了しました",
-                        "details": {
-                            "task": task_data,
-                            "model_used": model,
-                            "worker_output": worker_result
-                        }
-                    }
-
-                    print(f"   [+] {worker_name} ({model}) 完了")
-
-                except Exception as e:
-                    result = {
-                        "step": step['step'],
-                        "worker": worker_name,
-                        "model": model,
-                        "status": "error",
-                        "output": f"[{worker_name}] 実行中にエラーが発生しました",
-                        "details": {
-                            "task": step['task'],
-                            "model_used": model,
-                            "error": str(e)
-                        }
-                    }
-                    print(f"   [!] {worker_name} エラー: {e}")
+                inputs = {r["step"]: r for r in dep_results}
+                result = await self._run_step_async(self._with_inputs(step, inputs), deadline)
+            done[step["step"]].set_result(result)
 
-            results.append(result)
+        await asyncio.gather(*(run(step) for step in order))
 
-        return results
+        return [done[step["step"]].result() for step in plan]
 
-    def integrate_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """結果を統合"""
-        print(f"\n[*] 結果を統合中...")
+    async def _run_step_async(self, step: Dict[str, Any], deadline: Optional[float] = None) -> StepResult:
+        """1ステップを非同期に実行（モデル階層ごとの同時実行数を制限）"""
+        model = step.get('model', 'sonnet')
+        worker_name = step['worker']
 
-        all_success = all(r["status"] == "success" for r in results)
+        # 同期の経路と同じく、モデル階層の実行枠を確保する（混雑時は下位の階層に格下げされることがある）
+        async with self._tier_slot_async(model) as tier:
+            if tier != model:
+                self._log(f"   [*] {model} が混雑しているため {tier} で実行します")
+                step = {**step, "model": tier, "model_requested": model,
+                        "task": {**step["task"], "model": tier}}
+                model = tier
+            self._log(f"\n   ステップ {step['step']}: {worker_name} ({model}) を実行中...")
 
-        integrated = {
-            "status": "success" if all_success else "partial_success",
-            "total_steps": len(results),
-            "successful_steps": sum(1 for r in results if r["status"] == "success"),
-            "results": results,
-            "summary": self._generate_summary(results)
-        }
+            cache_key, cached = await asyncio.to_thread(self._result_cache_lookup, worker_name, step['task'])
+            if cached is not None:
+                return self._success_result(step, cached, cache="hit")
 
-        return integrated
+            # モジュールのロードはブロッキングなのでスレッドで行う
+            with self._span("load_worker", worker=worker_name):
+                worker = await asyncio.to_thread(self._load_worker, worker_name)
 
-    def _generate_summary(self, results: List[Dict[str, Any]]) -> str:
-        """サマリーを生成"""
-        lines = ["\n=== 実行結果サマリー ==="]
+            if worker is None:
+                return self._error_result(
+                    step, "ワーカーのロードに失敗しました", "ワーカーがロードできませんでした"
+                )
+
+            timeout = self._step_timeout(step, deadline)
+            session = self._profile_session(step, worker)
+            try:
+                execute_async = getattr(worker, "execute_async", None)
+                with self._span("execute", step=step['step'], worker=worker_name, model=model):
+                    if execute_async is not None and inspect.iscoroutinefunction(execute_async):
+                        worker_result = await asyncio.wait_for(execute_async(step['task']), timeout)
+                    elif timeout is not None or session is not None:
+                        # 期限切れ時はスレッド側の同期ワーカーにキャンセルトークンで打ち切りを要求
+                        worker_result = await asyncio.to_thread(
+                            self._call_worker, worker, step['task'], timeout, session
+                        )
+                    else:
+                        # 同期ワーカーはイベントループを止めないようスレッドにオフロード
+                        worker_result = await asyncio.to_thread(worker.execute, step['task'])
+                await asyncio.to_thread(self._result_cache_store, cache_key, worker_result)
+                result = self._success_result(step, worker_result, cache="miss" if cache_key else None)
+                result.profile = session.summary if session is not None else None
+                return result
+
+            except (TimeoutError, asyncio.TimeoutError):
+                return self._timeout_result(step, timeout)
+
+            except Exception as e:
+                self._log(f"   [!] {worker_name} エラー: {e}")
+                return self._error_result(step, "実行中にエラーが発生しました", str(e))
+
+    def integrate_results(self, results: List[Dict[str, Any]]) -> PlanResult:
+        """結果を統合"""
+        aggregator = ResultAggregator(total_steps=len(results))
         for result in results:
-            status_icon = "[+]" if result["status"] == "success" else "[!]"
-            lines.append(f"{status_icon} ステップ {result['step']}: {result['output']}")
-        return "\n".join(lines)
+            aggregator.add(result)
+        return self._integrate(aggregator)
 
-    def process_task(self, task: str) -> Dict[str, Any]:
-        """タスクを処理"""
-        print(f"\n{'='*60}")
-        print(f"[*] オーケストレーター起動")
-        print(f"{'='*60}")
+    def _integrate(self, aggregator: ResultAggregator) -> PlanResult:
+        """逐次集計した結果から統合結果を作る"""
+        self._log(f"\n[*] 結果を統合中...")
 
-        # 1. タスク分析
-        subtasks = self.analyze_task(task)
+        integrated = aggregator.integrated()
 
-        # 2. 実行計画作成
-        plan = self.create_execution_plan(subtasks)
+        if self.decision_cache is not None:
+            integrated["cache"] = self.decision_cache.stats()
+        if self.result_cache is not None:
+            integrated["result_cache"] = self.result_cache.stats()
+        if self.scheduler is not None:
+            integrated["scheduler"] = self.scheduler.stats()
+        if self.broker is not None:
+            integrated["broker"] = self.broker.stats()
 
-        # 3. 実行
-        results = self.execute_plan(plan)
-
-        # 4. 結果統合
-        final_result = self.integrate_results(results)
+        return integrated
 
-        print(final_result["summary"])
-        print(f"\n{'='*60}")
-        print(f"[+] 完了")
-        print(f"{'='*60}\n")
+    def _generate_summary(self, results: List[Dict[str, Any]]) -> str:
+        """サマリーを生成"""
+        aggregator = ResultAggregator()
+        for result in results:
+            aggregator.add(result)
+        return aggregator.summary()
+
+    def iter_results(self, task: str,
+                     on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[Dict[str, Any]]:
+        """タスクを処理し、ステップの結果を完了した順に返す
+
+        各ステップについて {"event": "step", "result": ..., "completed_steps", "successful_steps",
+        "total_steps"} を返し、最後に {"event": "done", **統合結果} を返す。
+        途中でイテレーションをやめても、実行中のステップは最後まで実行される。
+        """
+        with self._span("analyze"):
+            subtasks = self.analyze_task(task)
+        with self._span("plan"):
+            plan = self.create_execution_plan(subtasks)
+
+        aggregator = ResultAggregator(total_steps=len(plan))
+        finished = queue.Queue()
+        done = object()
+
+        def run():
+            try:
+                with self._span("execute_plan", steps=len(plan)):
+                    self.execute_plan(plan, on_step=finished.put)
+            except Exception as e:
+                finished.put(e)
+            finally:
+                finished.put(done)
+
+        threading.Thread(target=run, name="iter_results", daemon=True).start()
+
+        while True:
+            item = finished.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            progress = aggregator.add(item)
+            if on_step is not None:
+                on_step(item)
+            yield {"event": "step", "result": to_dict(item), **progress}
+
+        with self._span("integrate"):
+            yield {"event": "done", **self._integrate(aggregator).to_dict()}
+
+    def process_task(self, task: str,
+                     on_step: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     profile: Any = None) -> Dict[str, Any]:
+        """タスクを処理し、統合結果をdictで返す（on_step はステップの結果が出るたびに呼ばれる）
+
+        profile に True（設定の profile を使う）か profile 設定のdictを渡すと、
+        対象のステップを cProfile / tracemalloc で計測する。False なら設定に関わらず計測しない。
+        """
+        self._log(f"\n{'='*60}")
+        self._log(f"[*] オーケストレーター起動")
+        self._log(f"{'='*60}")
+
+        with self._span("process_task", task=task):
+            # 1. タスク分析
+            with self._span("analyze"):
+                subtasks = self.analyze_task(task)
+
+            # 2. 実行計画作成
+            with self._span("plan"):
+                plan = self.create_execution_plan(subtasks)
+            if profile is not None:
+                plan = self._with_profiler(plan, profile)
+
+            # 3. 実行
+            with self._span("execute_plan", steps=len(plan)):
+                results = self.execute_plan(plan, on_step=on_step)
+
+            # 4. 結果統合
+            with self._span("integrate"):
+                final_result = self.integrate_results(results)
+
+        self._log(final_result["summary"])
+        self._log(f"\n{'='*60}")
+        self._log(f"[+] 完了")
+        self._log(f"{'='*60}\n")
+
+        return final_result.to_dict()
+
+    async def process_task_async(self, task: str) -> Dict[str, Any]:
+        """タスクを非同期に処理し、統合結果をdictで返す（asyncioサービスへの組み込み用）"""
+        self._log(f"\n{'='*60}")
+        self._log(f"[*] オーケストレーター起動（async）")
+        self._log(f"{'='*60}")
+
+        with self._span("process_task", task=task):
+            # 1. タスク分析
+            with self._span("analyze"):
+                subtasks = self.analyze_task(task)
+
+            # 2. 実行計画作成
+            with self._span("plan"):
+                plan = self.create_execution_plan(subtasks)
+
+            # 3. 実行
+            with self._span("execute_plan", steps=len(plan)):
+                results = await self.execute_plan_async(plan)
+
+            # 4. 結果統合
+            with self._span("integrate"):
+                final_result = self.integrate_results(results)
+
+        self._log(final_result["summary"])
+        self._log(f"\n{'='*60}")
+        self._log(f"[+] 完了")
+        self._log(f"{'='*60}\n")
+
+        return final_result.to_dict()
+
+    def process_tasks(self, tasks: Iterable[str], quiet: bool = True) -> Iterator[Dict[str, Any]]:
+        """複数タスクをまとめて処理し、完了したものから結果を返す
+
+        タスクは batch_size 件ずつ読み込み、同一文字列の分析は1回にまとめ、
+        必要なワーカーはチャンクごとに1回だけロードしてから実行する。
+        quiet はこの呼び出しの処理のログだけに効き、インスタンスの verbose は変えない。
+        """
+        batch_size = max(1, int(self.config.get("batch_size", 256)))
+        max_workers = max(1, int(self.config.get("max_workers", 3)))
+        # ジェネレータは呼び出し元のコンテキストで再開されるため、設定は専用のコンテキストの中でだけ行う
+        context = contextvars.copy_context()
+        context.run(_log_verbose.set, not quiet)
+
+        def run(function, *args):
+            """ログ表示の設定をしたコンテキストで実行（スレッドごとに複製して使う）"""
+            return context.copy().run(function, *args)
+
+        started = time.perf_counter()
+        run(self.warm_up)
+        self.batch_stats = {
+            "total_tasks": 0,
+            "successful_tasks": 0,
+            "steps_by_worker": {},
+            "elapsed_sec": 0.0,
+            "tasks_per_sec": 0.0
+        }
 
-        return final_result
+        iterator = iter(tasks)
+        index = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while True:
+                chunk = list(islice(iterator, batch_size))
+                if not chunk:
+                    break
+
+                # 1. 分析・計画（同一タスクは1回だけ分析）
+                # 計画の出力先は固定のファイル名なので、同時に実行するタスクどうしで上書きしないよう index を付ける
+                analyzed = {}
+                planned = []
+                for task in chunk:
+                    if task not in analyzed:
+                        analyzed[task] = run(self.analyze_task, task)
+                    plan = run(self.create_execution_plan, analyzed[task])
+                    planned.append((index, task, self._with_output_suffix(plan, index)))
+                    index += 1
+
+                # 2. ワーカーごとにまとめ、各ワーカーを1回だけロード
+                planned.sort(key=lambda item: item[2][0]["worker"] if item[2] else "")
+                for worker_name in sorted({step["worker"] for _, _, plan in planned for step in plan}):
+                    run(self._load_worker, worker_name)
+
+                # 3. 実行し、完了したものから返す
+                futures = {
+                    pool.submit(run, self.execute_plan, plan): (task_index, task)
+                    for task_index, task, plan in planned
+                }
+                for future in as_completed(futures):
+                    task_index, task = futures[future]
+                    results = future.result()
+                    integrated = run(self.integrate_results, results)
+                    self._record_batch_result(integrated, started)
+                    yield {"index": task_index, "task": task, **integrated.to_dict()}
+
+        stats = self.batch_stats
+        run(self._log, f"[*] バッチ完了: {stats['total_tasks']} タスク / {stats['elapsed_sec']:.2f} 秒"
+                       f"（{stats['tasks_per_sec']:.1f} タスク/秒）")
+
+    def _record_batch_result(self, integrated: Dict[str, Any], started: float):
+        """バッチのスループット統計を更新"""
+        stats = self.batch_stats
+        stats["total_tasks"] += 1
+        if integrated["status"] == "success":
+            stats["successful_tasks"] += 1
+        for result in integrated["results"]:
+            steps = stats["steps_by_worker"]
+            steps[result["worker"]] = steps.get(result["worker"], 0) + 1
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_sec"] = elapsed
+        stats["tasks_per_sec"] = stats["total_tasks"] / elapsed if elapsed > 0 else 0.0
 
 
 def main():
@@ -435,12 +1389,12 @@ def main():
         "詳細なコードレビューをしてください",  # opus (comprehensive_review)
     ]
 
-    for i, task in enumerate(test_tasks, 1):
+    # まとめて処理し、完了したものから結果を表示
+    for result in orchestrator.process_tasks(test_tasks, quiet=False):
         print(f"\n{'='*60}")
-        print(f"テスト {i}/{len(test_tasks)}")
+        print(f"テスト {result['index'] + 1}/{len(test_tasks)}: {result['task']}")
         print(f"{'='*60}")
-
-        result = orchestrator.process_task(task)
+        print(result["summary"])
 
         # 使用されたモデルを確認
         print(f"\n使用モデル:")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Profiler - ステップ単位の決定的プロファイリング
+
+選択したステップ（ワーカー・ステップ番号で指定）の実行を cProfile と tracemalloc で計測し、
+ステップごとの .pstats と割り当て上位のレポートを書き出す。
+ステップ結果の details にはホットスポットの要約を付ける。
+"""
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+DEFAULT_PROFILE = {
+    "enabled": False,
+    "workers": None,    # None なら全ワーカー
+    "steps": None,      # None なら全ステップ
+    "output_dir": None, # None ならタスクの出力ファイルと同じディレクトリ（なければ profiles/）
+    "top": 10
+}
+
+# tracemalloc はプロセスで1つしかないため、開始・停止だけをロックして計測中のセッション数を数える
+# （ステップの実行中はロックを持たないので、タイムアウトしたステップが他のステップの計測を止めることはない）
+_profile_lock = threading.Lock()
+_active_sessions = 0
+_started_sessions = 0     # これまでに開始したセッション数（重なりの検出用）
+_owns_tracemalloc = False  # 計測のために tracemalloc を開始したか
+
+# レポート名の連番（同じ秒・同じプロセスで始まったステップのレポートを区別する）
+_report_sequence = itertools.count(1)
+
+
+class StepProfiler:
+    """ステップを選択してプロファイルする"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初期化（config は DEFAULT_PROFILE と同じ形）"""
+        config = {**DEFAULT_PROFILE, **(config or {})}
+        self.workers = set(config["workers"]) if config["workers"] is not None else None
+        self.steps = set(config["steps"]) if config["steps"] is not None else None
+        self.output_dir = config["output_dir"]
+        self.top = int(config["top"])
+
+    def selects(self, step: Dict[str, Any]) -> bool:
+        """プロファイル対象のステップか"""
+        if self.workers is not None and step["worker"] not in self.workers:
+            return False
+        if self.steps is not None and step["step"] not in self.steps:
+            return False
+        return True
+
+    def session(self, step: Dict[str, Any]) -> "ProfileSession":
+        """1ステップ分の計測"""
+        return ProfileSession(self, step)
+
+    def report_dir(self, task: Dict[str, Any]) -> str:
+        """レポートの出力先"""
+        if self.output_dir is not None:
+            return self.output_dir
+        output_path = task.get("output_path")
+        if output_path:
+            return os.path.join(os.path.dirname(os.path.abspath(output_path)), "profiles")
+        return "profiles"
+
+
+class ProfileSession:
+    """with 文の間を計測し、終了時にレポートを書いて summary を作る"""
+
+    def __init__(self, profiler: StepProfiler, step: Dict[str, Any]):
+        """初期化"""
+        self.profiler = profiler
+        self.step = step
+        self.summary = None
+        self._profile = None
+        self._started = None
+        self._overlapped = False
+        self._started_count = 0
+
+    def __enter__(self) -> "ProfileSession":
+        global _active_sessions, _started_sessions, _owns_tracemalloc
+        with _profile_lock:
+            if _active_sessions == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _owns_tracemalloc = True
+                tracemalloc.reset_peak()
+            else:
+                # 他のステップを計測中: ピークメモリと割り当てにはそのステップの分も含まれる
+                self._overlapped = True
+            _active_sessions += 1
+            _started_sessions += 1
+            self._started_count = _started_sessions
+
+        # cProfile は実行スレッドだけを計測する（Python 3.12 以降で他の計測と重なった場合は省略する）
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError:
+            self._profile = None
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        global _active_sessions, _owns_tracemalloc
+        if self._profile is not None:
+            self._profile.disable()
+        wall_sec = time.perf_counter() - self._started
+        with _profile_lock:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if _active_sessions > 1 or _started_sessions != self._started_count:
+                self._overlapped = True
+            _active_sessions -= 1
+            if _active_sessions == 0 and _owns_tracemalloc:
+                tracemalloc.stop()
+                _owns_tracemalloc = False
+        self.summary = self._write_reports(wall_sec, peak, snapshot)
+        return False
+
+    def _write_reports(self, wall_sec: float, peak: int, snapshot: tracemalloc.Snapshot) -> Dict[str, Any]:
+        """.pstats と割り当てレポートを書き、要約を返す"""
+        top = self.profiler.top
+        report_dir = self.profiler.report_dir(self.step["task"])
+        os.makedirs(report_dir, exist_ok=True)
+        # ステップ番号は計画の中でしか一意でないため、実行ごとの識別子（時刻・プロセス・連番）を付ける
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{os.getpid()}-{next(_report_sequence)}"
+        base = os.path.join(report_dir, f"{run_id}_step{self.step['step']}_{_safe_name(self.step['worker'])}")
+
+        pstats_path = None
+        if self._profile is not None:
+            pstats_path = f"{base}.pstats"
+            self._profile.dump_stats(pstats_path)
+
+        allocations = _top_allocations(snapshot, top)
+        alloc_path = f"{base}_alloc.txt"
+        with open(alloc_path, 'w', encoding='utf-8') as f:
+            f.write(f"ステップ {self.step['step']} ({self.step['worker']}) の割り当て上位 {top} 件\n")
+            f.write(f"ピーク: {peak / 1024:.1f} KB\n")
+            if self._overlapped:
+                f.write("（同時に計測していた他のステップの割り当ても含みます）\n")
+            f.write("\n")
+            for item in allocations:
+                f.write(f"{item['size_kb']:>10.1f} KB {item['count']:>8} 回  {item['location']}\n")
+
+        return {
+            "wall_sec": round(wall_sec, 6),
+            "peak_kb": round(peak / 1024, 1),
+            "hotspots": _hotspots(self._profile, min(top, 5)) if self._profile is not None else [],
+            "top_allocations": allocations[:3],
+            "overlapped": self._overlapped,
+            "pstats": pstats_path,
+            "allocations": alloc_path
+        }
+
+
+def _safe_name(name: str) -> str:
+    """ファイル名に使える文字だけにする"""
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _hotspots(profile: cProfile.Profile, limit: int) -> List[Dict[str, Any]]:
+    """自身の実行時間（tottime）の上位の関数"""
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6)
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    """計測中に残っている割り当ての上位（行単位、tracemalloc 自身は除く）"""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ])
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
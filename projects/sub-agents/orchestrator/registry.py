@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Registry - ワーカー・スキルのプラグインレジストリ
+
+各プラグインの manifest.json（クラス名・対応タスクタイプ・モデルのヒント）を読むだけで、
+モジュールを実行せずにワーカーとスキルを把握する。manifest.json がない場合は
+ソースを構文解析してクラス名を推定する（実行はしない）。
+"""
+
+import ast
+import json
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+
+class PluginRegistry:
+    """manifest.json ベースのワーカー・スキルレジストリ"""
+
+    def __init__(self, base_path: Path):
+        """初期化（workers/ と skills/ のマニフェストを読み込む）"""
+        self.base_path = Path(base_path)
+        self.workers = self._scan("workers", "worker.py", "Worker")
+        self.skills = self._scan("skills", "skill.py", "Skill")
+
+    def _scan(self, kind: str, module_name: str, class_suffix: str) -> Dict[str, Dict[str, Any]]:
+        """ディレクトリ配下のプラグインを列挙"""
+        plugins = {}
+        root = self.base_path / kind
+        if not root.is_dir():
+            return plugins
+
+        for plugin_dir in sorted(root.iterdir()):
+            if not plugin_dir.is_dir():
+                continue
+
+            manifest_path = plugin_dir / "manifest.json"
+            if manifest_path.exists():
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            elif (plugin_dir / module_name).exists():
+                manifest = self._infer_manifest(plugin_dir / module_name, class_suffix)
+                if manifest is None:
+                    continue
+            else:
+                continue
+
+            manifest.setdefault("name", plugin_dir.name)
+            manifest.setdefault("module", module_name)
+            manifest.setdefault("task_types", [])
+            manifest.setdefault("model_hints", {})
+            manifest["path"] = str(plugin_dir / manifest["module"])
+            plugins[manifest["name"]] = manifest
+
+        return plugins
+
+    def _infer_manifest(self, module_path: Path, class_suffix: str) -> Optional[Dict[str, Any]]:
+        """マニフェストがない場合、ソースを構文解析してクラス名を推定"""
+        try:
+            tree = ast.parse(module_path.read_text(encoding="utf-8"))
+        except (OSError, SyntaxError):
+            return None
+
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef) and node.name.endswith(class_suffix):
+                return {
+                    "class_name": node.name,
+                    "module": module_path.name,
+                    "description": (ast.get_docstring(node) or "").strip()
+                }
+        return None
+
+    def get_worker(self, worker_name: str) -> Optional[Dict[str, Any]]:
+        """ワーカーのマニフェストを取得"""
+        return self.workers.get(worker_name)
+
+    def get_skill(self, skill_name: str) -> Optional[Dict[str, Any]]:
+        """スキルのマニフェストを取得"""
+        return self.skills.get(skill_name)
+
+    def workers_for_task_type(self, task_type: str) -> List[str]:
+        """タスクタイプに対応するワーカー名の一覧"""
+        return [name for name, manifest in self.workers.items() if task_type in manifest["task_types"]]
+
+    def model_hints(self) -> Dict[str, str]:
+        """全ワーカーのモデルのヒント（タスクタイプ -> モデル）"""
+        hints = {}
+        for manifest in self.workers.values():
+            for task_type, model in manifest["model_hints"].items():
+                hints.setdefault(task_type, model)
+        return hints
+
+
+def main():
+    """テスト用メイン関数"""
+    registry = PluginRegistry(Path(__file__).parent.parent)
+
+    print("ワーカー:")
+    for name, manifest in registry.workers.items():
+        print(f"  - {name}: {manifest['class_name']} {manifest['task_types']}")
+
+    print("\nスキル:")
+    for name, manifest in registry.skills.items():
+        print(f"  - {name}: {manifest['class_name']}")
+
+
+if __name__ == "__main__":
+    main()
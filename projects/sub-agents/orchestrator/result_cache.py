@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Result Cache - ワーカー出力のコンテンツアドレス型キャッシュ
+
+(ワーカー名, ワーカーのバージョン, 正規化したタスク) のハッシュをキーに、
+結果と生成物（.docx / .pptx）をディスクに保存する。合計サイズが上限を超えたら
+最後に使われた時刻が古いものから削除する。
+
+ヒット時の最終使用時刻はメモリ上で更新し、インデックスは保存・追い出しのとき、
+または flush_interval 秒ごと（と flush() / close() のとき）にだけ書き出す。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# キーに含めないタスクのフィールド（出力先やキャッシュ指定は生成物の中身に影響しない）
+VOLATILE_KEYS = {"output_path", "cache"}
+
+
+class ResultCache:
+    """ディスク上の結果キャッシュ（サイズ上限付きLRU）"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 500 * 1024 * 1024,
+                 flush_interval: float = 30.0):
+        """初期化"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.index_path = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self._dirty = False  # ヒットで更新した最終使用時刻が未保存か
+        self._saved_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """インデックス（キー -> サイズ・最終使用時刻）をロード"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        """インデックスを保存（ロック取得済み。書き込み途中で壊れないよう置き換える）"""
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """未保存の最終使用時刻があればインデックスを書き出す"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def close(self):
+        """終了時の書き出し"""
+        self.flush()
+
+    @staticmethod
+    def make_key(worker_name: str, worker_version: str, task: Dict[str, Any]) -> str:
+        """キャッシュキーを計算"""
+        canonical = json.dumps(
+            {
+                "worker": worker_name,
+                "version": worker_version,
+                "task": {k: v for k, v in task.items() if k not in VOLATILE_KEYS}
+            },
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        """エントリの保存先"""
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str, output_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """結果を取得し、生成物を output_path にコピーする（なければ None）"""
+        with self._lock:
+            entry = self._index.get(key)
+            entry_dir = self._entry_dir(key)
+            if entry is None or not (entry_dir / "result.json").exists():
+                self.misses += 1
+                return None
+
+            with open(entry_dir / "result.json", 'r', encoding='utf-8') as f:
+                result = json.load(f)
+
+            artifact = entry.get("artifact")
+            if artifact:
+                target = output_path or result["output"]["file_path"]
+                try:
+                    target_dir = os.path.dirname(target)
+                    if target_dir:
+                        os.makedirs(target_dir, exist_ok=True)
+                    shutil.copyfile(entry_dir / artifact, target)
+                except OSError:
+                    # 生成物が消えている・コピーできない場合はミス扱いにして作り直させる
+                    self.misses += 1
+                    return None
+                result["output"]["file_path"] = target
+
+            # ヒットのたびにインデックスを書き直さない（保存・追い出し時か flush_interval ごとに書き出す）
+            entry["last_used"] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= self.flush_interval:
+                self._save_index()
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """結果と生成物を保存
+
+        ファイルは書き込みごとの一時ディレクトリに書いてから、ロックを取って os.replace で入れ替える。
+        同じキーを同時に保存しても一時ファイルを共有せず、読み出し側が書きかけのファイルを見ることもない。
+        """
+        staging = Path(tempfile.mkdtemp(prefix=".put-", dir=self.cache_dir))
+        try:
+            artifact = None
+            file_path = result.get("output", {}).get("file_path") if isinstance(result.get("output"), dict) else None
+            if file_path and os.path.exists(file_path):
+                artifact = "artifact" + os.path.splitext(file_path)[1]
+                shutil.copyfile(file_path, staging / artifact)
+
+            with open(staging / "result.json", 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, default=str)
+
+            size = sum(p.stat().st_size for p in staging.iterdir())
+            entry_dir = self._entry_dir(key)
+            with self._lock:
+                entry_dir.mkdir(parents=True, exist_ok=True)
+                # 生成物を先に置き換え、result.json を最後にする（result.json があれば生成物もそろっている）
+                for name in sorted(os.listdir(staging), key=lambda name: name == "result.json"):
+                    os.replace(staging / name, entry_dir / name)
+                self._index[key] = {"size": size, "artifact": artifact, "last_used": time.time()}
+                self._evict()
+                self._save_index()
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _evict(self):
+        """合計サイズが上限を超えていれば古いものから削除（ロック取得済み）"""
+        total = sum(entry["size"] for entry in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._index.pop(key)["size"]
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Results - ステップ結果・計画結果のレコード
+
+結果ごとに details の入れ子dictを作らず、タスクとワーカー出力は参照だけを持つ
+（タスクはIDでも参照できる）。従来の結果dictと同じ形は to_dict() で作る。
+既存の呼び出し側のため、result["status"] のようなキーでのアクセスもできる。
+"""
+
+from typing import Dict, List, Any, Iterator, Optional
+
+# 従来の結果dictのキー
+STEP_KEYS = ("step", "worker", "model", "status", "output", "details")
+PLAN_KEYS = ("status", "total_steps", "successful_steps", "results", "summary")
+
+
+class _RecordMixin:
+    """キーでのアクセス（従来の結果dictとの互換）"""
+
+    __slots__ = ()
+    _keys = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """キーの値（なければ default）"""
+        return getattr(self, key) if key in self._keys else default
+
+    def keys(self) -> List[str]:
+        """キーの一覧"""
+        return list(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+
+class StepResult(_RecordMixin):
+    """1ステップの実行結果"""
+
+    __slots__ = ("step", "worker", "model", "status", "output", "task_id", "task",
+                 "error", "worker_output", "cache", "model_requested", "profile")
+    _keys = STEP_KEYS
+
+    def __init__(self, step: int, worker: str, model: str, status: str, output: str,
+                 task: Optional[Dict[str, Any]] = None, task_id: Optional[str] = None,
+                 error: Optional[str] = None, worker_output: Optional[Dict[str, Any]] = None,
+                 cache: Optional[str] = None, model_requested: Optional[str] = None,
+                 profile: Optional[Dict[str, Any]] = None):
+        """初期化（task・worker_output はコピーせず参照を持つ）"""
+        self.step = step
+        self.worker = worker
+        self.model = model
+        self.status = status
+        self.output = output
+        self.task = task
+        self.task_id = task_id if task_id is not None else task_id_of(task, step)
+        self.error = error
+        self.worker_output = worker_output
+        self.cache = cache
+        self.model_requested = model_requested
+        self.profile = profile
+
+    @property
+    def details(self) -> Dict[str, Any]:
+        """従来の details（呼ばれたときに作る）"""
+        return self._details(include_task=True)
+
+    def _details(self, include_task: bool) -> Dict[str, Any]:
+        """details を作る（include_task=False ならタスクはIDだけ）"""
+        details = {"task": self.task} if include_task else {"task_id": self.task_id}
+        details["model_used"] = self.model
+        if self.worker_output is not None:
+            details["worker_output"] = self.worker_output
+        if self.error is not None:
+            details["error"] = self.error
+        if self.cache is not None:
+            details["cache"] = self.cache
+        if self.model_requested is not None:
+            details["model_requested"] = self.model_requested
+        if self.profile is not None:
+            details["profile"] = self.profile
+        return details
+
+    def to_dict(self, include_task: bool = True) -> Dict[str, Any]:
+        """従来の結果dictに変換（include_task=False ならタスク本体の代わりに task_id を入れる）"""
+        return {
+            "step": self.step,
+            "worker": self.worker,
+            "model": self.model,
+            "status": self.status,
+            "output": self.output,
+            "details": self._details(include_task)
+        }
+
+    def __repr__(self) -> str:
+        return f"StepResult(step={self.step}, worker={self.worker!r}, status={self.status!r})"
+
+
+class PlanResult(_RecordMixin):
+    """実行計画全体の統合結果"""
+
+    __slots__ = ("status", "total_steps", "successful_steps", "results", "summary", "stats")
+    _keys = PLAN_KEYS
+
+    def __init__(self, results: List[Any], summary: str):
+        """初期化（results はステップ順の StepResult または従来の結果dict）"""
+        self.results = results
+        self.summary = summary
+        self.total_steps = len(results)
+        self.successful_steps = sum(1 for r in results if r["status"] == "success")
+        self.status = "success" if self.successful_steps == self.total_steps else "partial_success"
+        self.stats = {}  # cache / result_cache / scheduler などの統計
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.stats:
+            return self.stats[key]
+        return super().__getitem__(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._keys:
+            setattr(self, key, value)
+        else:
+            self.stats[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys or key in self.stats
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """キーの値（なければ default）"""
+        return self[key] if key in self else default
+
+    def keys(self) -> List[str]:
+        """キーの一覧"""
+        return list(self._keys) + list(self.stats)
+
+    def to_dict(self, include_task: bool = True) -> Dict[str, Any]:
+        """従来の統合結果dictに変換"""
+        return {
+            "status": self.status,
+            "total_steps": self.total_steps,
+            "successful_steps": self.successful_steps,
+            "results": [to_dict(r, include_task) for r in self.results],
+            "summary": self.summary,
+            **self.stats
+        }
+
+    def __repr__(self) -> str:
+        return f"PlanResult(status={self.status!r}, {self.successful_steps}/{self.total_steps})"
+
+
+def task_id_of(task: Optional[Dict[str, Any]], step: int) -> str:
+    """タスクのID（サブタスクの id、なければステップ番号）"""
+    if task is not None and "id" in task:
+        return str(task["id"])
+    return str(step)
+
+
+def to_dict(record: Any, include_task: bool = True) -> Any:
+    """StepResult / PlanResult を従来のdictに変換（dict などはそのまま）"""
+    if isinstance(record, (StepResult, PlanResult)):
+        return record.to_dict(include_task)
+    return record
+
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Router - キーワードによるタスクのルーティング
+
+設定で宣言したルーティングルールを Aho-Corasick オートマトンにコンパイルし、
+正規化したテキストを1回走査するだけで全キーワードのヒットを検出する。
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+
+# デフォルトのルーティングルール（rules は上から順に優先）
+DEFAULT_ROUTING = {
+    "rules": [
+        {
+            "name": "review",
+            "keywords": ["レビュー", "確認", "チェック"],
+            "handler": "review"
+        },
+        {
+            "name": "presentation",
+            "keywords": ["プレゼン", "スライド", "pptx", "powerpoint"],
+            "handler": "presentation"
+        },
+        {
+            "name": "document",
+            "keywords": ["文書", "ドキュメント", "word", "報告書", "議事録", "提案書"],
+            "handler": "document"
+        },
+        {
+            "name": "code",
+            "keywords": ["コード", "実装", "作成", "書く"],
+            "worker": "code_writer",
+            "type": "code_writing",
+            "description": "コードを生成する"
+        },
+        {
+            "name": "testing",
+            "keywords": ["テスト", "検証"],
+            "worker": "tester",
+            "type": "testing",
+            "description": "テストを実行する"
+        }
+    ],
+    "modifiers": {
+        "comprehensive": ["詳細", "包括", "徹底"],
+        "structure": ["構成", "提案", "アイデア"],
+        "minutes": ["議事録"],
+        "proposal": ["提案書"]
+    },
+    # 複数のルールにヒットしたときの分解（優先順位の上位のルールが rules と一致したら適用）
+    # stages の各段はサブタスクになり、depends_on の段の出力を inputs として受け取る
+    "pipelines": [
+        {
+            "name": "code_and_review",
+            "rules": ["code", "review"],
+            # 「コードレビュー」だけでは既存コードのレビューなので、書く意図があるときだけ分解する
+            "keywords": ["書い", "書く", "実装", "作成", "作って"],
+            "stages": [
+                {"id": "code", "rule": "code"},
+                {"id": "review", "rule": "review", "depends_on": ["code"]}
+            ]
+        },
+        {
+            "name": "document_and_slides",
+            "rules": ["document", "presentation"],
+            "unless_modifiers": ["structure"],
+            "stages": [
+                {"id": "outline", "rule": "document", "add_modifiers": ["structure"],
+                 "description": "文書と資料の構成を作る"},
+                {"id": "document", "rule": "document", "depends_on": ["outline"]},
+                {"id": "slides", "rule": "presentation", "depends_on": ["outline"]}
+            ]
+        }
+    ]
+}
+
+
+class AhoCorasick:
+    """複数キーワードを1回の走査で検出するオートマトン"""
+
+    def __init__(self, keywords: Iterable[str]):
+        """初期化（キーワードからオートマトンを構築）"""
+        self.keywords = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for keyword in dict.fromkeys(keywords):
+            if keyword:
+                self._add(keyword)
+        self._build_failure_links()
+
+    def _add(self, keyword: str):
+        """トライにキーワードを追加"""
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(len(self.keywords))
+        self.keywords.append(keyword)
+
+    def _build_failure_links(self):
+        """幅優先で失敗リンクを張り、出力を継承する"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(開始位置, キーワード) を出現順に返す"""
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self.keywords
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword_id in output[node]:
+                keyword = keywords[keyword_id]
+                yield position - len(keyword) + 1, keyword
+
+
+class KeywordRouter:
+    """ルーティングルールをコンパイルし、テキストのカテゴリと修飾子を判定する"""
+
+    def __init__(self, routing: Dict[str, Any]):
+        """初期化（ルールを1つのオートマトンにコンパイル）"""
+        self.rules = routing.get("rules", [])
+        self.modifiers = routing.get("modifiers", {})
+        self.pipelines = routing.get("pipelines", [])
+        self._priority = {rule["name"]: i for i, rule in enumerate(self.rules)}
+
+        # キーワード → ラベル（("rule", 名前) / ("modifier", 名前) / ("pipeline", 名前)）
+        self._labels = {}
+        for rule in self.rules:
+            for keyword in rule.get("keywords", []):
+                self._labels.setdefault(self.normalize(keyword), []).append(("rule", rule["name"]))
+        for name, keywords in self.modifiers.items():
+            for keyword in keywords:
+                self._labels.setdefault(self.normalize(keyword), []).append(("modifier", name))
+        for pipeline in self.pipelines:
+            for keyword in pipeline.get("keywords", []):
+                self._labels.setdefault(self.normalize(keyword), []).append(("pipeline", pipeline["name"]))
+
+        self._automaton = AhoCorasick(self._labels)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """照合用にテキストを正規化（NFKC・小文字化・空白の統一）
+
+        判定キャッシュのキーにも使うため、正規化後が同じテキストは必ず同じルーティングになる。
+        """
+        return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+    def match(self, text: str, normalized: bool = False) -> Dict[str, Any]:
+        """テキストを1回走査し、ヒットしたルール（優先順）と修飾子を返す
+
+        より長いキーワードのヒットに含まれるヒットは数えない（「提案書」の中の「提案」など）。
+        normalized=True なら text は normalize 済みとして扱う。
+        """
+        if not normalized:
+            text = self.normalize(text)
+        found = {"rule": set(), "modifier": set(), "pipeline": set()}
+        hits = []
+        covered_until = -1
+        matches = sorted(self._automaton.iter_matches(text), key=lambda m: (m[0], -len(m[1])))
+        for position, keyword in matches:
+            end = position + len(keyword)
+            if end <= covered_until:
+                continue
+            covered_until = end
+            hits.append({"position": position, "keyword": keyword})
+            for kind, name in self._labels[keyword]:
+                found[kind].add(name)
+
+        return {
+            "rules": sorted(found["rule"], key=self._priority.__getitem__),
+            "modifiers": sorted(found["modifier"]),
+            "pipelines": sorted(found["pipeline"]),
+            "hits": hits
+        }
+
+    def get_rule(self, name: str) -> Dict[str, Any]:
+        """名前からルール定義を取得"""
+        return self.rules[self._priority[name]]
+
+    def match_pipeline(self, match: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """判定結果に当てはまる分解パイプラインを返す（なければ None）
+
+        ヒットしたルールのうち優先順位の上位 len(rules) 個が pipeline の rules と一致するものを選ぶ。
+        「作成」のように広く当たるキーワードで下位のルールが混ざっても、分解の判定には影響しない。
+        pipeline に keywords があれば、そのいずれかにもヒットしている必要がある。
+        """
+        for pipeline in self.pipelines:
+            rules = set(pipeline["rules"])
+            if set(match["rules"][:len(rules)]) != rules:
+                continue
+            if pipeline.get("keywords") and pipeline["name"] not in match.get("pipelines", []):
+                continue
+            if set(pipeline.get("unless_modifiers", [])) & set(match["modifiers"]):
+                continue
+            return pipeline
+        return None
+
+
+def main():
+    """テスト用メイン関数"""
+    router = KeywordRouter(DEFAULT_ROUTING)
+
+    for text in [
+        "プレゼンの構成を提案してください",
+        "報告書の文書を作成してください",
+        "詳細なコードレビューをしてください",
+        "議事録をWordで作成",
+        "コードを書いてレビューして",
+        "報告書とプレゼン資料を作成",
+    ]:
+        result = router.match(text)
+        pipeline = router.match_pipeline(result)
+        print(f"{text}\n  ルール: {result['rules']}  修飾子: {result['modifiers']}"
+              f"  分解: {pipeline['name'] if pipeline else '-'}")
+
+
+if __name__ == "__main__":
+    main()
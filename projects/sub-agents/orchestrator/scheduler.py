@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Scheduler - モデル階層（haiku/sonnet/opus）ごとの実行スケジューラ
+
+階層ごとに同時実行数とトークンバケットによるレート制限をかけ、超過分は待ち行列に並べる。
+待ち時間の見積もりがレイテンシSLOを超える場合は、下位の階層に格下げするポリシーを選べる。
+スレッドからは acquire、イベントループからは acquire_async で同じ実行枠を使う。
+枠が空くのを待つ側は並んだ順に起こされ、返された枠はそのまま次の待ち手に渡る（ポーリングしない）。
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Any, Optional
+
+# デフォルトの階層設定
+DEFAULT_SCHEDULER = {
+    "enabled": False,
+    "tiers": {
+        "haiku": {"concurrency": 8, "rate_per_sec": 20.0, "burst": 20, "expected_latency_sec": 2.0},
+        "sonnet": {"concurrency": 4, "rate_per_sec": 5.0, "burst": 10, "expected_latency_sec": 8.0},
+        "opus": {"concurrency": 1, "rate_per_sec": 1.0, "burst": 2, "expected_latency_sec": 20.0}
+    },
+    "latency_slo_sec": 30.0,
+    "downgrade": True,
+    "downgrade_order": ["opus", "sonnet", "haiku"]
+}
+
+
+class TokenBucket:
+    """トークンバケット（rate_per_sec で補充、最大 burst 個）"""
+
+    def __init__(self, rate_per_sec: float, burst: float):
+        """初期化"""
+        self.rate = float(rate_per_sec)
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """経過時間分のトークンを補充（ロック取得済み）"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、使えるようになるまでの待ち秒数を返す"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0 or self.rate <= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def expected_wait(self) -> float:
+        """今予約した場合の待ち秒数（予約はしない）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1 or self.rate <= 0:
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class _Slots:
+    """スレッドとイベントループで共有する実行枠（返された枠は待っている先頭に直接渡す）
+
+    asyncio.Condition はイベントループごとのものでスレッドからは通知できないため、
+    イベントループで待つ側は Future を並べ、返却側が loop.call_soon_threadsafe で起こす。
+    """
+
+    def __init__(self, count: int):
+        """初期化"""
+        self._free = count
+        self._lock = threading.Lock()
+        self._waiters = deque()  # (ループ or None, Future or threading.Event)
+
+    def acquire(self):
+        """枠を確保（空くまでスレッドをブロック）"""
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append((None, event))
+        event.wait()
+
+    async def acquire_async(self):
+        """枠を確保（空くまでイベントループを止めずに待つ）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # すでに枠を渡されていれば返す（渡す途中なら Future を取り消し、_hand_over に返させる）
+            if not future.cancel() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """枠を返す（待っている先頭があればそのまま渡す）"""
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if loop is None:
+                    waiter.set()
+                    return
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, waiter)
+                    return
+                except RuntimeError:
+                    # 待っていたイベントループが閉じている
+                    continue
+            self._free += 1
+
+    def _hand_over(self, future: "asyncio.Future"):
+        """イベントループの中で待ち手に枠を渡す（取り消されていれば次に回す）"""
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class _TierState:
+    """1つの階層の実行枠と統計"""
+
+    def __init__(self, name: str, concurrency: int, rate_per_sec: float, burst: float,
+                 expected_latency: Optional[float] = None):
+        """初期化"""
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.slots = _Slots(self.concurrency)
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.downgraded_in = 0
+        self.downgraded_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.avg_latency = expected_latency  # 実行時間の指数移動平均（秒）。初期値は設定の見込み値
+
+
+class TierScheduler:
+    """モデル階層ごとの同時実行数・レート制限・格下げを管理する"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初期化"""
+        config = {**DEFAULT_SCHEDULER, **(config or {})}
+        self.latency_slo = float(config["latency_slo_sec"])
+        self.downgrade = bool(config["downgrade"])
+        self.downgrade_order = list(config["downgrade_order"])
+        self._lock = threading.Lock()
+        self.tiers = {
+            name: _TierState(
+                name,
+                tier.get("concurrency", 1),
+                tier.get("rate_per_sec", 0),
+                tier.get("burst", 1),
+                tier.get("expected_latency_sec")
+            )
+            for name, tier in config["tiers"].items()
+        }
+
+    def estimated_wait(self, tier: str) -> float:
+        """この階層に今並んだ場合の待ち時間の見積もり（秒）"""
+        state = self.tiers[tier]
+        with self._lock:
+            # 実行時間の見込みがない階層は待ち行列では待たないものとみなす
+            latency = state.avg_latency or 0.0
+            # 自分より前にいる実行中・待機中のうち、空き枠を超える分だけ待つ
+            ahead = max(0, state.queued + state.running - state.concurrency + 1)
+            queue_wait = ahead * latency / state.concurrency
+        return queue_wait + state.bucket.expected_wait()
+
+    def choose_tier(self, tier: str) -> str:
+        """格下げポリシーを適用して実際に使う階層を選ぶ"""
+        if tier not in self.tiers or not self.downgrade or tier not in self.downgrade_order:
+            return tier
+        if self.estimated_wait(tier) <= self.latency_slo:
+            return tier
+
+        # 下位の階層でSLO内に収まるものがあれば格下げする
+        for lower in self.downgrade_order[self.downgrade_order.index(tier) + 1:]:
+            if lower in self.tiers and self.estimated_wait(lower) <= self.latency_slo:
+                with self._lock:
+                    self.tiers[tier].downgraded_out += 1
+                    self.tiers[lower].downgraded_in += 1
+                return lower
+        return tier
+
+    @contextmanager
+    def acquire(self, tier: str):
+        """実行枠を確保し、実際に使う階層を返す（with ブロックの間だけ確保）"""
+        if tier not in self.tiers:
+            yield tier
+            return
+
+        tier = self.choose_tier(tier)
+        state = self.tiers[tier]
+        enqueued = self._enqueue(state)
+        try:
+            state.slots.acquire()
+            delay = state.bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                state.queued -= 1
+
+        started = self._start(state, enqueued)
+        try:
+            yield tier
+        finally:
+            self._finish(state, started)
+
+    @asynccontextmanager
+    async def acquire_async(self, tier: str):
+        """acquire の asyncio 版（枠の空き・レート制限を待つ間もイベントループを止めない）"""
+        if tier not in self.tiers:
+            yield tier
+            return
+
+        tier = self.choose_tier(tier)
+        state = self.tiers[tier]
+        enqueued = self._enqueue(state)
+        try:
+            # スレッドの経路と同じ実行枠を使い、枠が返されたときに起こされる
+            await state.slots.acquire_async()
+            try:
+                delay = state.bucket.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            except BaseException:
+                state.slots.release()
+                raise
+        finally:
+            with self._lock:
+                state.queued -= 1
+
+        started = self._start(state, enqueued)
+        try:
+            yield tier
+        finally:
+            self._finish(state, started)
+
+    def _enqueue(self, state: _TierState) -> float:
+        """待ち行列に並び、並んだ時刻を返す"""
+        with self._lock:
+            state.queued += 1
+        return time.monotonic()
+
+    def _start(self, state: _TierState, enqueued: float) -> float:
+        """実行枠を確保できたときの統計を更新し、開始時刻を返す"""
+        waited = time.monotonic() - enqueued
+        with self._lock:
+            state.running += 1
+            state.total_wait += waited
+            state.max_wait = max(state.max_wait, waited)
+        return time.monotonic()
+
+    def _finish(self, state: _TierState, started: float):
+        """実行枠を返し、実行時間の移動平均を更新する"""
+        latency = time.monotonic() - started
+        with self._lock:
+            state.running -= 1
+            state.completed += 1
+            state.avg_latency = latency if state.avg_latency is None else (
+                0.8 * state.avg_latency + 0.2 * latency
+            )
+        state.slots.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """階層ごとの待ち行列の長さ・待ち時間などの統計"""
+        with self._lock:
+            return {
+                name: {
+                    "queue_depth": state.queued,
+                    "running": state.running,
+                    "completed": state.completed,
+                    "avg_wait_ms": state.total_wait / state.completed * 1000 if state.completed else 0.0,
+                    "max_wait_ms": state.max_wait * 1000,
+                    "avg_latency_ms": (state.avg_latency or 0.0) * 1000,
+                    "downgraded_in": state.downgraded_in,
+                    "downgraded_out": state.downgraded_out
+                }
+                for name, state in self.tiers.items()
+            }
+
+
+class SimulatedBackend:
+    """階層ごとのレイテンシを模擬するローカルのモデルバックエンド（検証用）"""
+
+    def __init__(self, latencies: Optional[Dict[str, float]] = None, jitter: float = 0.2, seed: int = 0):
+        """初期化"""
+        self.latencies = latencies or {"haiku": 0.05, "sonnet": 0.2, "opus": 0.8}
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def execute(self, tier: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        """階層のレイテンシ分だけ待って結果を返す"""
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        latency = self.latencies.get(tier, 0.1) * factor
+        time.sleep(latency)
+        return {"status": "success", "tier": tier, "latency_sec": latency, "task": task.get("type")}
+
+
+def main():
+    """テスト用メイン関数: opus への集中を模擬し、格下げと待ち時間を確認する"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    scheduler = TierScheduler({
+        "tiers": {
+            "haiku": {"concurrency": 8, "rate_per_sec": 50, "burst": 50, "expected_latency_sec": 0.05},
+            "sonnet": {"concurrency": 4, "rate_per_sec": 20, "burst": 20, "expected_latency_sec": 0.2},
+            "opus": {"concurrency": 1, "rate_per_sec": 5, "burst": 2, "expected_latency_sec": 0.8}
+        },
+        "latency_slo_sec": 2.0
+    })
+    backend = SimulatedBackend()
+
+    def run(i: int) -> str:
+        with scheduler.acquire("opus") as tier:
+            backend.execute(tier, {"type": "comprehensive_review"})
+            return tier
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        tiers: List[str] = list(pool.map(run, range(20)))
+
+    print(f"20件の comprehensive_review: {time.monotonic() - started:.2f} 秒")
+    print(f"使用階層: { {t: tiers.count(t) for t in set(tiers)} }")
+    for name, stats in scheduler.stats().items():
+        print(f"  {name}: 完了 {stats['completed']} / 平均待ち {stats['avg_wait_ms']:.0f} ms"
+              f" / 最大待ち {stats['max_wait_ms']:.0f} ms / 格下げ {stats['downgraded_out']}→ {stats['downgraded_in']}←")
+
+
+if __name__ == "__main__":
+    main()
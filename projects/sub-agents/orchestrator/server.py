@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Server - オーケストレーターを常駐させるローカルサーバーと軽量クライアント
+
+Orchestrator・ロード済みのワーカー・python-docx / python-pptx・スライドのスタイルを
+メモリに載せたまま、Unixソケット（または localhost のTCPポート）でタスクを受け付ける。
+プロトコルは1行1JSON: クライアントが要求を1行送り、サーバーはイベントを1行ずつ返す
+（最後の行の event が "done" または "error"）。
+
+TCPはループバックでだけ待ち受ける。トークン（--token か環境変数 SUB_AGENTS_SERVER_TOKEN）を設定すると、
+ファイルを生成する操作とサーバーの終了にはそのトークンが必要になる（TCPで未設定なら使い捨てのトークンを作る）。
+
+使い方:
+    python3 server.py serve [--socket /tmp/orchestrator.sock | --port 8765]
+    python3 server.py client [--socket ... | --port ...] "報告書を作成してください" ...
+    python3 server.py client --slides slides.json
+    python3 server.py client --stats
+"""
+
+import argparse
+import hmac
+import importlib
+import ipaddress
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+# クライアントは標準ライブラリだけで動く（オーケストレーターは serve のときだけ読み込む）
+ORCHESTRATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(os.path.dirname(ORCHESTRATOR_DIR), "tools")
+DEFAULT_SOCKET = "/tmp/sub-agents-orchestrator.sock"
+
+# 起動時にロードしておくワーカー
+DEFAULT_PRELOAD = ["document_writer", "presentation_builder"]
+
+# トークンを読む環境変数と、トークンが必要な操作（ファイルの生成・サーバーの終了）
+TOKEN_ENV = "SUB_AGENTS_SERVER_TOKEN"
+PROTECTED_OPS = {"process", "process_many", "slides", "shutdown"}
+
+
+def _is_loopback(host: str) -> bool:
+    """ループバックアドレスか（localhost を含む）"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _json_default(value: Any) -> Any:
+    """結果レコード（StepResult / PlanResult）は従来のdictとして送る"""
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """1接続分の要求を処理"""
+
+    def handle(self):
+        """要求を1行ずつ読み、結果のイベントを1行ずつ返す"""
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                for event in self.server.app.handle(request):
+                    self._send(event)
+            except (BrokenPipeError, ConnectionResetError):
+                # クライアントが途中で切断した
+                return
+            except Exception as e:
+                self._send({"event": "error", "error": str(e)})
+
+    def _send(self, event: Dict[str, Any]):
+        """イベントを1行のJSONとして送信"""
+        self.wfile.write(json.dumps(event, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class OrchestratorServer:
+    """オーケストレーターを常駐させて要求を処理するサーバー"""
+
+    def __init__(self, orchestrator, preload: Optional[List[str]] = None, token: Optional[str] = None):
+        """初期化（token が None なら環境変数 SUB_AGENTS_SERVER_TOKEN、それもなければトークンなし）"""
+        self.orchestrator = orchestrator
+        self.token = token or os.environ.get(TOKEN_ENV) or None
+        if preload is None:
+            preload = orchestrator.config.get("prewarm", {}).get("warm_set") or DEFAULT_PRELOAD
+        self.preload = preload
+        self.started = time.time()
+        self.requests = 0
+        self._batch_lock = threading.Lock()  # process_tasks はバッチ統計を共有するため1つずつ
+        self._server = None
+        self._slide_generator = None
+
+    def warm_up(self):
+        """ワーカーのロードと重い依存のインポートを先に済ませる"""
+        started = time.perf_counter()
+        self.orchestrator.warm_up(self.preload)
+        try:
+            self._slide_generator_module().load_style()
+        except ImportError:
+            pass
+        print(f"[server] ウォームアップ完了: {time.perf_counter() - started:.2f} 秒")
+
+    def _slide_generator_module(self):
+        """tools/slide_generator.py をロード（常駐中は使い回す）"""
+        if self._slide_generator is None:
+            if TOOLS_DIR not in sys.path:
+                sys.path.insert(0, TOOLS_DIR)
+            self._slide_generator = importlib.import_module("slide_generator")
+        return self._slide_generator
+
+    def handle(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """要求を処理し、イベントを順に返す"""
+        self.requests += 1
+        op = request.get("op", "process")
+        started = time.perf_counter()
+
+        if op in PROTECTED_OPS and not self._authorized(request):
+            yield {"event": "error", "error": f"トークンが一致しないため実行できません: {op}"}
+            return
+
+        if op == "ping":
+            yield {"event": "done", "pong": True}
+        elif op == "process":
+            # ステップが終わるたびに step イベントを送り、最後に統合結果を送る
+            for event in self.orchestrator.iter_results(request["task"]):
+                if event["event"] == "step":
+                    yield event
+                else:
+                    yield {**event, "event": "result", "task": request["task"]}
+            yield {"event": "done", "elapsed_ms": (time.perf_counter() - started) * 1000}
+        elif op == "process_many":
+            with self._batch_lock:
+                for result in self.orchestrator.process_tasks(request["tasks"]):
+                    yield {"event": "result", **result}
+                stats = dict(self.orchestrator.batch_stats)
+            yield {"event": "done", "stats": stats, "elapsed_ms": (time.perf_counter() - started) * 1000}
+        elif op == "slides":
+            output_path = self._slide_generator_module().generate_pptx(request["json_path"])
+            yield {"event": "done", "output_path": str(output_path),
+                   "elapsed_ms": (time.perf_counter() - started) * 1000}
+        elif op == "stats":
+            yield {"event": "done", **self.stats()}
+        elif op == "shutdown":
+            yield {"event": "done", "shutdown": True}
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        else:
+            yield {"event": "error", "error": f"不明な操作です: {op}"}
+
+    def _authorized(self, request: Dict[str, Any]) -> bool:
+        """トークンが不要か、要求のトークンが一致するか"""
+        if self.token is None:
+            return True
+        return hmac.compare_digest(str(request.get("token", "")).encode(), self.token.encode())
+
+    def stats(self) -> Dict[str, Any]:
+        """サーバーの状態"""
+        orchestrator = self.orchestrator
+        stats = {
+            "uptime_sec": time.time() - self.started,
+            "requests": self.requests,
+            "workers": sorted(orchestrator.worker_instances)
+        }
+        if orchestrator.decision_cache is not None:
+            stats["cache"] = orchestrator.decision_cache.stats()
+        if orchestrator.result_cache is not None:
+            stats["result_cache"] = orchestrator.result_cache.stats()
+        return stats
+
+    def serve(self, socket_path: Optional[str] = None, host: str = "127.0.0.1", port: Optional[int] = None):
+        """Unixソケット（port 指定時はTCP）で待ち受ける
+
+        TCPはループバック以外のアドレスでは ValueError で起動しない。ローカルの他のユーザーも接続できるため、
+        トークンが未設定なら使い捨てのトークンを作って表示する。Unixソケットは所有者だけが読み書きできるようにする。
+        """
+        if port is not None:
+            if not _is_loopback(host):
+                raise ValueError(f"TCPはループバックのアドレスでだけ待ち受けます: {host}")
+            if self.token is None:
+                self.token = secrets.token_urlsafe(16)
+                print(f"[server] トークンの指定がないため使い捨てのトークンを作りました: {TOKEN_ENV}={self.token}",
+                      flush=True)
+            self._server = _TCPServer((host, port), _RequestHandler)
+            address = f"{host}:{self._server.server_address[1]}"
+        else:
+            socket_path = socket_path or DEFAULT_SOCKET
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self._server = _UnixServer(socket_path, _RequestHandler)
+            os.chmod(socket_path, 0o600)
+            address = socket_path
+        self._server.app = self
+        print(f"[server] 待ち受け開始: {address}", flush=True)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if port is None and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def shutdown(self):
+        """待ち受けを終了"""
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class OrchestratorClient:
+    """サーバーに要求を送る軽量クライアント"""
+
+    def __init__(self, socket_path: Optional[str] = None, host: str = "127.0.0.1",
+                 port: Optional[int] = None, timeout: Optional[float] = None, token: Optional[str] = None):
+        """初期化（token が None なら環境変数 SUB_AGENTS_SERVER_TOKEN）"""
+        self.socket_path = socket_path or DEFAULT_SOCKET
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.token = token or os.environ.get(TOKEN_ENV) or None
+
+    def _connect(self) -> socket.socket:
+        """サーバーに接続"""
+        if self.port is not None:
+            return socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def request(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """要求を送り、イベントを受け取った順に返す"""
+        if self.token is not None:
+            request = {**request, "token": self.token}
+        with self._connect() as sock, sock.makefile("rb") as reader:
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            for line in reader:
+                event = json.loads(line)
+                yield event
+                if event["event"] in ("done", "error"):
+                    return
+
+    def _last(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """最後のイベントを返す（エラーなら例外）"""
+        event = {}
+        for event in self.request(request):
+            pass
+        if event.get("event") == "error":
+            raise RuntimeError(event["error"])
+        return event
+
+    def process(self, task: str, on_step=None) -> Dict[str, Any]:
+        """タスクを1つ処理（on_step はステップの結果を受信するたびに呼ばれる）"""
+        result = None
+        for event in self.request({"op": "process", "task": task}):
+            if event["event"] == "step" and on_step is not None:
+                on_step(event)
+            elif event["event"] == "result":
+                result = event
+            elif event["event"] == "error":
+                raise RuntimeError(event["error"])
+        if result is None:
+            raise RuntimeError("結果を受信できませんでした")
+        return result
+
+    def process_many(self, tasks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """複数のタスクを処理し、完了したものから返す"""
+        for event in self.request({"op": "process_many", "tasks": list(tasks)}):
+            if event["event"] == "result":
+                yield event
+            elif event["event"] == "error":
+                raise RuntimeError(event["error"])
+
+    def slides(self, json_path: str) -> str:
+        """JSONからPPTXを生成し、出力パスを返す"""
+        return self._last({"op": "slides", "json_path": os.path.abspath(json_path)})["output_path"]
+
+    def ping(self) -> bool:
+        """サーバーが応答するか"""
+        return self._last({"op": "ping"}).get("pong", False)
+
+    def stats(self) -> Dict[str, Any]:
+        """サーバーの状態"""
+        return self._last({"op": "stats"})
+
+    def shutdown(self):
+        """サーバーを終了"""
+        self._last({"op": "shutdown"})
+
+
+def main() -> int:
+    """コマンドライン: サーバーの起動・クライアントからの要求"""
+    address = argparse.ArgumentParser(add_help=False)
+    address.add_argument("--socket", default=None, help=f"Unixソケットのパス（デフォルト {DEFAULT_SOCKET}）")
+    address.add_argument("--port", type=int, default=None, help="TCPで待ち受ける場合のポート（127.0.0.1）")
+    address.add_argument("--token", default=None, help=f"トークン（省略時は環境変数 {TOKEN_ENV}）")
+
+    parser = argparse.ArgumentParser(description="オーケストレーターの常駐サーバー")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", parents=[address], help="サーバーを起動")
+    serve.add_argument("--config", default="config.json", help="オーケストレーターの設定ファイル")
+    serve.add_argument("--preload", nargs="*", default=None, help="起動時にロードするワーカー")
+
+    client = commands.add_parser("client", parents=[address], help="サーバーに要求を送る")
+    client.add_argument("tasks", nargs="*", help="タスク")
+    client.add_argument("--slides", default=None, help="PPTXを生成するJSONファイル")
+    client.add_argument("--stats", action="store_true", help="サーバーの状態を表示")
+    client.add_argument("--shutdown", action="store_true", help="サーバーを終了")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        sys.path.insert(0, ORCHESTRATOR_DIR)
+        from orchestrator import Orchestrator
+
+        orchestrator = Orchestrator(args.config)
+        orchestrator.verbose = False
+        server = OrchestratorServer(orchestrator, preload=args.preload, token=args.token)
+        server.warm_up()
+        try:
+            server.serve(socket_path=args.socket, port=args.port)
+        except KeyboardInterrupt:
+            pass
+        except ValueError as e:
+            print(f"[!] {e}", file=sys.stderr)
+            return 2
+        finally:
+            orchestrator.close()
+        return 0
+
+    client = OrchestratorClient(socket_path=args.socket, port=args.port, token=args.token)
+    if args.stats:
+        print(json.dumps(client.stats(), ensure_ascii=False, indent=2))
+    elif args.shutdown:
+        client.shutdown()
+    elif args.slides:
+        print(f"保存完了: {client.slides(args.slides)}")
+    else:
+        for result in client.process_many(args.tasks):
+            print(result["summary"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
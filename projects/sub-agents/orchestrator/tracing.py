@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tracing - 処理フェーズごとのスパン計測
+
+各スパンの経過時間・CPU時間（実行スレッド）・プロセスのピークRSS（累積）とスパン中のその増分を記録し、
+Chrome / Perfetto のトレースJSONやローテーション付きJSONLとして出力する。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_kb() -> Optional[int]:
+    """プロセス開始からのピークRSS（KB、macOS の ru_maxrss はバイト単位なので換算する）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class JsonlSpanWriter:
+    """スパンを1行1JSONで追記し、サイズ上限でローテーションする"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        """初期化"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        """1スパンを追記"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def _rotate(self):
+        """trace.jsonl -> trace.jsonl.1 -> ... と世代をずらす"""
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class Tracer:
+    """スパンを記録するトレーサー"""
+
+    def __init__(self, jsonl_path: Optional[str] = None, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 3):
+        """初期化"""
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._writer = JsonlSpanWriter(jsonl_path, max_bytes, backup_count) if jsonl_path else None
+
+    @contextmanager
+    def span(self, name: str, category: str = "orchestrator", **args):
+        """with ブロックの処理をスパンとして記録"""
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        rss_started = _peak_rss_kb()
+        try:
+            yield
+        finally:
+            # ru_maxrss はプロセス全体の累積の最大値のため、スパン単体の値としては増分（ピークを更新した分）を記録する
+            peak_rss = _peak_rss_kb()
+            record = {
+                "name": name,
+                "category": category,
+                "start_ms": (started - self._origin) * 1000,
+                "wall_ms": (time.perf_counter() - started) * 1000,
+                "cpu_ms": (time.thread_time() - cpu_started) * 1000,
+                "process_peak_rss_kb": peak_rss,
+                "peak_rss_growth_kb": peak_rss - rss_started if peak_rss is not None else None,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args
+            }
+            with self._lock:
+                self.spans.append(record)
+            if self._writer is not None:
+                self._writer.write(record)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome / Perfetto のトレース形式（Complete イベント）に変換"""
+        with self._lock:
+            spans = list(self.spans)
+
+        events = []
+        for span in spans:
+            events.append({
+                "name": span["name"],
+                "cat": span["category"],
+                "ph": "X",
+                "ts": span["start_ms"] * 1000,
+                "dur": span["wall_ms"] * 1000,
+                "pid": span["pid"],
+                "tid": span["tid"],
+                "args": {
+                    "cpu_ms": round(span["cpu_ms"], 3),
+                    "process_peak_rss_kb": span["process_peak_rss_kb"],
+                    "peak_rss_growth_kb": span["peak_rss_growth_kb"],
+                    **span["args"]
+                }
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str):
+        """Chrome / Perfetto のトレースJSONを書き出す（chrome://tracing や ui.perfetto.dev で開く）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """スパン名ごとの合計時間（経過時間の降順）"""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                total = totals.setdefault(span["name"], {"name": span["name"], "count": 0,
+                                                          "wall_ms": 0.0, "cpu_ms": 0.0})
+                total["count"] += 1
+                total["wall_ms"] += span["wall_ms"]
+                total["cpu_ms"] += span["cpu_ms"]
+        return sorted(totals.values(), key=lambda t: t["wall_ms"], reverse=True)
+
+    def clear(self):
+        """記録済みのスパンを破棄"""
+        with self._lock:
+            self.spans = []
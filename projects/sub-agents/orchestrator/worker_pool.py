@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Worker Pool - ワーカーを常駐プロセスで実行するバックエンド
+
+ワーカーモジュールをインポート・初期化済みの子プロセスをあらかじめ起動しておき、
+タスクと結果をパイプでやり取りする。子プロセスが異常終了した場合は再起動する。
+"""
+
+import importlib.util
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+def _worker_main(conn, worker_name: str, worker_path: str, class_name: str):
+    """子プロセスのメインループ"""
+    try:
+        spec = importlib.util.spec_from_file_location(f"{worker_name}_worker", worker_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        worker = getattr(module, class_name)()
+    except Exception as e:
+        conn.send(("error", f"ワーカーの初期化に失敗: {e}"))
+        conn.close()
+        return
+
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        try:
+            conn.send(("ok", worker.execute(task)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+    conn.close()
+
+
+class _WorkerProcess:
+    """パイプで接続された1つのワーカープロセス"""
+
+    def __init__(self, context, worker_name: str, worker_path: str, class_name: str):
+        """初期化（プロセスを起動し、初期化完了を待つ）"""
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, worker_name, worker_path, class_name),
+            name=f"{worker_name}-worker",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        status, payload = self.conn.recv()
+        if status != "ready":
+            self.close()
+            raise RuntimeError(payload)
+
+    def is_alive(self) -> bool:
+        """プロセスが生きているか"""
+        return self.process.is_alive()
+
+    def call(self, task: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """タスクを送り、結果を受け取る（timeout 秒以内に返らなければ TimeoutError）"""
+        self.conn.send(task)
+        if timeout is not None and not self.conn.poll(timeout):
+            raise TimeoutError()
+        status, payload = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self):
+        """プロセスを終了"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        """プロセスを強制終了"""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerProcessPool:
+    """1種類のワーカーを実行する常駐プロセスプール"""
+
+    def __init__(self, worker_name: str, worker_path: str, class_name: str,
+                 size: int = 1, start_method: Optional[str] = None):
+        """初期化（size 個のプロセスを起動）
+
+        start_method を省略すると forkserver（なければ spawn）で起動する。プロセスの再起動は
+        ステップを実行中のスレッドから行うため、他のスレッドがロックを持ったまま複製される fork は使わない。
+        """
+        self.name = worker_name
+        self.worker_path = str(worker_path)
+        self.class_name = class_name
+        self.size = max(1, int(size))
+        self.restarts = 0
+        self.timeouts = 0
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._processes = []
+        self._lock = threading.Lock()
+
+        for _ in range(self.size):
+            process = self._spawn()
+            self._processes.append(process)
+            self._idle.put(process)
+
+    def _spawn(self) -> _WorkerProcess:
+        """ワーカープロセスを1つ起動"""
+        return _WorkerProcess(self._context, self.name, self.worker_path, self.class_name)
+
+    def _replace(self, process: _WorkerProcess) -> _WorkerProcess:
+        """異常終了したプロセスを再起動したものと差し替える"""
+        process.kill()
+        new_process = self._spawn()
+        with self._lock:
+            self._processes[self._processes.index(process)] = new_process
+            self.restarts += 1
+        return new_process
+
+    def execute(self, task: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """空いているプロセスでタスクを実行（制限時間を超えたらプロセスを強制終了）
+
+        空きプロセスを待つ時間も制限時間に含める（全プロセスが実行中・応答なしでも制限時間で TimeoutError）。
+        """
+        started = time.monotonic()
+        try:
+            process = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            self.timeouts += 1
+            raise TimeoutError() from None
+        if timeout is not None:
+            timeout -= time.monotonic() - started
+            if timeout <= 0:
+                # 空きを待つ間に期限が切れた: 実行していないプロセスは入れ替えずに返す
+                self._idle.put(process)
+                self.timeouts += 1
+                raise TimeoutError()
+
+        try:
+            if not process.is_alive():
+                process = self._replace(process)
+            return process.call(task, timeout)
+        except TimeoutError:
+            # 応答しないプロセスは強制終了して入れ替える
+            process = self._replace(process)
+            self.timeouts += 1
+            raise
+        except (EOFError, OSError):
+            # 実行中にプロセスが落ちた: 再起動してエラーを返す
+            process = self._replace(process)
+            return {
+                "status": "error",
+                "worker": self.name,
+                "error": "ワーカープロセスが異常終了しました（再起動済み）"
+            }
+        finally:
+            self._idle.put(process)
+
+    def stats(self) -> Dict[str, Any]:
+        """プールの状態を取得"""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "restarts": self.restarts,
+            "timeouts": self.timeouts
+        }
+
+    def close(self):
+        """全プロセスを終了"""
+        with self._lock:
+            processes, self._processes = self._processes, []
+        for process in processes:
+            process.close()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""起動時間バジェットチェック - オーケストレーターのコールドスタートを計測する
+
+新しいインタープリタで `Orchestrator()` の生成と `analyze_task`（および重い依存を
+使わない `suggest_structure` の実行）にかかる時間を計測し、バジェットを超えた場合や
+python-docx / python-pptx がインポートされた場合は終了コード1で失敗する。
+
+使い方:
+    python3 import_budget.py [--budget 秒] [--runs 回数]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ORCHESTRATOR_DIR = Path(__file__).parent.parent / "orchestrator"
+
+# 起動時に読み込まれてはいけない重いモジュール
+HEAVY_MODULES = ["docx", "pptx", "lxml"]
+
+# 子プロセスで実行する計測コード
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {orchestrator_dir!r})
+from orchestrator import Orchestrator
+orchestrator = Orchestrator()
+orchestrator.verbose = False
+subtasks = orchestrator.analyze_task("プレゼンの構成を提案してください")
+cold_start = time.perf_counter() - started
+orchestrator.execute_plan(orchestrator.create_execution_plan(subtasks))
+print(json.dumps({{
+    "cold_start_sec": cold_start,
+    "total_sec": time.perf_counter() - started,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def measure() -> dict:
+    """新しいインタープリタで1回計測"""
+    code = PROBE.format(orchestrator_dir=str(ORCHESTRATOR_DIR), heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    # 最終行が計測結果（ワーカーのログは読み飛ばす）
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="オーケストレーターの起動時間バジェットチェック")
+    parser.add_argument("--budget", type=float, default=0.5, help="コールドスタートの上限（秒）")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値で判定）")
+    args = parser.parse_args()
+
+    samples = [measure() for _ in range(args.runs)]
+    cold_start = statistics.median(s["cold_start_sec"] for s in samples)
+    total = statistics.median(s["total_sec"] for s in samples)
+    heavy = sorted({m for s in samples for m in s["heavy_modules"]})
+
+    print(f"コールドスタート（Orchestrator() + analyze_task）: {cold_start * 1000:.1f} ms"
+          f"（バジェット {args.budget * 1000:.0f} ms）")
+    print(f"suggest_structure 実行まで: {total * 1000:.1f} ms")
+
+    failed = False
+    if cold_start > args.budget:
+        print("[!] コールドスタートがバジェットを超えました", file=sys.stderr)
+        failed = True
+    if heavy:
+        print(f"[!] 起動時に重いモジュールがインポートされました: {heavy}", file=sys.stderr)
+        failed = True
+
+    if not failed:
+        print("[+] OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""文書タイプごとの分解パイプラインのチェック
+
+「〇〇とスライドを作成してください」（document_and_slides パイプライン）を文書タイプ
+（報告書・議事録・提案書）ごとに実行し、構成案の段と文書の段が同じ文書タイプになっていること、
+作成された文書の見出しがその文書タイプのテンプレートに沿っていて、タスクに元からあった
+セクションの内容が残っていることを確認する。1つでも満たさなければ終了コード1で失敗する。
+python-docx がなければ計画の確認だけを行う。
+
+使い方:
+    python3 pipeline_doc_types.py
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR / "orchestrator"))
+
+from orchestrator import Orchestrator  # noqa: E402
+
+# タスク -> 期待する文書タイプ
+CASES = {
+    "報告書とスライドを作成してください": "report",
+    "議事録とスライドを作成してください": "minutes",
+    "提案書とスライドを作成してください": "proposal",
+}
+
+
+def check(orchestrator: Orchestrator, task: str, doc_type: str, run: bool) -> list:
+    """1つのタスクを確認し、問題の一覧を返す"""
+    problems = []
+    subtasks = orchestrator.analyze_task(task)
+    stages = {subtask.get("id"): subtask for subtask in subtasks}
+    outline, document = stages.get("outline"), stages.get("document")
+    if outline is None or document is None:
+        return [f"document_and_slides パイプラインになっていません: {[s.get('id') for s in subtasks]}"]
+    for name, stage in (("構成案", outline), ("文書", document)):
+        if stage.get("doc_type") != doc_type:
+            problems.append(f"{name}の段の文書タイプが {stage.get('doc_type')}（期待値 {doc_type}）")
+    if not run or problems:
+        return problems
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = orchestrator.execute_plan(orchestrator.create_execution_plan(subtasks))
+    outputs = [(step.worker_output or {}).get("output") or {} for step in results if step.worker == "document_writer"]
+    file_path = next((output["file_path"] for output in outputs if output.get("file_path")), None)
+    if file_path is None:
+        return ["文書が作成されませんでした"]
+
+    from docx import Document
+    doc = Document(file_path)
+    headings = [p.text for p in doc.paragraphs if p.style.name == "Heading 1"]
+    texts = [p.text for p in doc.paragraphs]
+    template = orchestrator._load_worker("document_writer").templates[doc_type]
+    expected = [s["title"] for s in template["sections"] if s["type"] not in ("cover", "toc")]
+    missing = [title for title in expected if title not in headings]
+    if missing:
+        problems.append(f"テンプレートの見出しがありません: {missing}（見出し: {headings}）")
+    for section in document["content"]["sections"]:
+        if section["title"] not in headings or section["content"] not in texts:
+            problems.append(f"元のセクションが残っていません: {section['title']}")
+    return problems
+
+
+def main() -> int:
+    run = importlib.util.find_spec("docx") is not None
+    if not run:
+        print("[*] python-docx がないため、計画の確認だけを行います")
+
+    failed = False
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                orchestrator = Orchestrator()
+            orchestrator.verbose = False
+            for task, doc_type in CASES.items():
+                problems = check(orchestrator, task, doc_type, run)
+                print(f"{'[+]' if not problems else '[!]'} {doc_type}: {task}")
+                for problem in problems:
+                    print(f"    {problem}", file=sys.stderr)
+                failed = failed or bool(problems)
+            orchestrator.close()
+        finally:
+            os.chdir(cwd)
+
+    if not failed:
+        print("[+] OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
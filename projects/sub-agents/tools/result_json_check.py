@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""公開APIの結果のJSON化チェック
+
+process_task / process_task_async / process_tasks / iter_results が返す結果を json.dumps と
+copy.deepcopy にかけ、従来どおりのdictとして扱えることを確認する。
+1つでも失敗すれば終了コード1で失敗する。
+
+使い方:
+    python3 result_json_check.py
+"""
+
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR / "orchestrator"))
+
+from orchestrator import Orchestrator  # noqa: E402
+
+TASKS = [
+    "報告書を作成してください",
+    "プレゼンの構成を提案してください",
+    "コードを書いてレビューして",
+]
+
+
+def check(label: str, result) -> bool:
+    """結果がdictで、JSON化とディープコピーができるか"""
+    try:
+        if type(result) is not dict:
+            raise TypeError(f"dict ではなく {type(result).__name__} が返った")
+        json.loads(json.dumps(result, ensure_ascii=False))
+        copy.deepcopy(result)
+    except Exception as e:
+        print(f"[!] {label}: {e}", file=sys.stderr)
+        return False
+    print(f"[+] {label}")
+    return True
+
+
+def main() -> int:
+    collected = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            # ワーカーの出力は表示しない
+            with contextlib.redirect_stdout(io.StringIO()):
+                orchestrator = Orchestrator()
+                orchestrator.verbose = False
+                orchestrator.config["prewarm"] = {"enabled": False}
+
+                for task in TASKS:
+                    collected.append((f"process_task: {task}", orchestrator.process_task(task)))
+                    collected.append((f"process_task_async: {task}",
+                                      asyncio.run(orchestrator.process_task_async(task))))
+                    for event in orchestrator.iter_results(task):
+                        collected.append((f"iter_results {event['event']}: {task}", event))
+                for result in orchestrator.process_tasks(TASKS):
+                    collected.append((f"process_tasks #{result['index']}: {result['task']}", result))
+                orchestrator.close()
+        finally:
+            os.chdir(cwd)
+
+    ok = all([check(label, result) for label, result in collected])
+
+    if ok:
+        print("[+] OK")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
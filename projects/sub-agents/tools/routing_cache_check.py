@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""判定キャッシュとルーティングの一致チェック
+
+正規化（NFKC・小文字化・空白の統一）すると同じになるタスク文の組を、新しいオーケストレーターで
+両方の順に分析し、キャッシュから返った判定が、キャッシュを使わずに判定した結果と一致することを確認する。
+1つでも食い違えば終了コード1で失敗する。
+
+使い方:
+    python3 routing_cache_check.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR / "orchestrator"))
+
+from orchestrator import Orchestrator  # noqa: E402
+
+# 正規化すると同じになるタスク文の組（半角カナ・全角英数・大文字・空白）
+PAIRS = [
+    ("ﾚﾋﾞｭｰしてください", "レビューしてください"),
+    ("ﾌﾟﾚｾﾞﾝの構成を提案してください", "プレゼンの構成を提案してください"),
+    ("ＷＯＲＤで報告書を作成してください", "wordで報告書を作成してください"),
+    ("PowerPoint  の資料を　作ってください", "powerpoint の資料を 作ってください"),
+]
+
+
+def new_orchestrator(cache: bool) -> Orchestrator:
+    """判定キャッシュの有無を指定してオーケストレーターを作る（ログは出さない）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        orchestrator = Orchestrator()
+    orchestrator.verbose = False
+    orchestrator.config["prewarm"] = {"enabled": False}
+    if not cache:
+        orchestrator.decision_cache = None
+    return orchestrator
+
+
+def decision(subtasks: list) -> list:
+    """比較する判定（サブタスクの種類・ワーカー・モデル・依存関係）"""
+    return [(s["type"], s["worker"], s["model"], tuple(s.get("depends_on", []))) for s in subtasks]
+
+
+def main() -> int:
+    failed = False
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            fresh = new_orchestrator(cache=False)
+            for pair in PAIRS:
+                for first, second in (pair, pair[::-1]):
+                    orchestrator = new_orchestrator(cache=True)
+                    orchestrator.analyze_task(first)
+                    cached = decision(orchestrator.analyze_task(second))
+                    expected = decision(fresh.analyze_task(second))
+                    hit = orchestrator.decision_cache.hits == 1
+                    ok = cached == expected and hit
+                    print(f"{'[+]' if ok else '[!]'} {first} → {second}: {cached[0][0]}")
+                    if not ok:
+                        print(f"    キャッシュ: {cached}（ヒット {orchestrator.decision_cache.hits}）", file=sys.stderr)
+                        print(f"    新規判定:   {expected}", file=sys.stderr)
+                    failed = failed or not ok
+                    orchestrator.close()
+            fresh.close()
+        finally:
+            os.chdir(cwd)
+
+    if not failed:
+        print("[+] OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
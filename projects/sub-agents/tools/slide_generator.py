@@ -20,7 +20,9 @@ JSONスキーマ:
 import json
 import sys
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 from pptx import Presentation
 from pptx.dml.color import RGBColor
@@ -28,11 +30,17 @@ from pptx.enum.text import PP_ALIGN
 from pptx.util import Inches, Pt
 
 
-def load_style(style_name: str = "default") -> dict:
+@lru_cache(maxsize=1)
+def _load_styles() -> dict:
+    """slide_style.json を読み込む（常駐プロセスでは1回だけ）"""
     style_path = Path(__file__).parent / "slide_style.json"
     with open(style_path, encoding="utf-8") as f:
-        styles = json.load(f)
-    return styles.get(style_name, styles["default"])
+        return json.load(f)
+
+
+def load_style(style_name: str = "default") -> dict:
+    styles = _load_styles()
+    return dict(styles.get(style_name, styles["default"]))
 
 
 def hex_to_rgb(hex_str: str) -> RGBColor:
@@ -187,7 +195,8 @@ LAYOUT_HANDLERS = {
 }
 
 
-def generate_pptx(json_path: str) -> Path:
+def generate_pptx(json_path: str, cancel_token=None) -> Optional[Path]:
+    """JSONからPPTXを生成して保存先を返す（cancel_token が立つとスライドの区切りで打ち切り、保存せずに None を返す）"""
     with open(json_path, encoding="utf-8") as f:
         data = json.load(f)
 
@@ -198,6 +207,9 @@ def generate_pptx(json_path: str) -> Path:
     prs.slide_height = Inches(style["slide_height_inches"])
 
     for slide_data in data.get("slides", []):
+        if cancel_token is not None and cancel_token.cancelled:
+            print("キャンセルされました", file=sys.stderr)
+            return None
         layout = slide_data.get("layout", "image_caption")
         handler = LAYOUT_HANDLERS.get(layout, create_image_caption_slide)
         handler(prs, slide_data, style)
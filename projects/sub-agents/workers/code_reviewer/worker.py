@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Code Reviewer Worker - コードレビューワーカー
+
+役割: コードのセキュリティ・品質をレビューする（security-review スキルを使用）
+前段の code_writer の出力（inputs）があれば、そのコードをレビューする
+"""
+
+import importlib.util
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+SKILL_PATH = Path(__file__).parent.parent.parent / "skills" / "security-review" / "skill.py"
+
+
+def _load_security_review_skill():
+    """security-review スキルをロード"""
+    spec = importlib.util.spec_from_file_location("security_review_skill", SKILL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SecurityReviewSkill()
+
+
+class CodeReviewerWorker:
+    """コードレビューワーカー"""
+
+    def __init__(self):
+        """初期化"""
+        self.name = "code_reviewer"
+        self.description = "コードレビューを担当"
+        self.version = "1.0.0"
+        self.skills = ["review", "best-practices", "security-review"]
+        self.security_review = _load_security_review_skill()
+
+    def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """タスクを実行"""
+        print(f"\n🔍 {self.name}: タスクを実行中...")
+        print(f"   タスク: {task.get('description', 'N/A')}")
+
+        code = task.get("code") or self._code_from_inputs(task)
+        if code is None:
+            return {
+                "status": "error",
+                "worker": self.name,
+                "error": "レビュー対象のコードがありません（task の code か前段の code_writer の出力が必要です）"
+            }
+
+        review = self.security_review.review(code, {"task": task.get("task", "")})
+
+        return {
+            "status": "success",
+            "worker": self.name,
+            "output": {
+                "review_type": task.get("type", "review"),
+                "result": review["status"],
+                "summary": review["summary"],
+                "findings": review["findings"],
+                "warnings": review["warnings"],
+                "recommendations": review["recommendations"],
+                "lines": len(code.splitlines())
+            },
+            "logs": [
+                f"レビュー対象: {len(code.splitlines())} 行",
+                f"セキュリティチェック: {review['status']}"
+            ]
+        }
+
+    def _code_from_inputs(self, task: Dict[str, Any]) -> Optional[str]:
+        """前段ステップの出力からコードを取り出す"""
+        for worker_output in task.get("inputs", {}).values():
+            output = (worker_output or {}).get("output")
+            if isinstance(output, dict) and isinstance(output.get("code"), str):
+                return output["code"]
+        return None
+
+
+def main():
+    """テスト用メイン関数"""
+    worker = CodeReviewerWorker()
+
+    task = {
+        "type": "review",
+        "description": "コードをレビューする",
+        "code": 'password = input("password: ")\nprint(f"hello {password}")\n'
+    }
+
+    result = worker.execute(task)
+    print(f"\n結果: {result['output']['result']} / 推奨: {result['output']['recommendations']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ class CodeWriterWorker:
         """初期化"""
         self.name = "code_writer"
         self.description = "コード生成を担当"
+        self.version = "1.0.0"
         self.skills = ["coding", "architecture", "best-practices"]
 
     def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
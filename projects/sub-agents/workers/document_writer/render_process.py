@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Render Process - 差し込み印刷（render_many）の子プロセスの入口
+
+子プロセスは spawn / forkserver で起動するため、実行する関数はインポートできるモジュールに置く必要がある。
+ワーカーモジュールはパスから読み込まれていて名前ではインポートできないので、この小さなモジュールを入口にして、
+子プロセスの中でワーカーモジュールを読み込み直す。
+"""
+
+import importlib.util
+
+
+def main(conn, worker_path: str):
+    """ワーカーモジュールを読み込み、render_many の子プロセスのメインループを実行"""
+    spec = importlib.util.spec_from_file_location("document_writer_worker", worker_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module._render_process_main(conn, module.DocumentWriterWorker())
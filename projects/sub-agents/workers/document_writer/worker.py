@@ -6,22 +6,156 @@ Document Writer Worker - ドキュメント作成ワーカー
 対象: コンサルタント、営業職、事務職
 """
 
+import copy
+import csv
+import hashlib
+import io
 import json
 import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from itertools import islice
+from typing import Dict, List, Any, Iterable, Optional
+from xml.sax.saxutils import escape
 
-# python-docxが利用可能かチェック
-try:
-    from docx import Document
-    from docx.shared import Inches, Pt, RGBColor
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.enum.style import WD_STYLE_TYPE
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-    print("[!] python-docx がインストールされていません")
-    print("    インストール: pip install python-docx")
+# python-docxは重いため、初めて文書を生成するときにインポートする
+DOCX_AVAILABLE = None
+
+# 表の行はこの行数ずつXMLを組み立てて追加する（キャンセルもこの区切りで確認）
+TABLE_CHUNK_ROWS = 1000
+
+# セクションの書式（セクションの断片キャッシュのキーにも含める）
+HEADING_LEVEL = 1
+LIST_STYLE = 'List Bullet'
+TABLE_STYLE = 'Light Grid Accent 1'
+
+# セクションの断片キャッシュ（タスクの fragment_cache: true で使う）は、シリアライズしたXMLの合計がこのバイト数まで
+# 保持する（古いものから破棄）。これより大きい断片と、この行数を超える表・CSV・イテレータの表はキャッシュしない
+FRAGMENT_CACHE_BYTES = 32 * 1024 * 1024
+FRAGMENT_MAX_BYTES = 1024 * 1024
+FRAGMENT_MAX_TABLE_ROWS = 1000
+
+# セル内の改行・タブ（Wordでは <w:br/> / <w:tab/> になる）
+_CELL_BREAKS = re.compile(r"[\r\n\t]")
+
+# 差し込み印刷（render_many）のテンプレートの差し込みフィールド
+_MERGE_FIELD = re.compile(r"\{\{(\w+)\}\}")
+
+# スケルトンの表紙に入れておき、複製後に実際の値で置き換えるトークン
+COVER_FIELDS = ("title", "company", "date", "author")
+
+
+def _import_docx() -> bool:
+    """python-docxを遅延インポート（利用可能かを返す）"""
+    global DOCX_AVAILABLE, Document, Inches, Pt, RGBColor, WD_ALIGN_PARAGRAPH, WD_STYLE_TYPE, parse_xml, nsdecls, etree
+
+    if DOCX_AVAILABLE is None:
+        try:
+            from docx import Document
+            from docx.oxml import parse_xml
+            from docx.oxml.ns import nsdecls
+            from lxml import etree
+            from docx.shared import Inches, Pt, RGBColor
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            from docx.enum.style import WD_STYLE_TYPE
+            DOCX_AVAILABLE = True
+        except ImportError:
+            DOCX_AVAILABLE = False
+            print("[!] python-docx がインストールされていません")
+            print("    インストール: pip install python-docx")
+
+    return DOCX_AVAILABLE
+
+
+def _run_xml(text: str) -> str:
+    """セルの文字列の <w:r>（cell.text = ... と同じく改行は <w:br/>、タブは <w:tab/>）"""
+    if not text:
+        return '<w:r/>'
+    if _CELL_BREAKS.search(text) is None:
+        return f'<w:r>{_text_xml(text)}</w:r>'
+    parts = ['<w:r>']
+    start = 0
+    for match in _CELL_BREAKS.finditer(text):
+        parts.append(_text_xml(text[start:match.start()]))
+        parts.append('<w:tab/>' if match.group() == "\t" else '<w:br/>')
+        start = match.end()
+    parts.append(_text_xml(text[start:]))
+    parts.append('</w:r>')
+    return "".join(parts)
+
+
+def _text_xml(text: str) -> str:
+    """<w:t>（前後の空白を残す場合は xml:space="preserve"）"""
+    if not text:
+        return ''
+    if text[0].isspace() or text[-1].isspace():
+        return f'<w:t xml:space="preserve">{escape(text)}</w:t>'
+    return f'<w:t>{escape(text)}</w:t>'
+
+
+def _tell(stream: Any) -> Optional[int]:
+    """ストリームの現在位置（位置を持たないストリームなら None）"""
+    try:
+        return stream.tell()
+    except (AttributeError, OSError):
+        return None
+
+
+def _compile_template(value: Any) -> Any:
+    """テンプレートのうち {{field}} を含む部分だけを差し込み用に分解する（含まなければ None）
+
+    文字列は区切った部品のリスト、dict・list は差し込みのある要素だけの {キー: 分解結果} になる。
+    差し込みのない部分は分解せず、全行で同じオブジェクトを共有する。
+    """
+    if isinstance(value, str):
+        parts = _MERGE_FIELD.split(value)
+        return ("str", parts) if len(parts) > 1 else None
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return None
+    compiled = {key: spec for key, spec in ((key, _compile_template(item)) for key, item in items) if spec is not None}
+    return (type(value).__name__, compiled) if compiled else None
+
+
+def _fill_template(value: Any, compiled: Any, row: Dict[str, Any]) -> Any:
+    """分解したテンプレートに行の値を差し込む（フィールドがなければ KeyError）"""
+    kind, spec = compiled
+    if kind == "str":
+        # フィールドだけの文字列は値をそのまま入れる（表のデータなどリストも差し込める）
+        if len(spec) == 3 and spec[0] == spec[2] == "":
+            return row[spec[1]]
+        return "".join(str(row[part]) if i % 2 else part for i, part in enumerate(spec))
+    filled = dict(value) if kind == "dict" else list(value)
+    for key, item_spec in spec.items():
+        filled[key] = _fill_template(value[key], item_spec, row)
+    return filled
+
+
+def _render_process_main(conn, worker: "DocumentWriterWorker"):
+    """render_many の子プロセスのメインループ（render_process.main から呼ばれる）"""
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            break
+        if item is None:
+            break
+        index, task = item
+        document = worker._render_one(index, task)
+        # memoryview はプロセス間で送れないためバイト列にする
+        content = document.get("output", {}).get("content")
+        if isinstance(content, memoryview):
+            document["output"]["content"] = content.tobytes()
+        conn.send(document)
+    conn.close()
 
 
 class DocumentWriterWorker:
@@ -31,8 +165,27 @@ class DocumentWriterWorker:
         """初期化"""
         self.name = "document_writer"
         self.description = "Word/PDF文書の作成を担当"
+        self.version = "1.0.0"
         self.skills = ["document-formatting", "business-writing"]
         self.templates = self._load_templates()
+        self.tracer = None  # オーケストレーターのトレーサー（有効時に設定される）
+        # (doc_type, 表紙にある任意項目) -> (表紙・目次まで組み立て済みの文書, 表紙の段落数)
+        self._skeletons = {}
+        self._skeleton_lock = threading.Lock()
+        self.skeleton_hits = 0
+        self.skeleton_misses = 0
+        # セクションの内容と書式のハッシュ -> 組み立て済みの本文の要素のXML（LRU）
+        self._fragments = OrderedDict()
+        self._fragment_bytes = 0
+        self._fragment_lock = threading.Lock()
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+
+    def _span(self, stage: str, **args):
+        """トレーサーが設定されていれば処理段階をスパンとして記録"""
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span(f"{self.name}.{stage}", category="worker", **args)
 
     def _load_templates(self) -> Dict[str, Any]:
         """テンプレート定義をロード"""
@@ -75,19 +228,22 @@ class DocumentWriterWorker:
             }
         }
 
-    def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """タスクを実行"""
+    def execute(self, task: Dict[str, Any], cancel_token: Any = None) -> Dict[str, Any]:
+        """タスクを実行（cancel_token が立つと文書生成をセクションの区切りで打ち切る）"""
         print(f"\n[*] {self.name}: タスクを実行中...")
         print(f"   タスク: {task.get('description', 'N/A')}")
 
         task_type = task.get("type", "create_document")
 
         if task_type == "create_document":
-            return self._create_document(task)
+            return self._create_document(task, cancel_token)
         elif task_type == "suggest_structure":
             return self._suggest_structure(task)
         elif task_type == "format_content":
             return self._format_content(task)
+        elif task_type == "render_many":
+            return self.render_many(task.get("template", {}), task.get("rows", []),
+                                    processes=task.get("processes"), cancel_token=cancel_token)
         else:
             return {
                 "status": "error",
@@ -151,9 +307,16 @@ class DocumentWriterWorker:
 
         return recommendations.get(doc_type, [])
 
-    def _create_document(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Word文書を作成"""
-        if not DOCX_AVAILABLE:
+    def _create_document(self, task: Dict[str, Any], cancel_token: Any = None) -> Dict[str, Any]:
+        """Word文書を作成
+
+        出力先はタスクで選ぶ（ディスクへの書き出しと読み戻しを省きたい場合は file 以外を使う）:
+            output_mode: "file"（デフォルト、output_path に保存）/ "bytes" / "memoryview"（output.content で返す）
+            output_stream: 呼び出し側のバイナリストリームに書き込む（output_mode より優先）
+        """
+        with self._span("import_docx"):
+            docx_available = _import_docx()
+        if not docx_available:
             return {
                 "status": "error",
                 "worker": self.name,
@@ -165,49 +328,64 @@ class DocumentWriterWorker:
         title = task.get("title", "文書")
         content = task.get("content", {})
         output_path = task.get("output_path", f"{title}.docx")
+        output_stream = task.get("output_stream")
+        output_mode = "stream" if output_stream is not None else task.get("output_mode", "file")
+        if output_mode not in ("file", "stream", "bytes", "memoryview"):
+            return {
+                "status": "error",
+                "worker": self.name,
+                "error": f"不明な出力モード: {output_mode}"
+            }
 
-        try:
-            doc = Document()
-
-            # ドキュメント設定
-            self._setup_document_styles(doc)
-
-            # 表紙
-            self._add_cover_page(doc, title, content.get("metadata", {}))
-
-            # 改ページ
-            doc.add_page_break()
-
-            # 目次（プレースホルダー）
-            self._add_toc_placeholder(doc)
+        # 前段で同じ文書タイプの構成案が作られていれば、そのセクション構成で本文を作る
+        outline = self._outline_from_inputs(task)
+        if outline is not None and outline.get("doc_type", doc_type) == doc_type:
+            content = {**content, "sections": self._sections_from_outline(outline, content.get("sections", []))}
 
-            # 改ページ
-            doc.add_page_break()
+        try:
+            # 表紙・目次はスケルトンを複製し、タイトルなどの可変部分だけ埋める
+            with self._span("new_document", doc_type=doc_type):
+                doc = self._new_document(doc_type, title, content.get("metadata", {}))
 
-            # コンテンツセクション
+            # コンテンツセクション（内容と書式が前回と同じセクションは組み立て済みの断片を差し込む）
             sections = content.get("sections", [])
-            for section in sections:
-                self._add_section(doc, section)
+            use_fragments = task.get("fragment_cache", False)
+            fragment_counts = {"hits": 0, "misses": 0, "bypassed": 0}
+            with self._span("sections", count=len(sections)):
+                for index, section in enumerate(sections):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        return self._cancelled_result(index, len(sections))
+                    with self._span("_add_section", index=index, type=section.get("type", "content")):
+                        if use_fragments:
+                            fragment_counts[self._add_section_cached(doc, section, cancel_token)] += 1
+                        else:
+                            self._add_section(doc, section, cancel_token)
+
+            if cancel_token is not None and cancel_token.cancelled:
+                return self._cancelled_result(len(sections), len(sections))
 
             # 保存
-            doc.save(output_path)
-
+            with self._span("save", mode=output_mode, path=output_path if output_mode == "file" else None):
+                output = self._save(doc, output_mode, output_path, output_stream)
+
+            destination = output_path if output_mode == "file" else f"メモリ（{output_mode}）"
+            output.update({"doc_type": doc_type, "sections": len(sections), "output_mode": output_mode})
+            logs = [
+                f"Word文書を作成: {destination}",
+                f"セクション数: {len(sections)}"
+            ]
+            if use_fragments:
+                output["fragment_cache"] = fragment_counts
+                logs.append(f"セクションの断片キャッシュ: ヒット {fragment_counts['hits']}件、"
+                            f"ミス {fragment_counts['misses']}件")
             result = {
                 "status": "success",
                 "worker": self.name,
-                "output": {
-                    "file_path": output_path,
-                    "doc_type": doc_type,
-                    "sections": len(sections),
-                    "file_size": os.path.getsize(output_path) if os.path.exists(output_path) else 0
-                },
-                "logs": [
-                    f"Word文書を作成: {output_path}",
-                    f"セクション数: {len(sections)}"
-                ]
+                "output": output,
+                "logs": logs
             }
 
-            print(f"   [+] Word文書作成完了: {output_path}")
+            print(f"   [+] Word文書作成完了: {destination}")
             return result
 
         except Exception as e:
@@ -217,6 +395,310 @@ class DocumentWriterWorker:
                 "error": str(e)
             }
 
+    def _save(self, doc: Any, output_mode: str, output_path: str, output_stream: Any = None) -> Dict[str, Any]:
+        """出力モードに応じて保存し、出力情報（サイズは書き込んだバイト数）を返す"""
+        if output_mode == "file":
+            doc.save(output_path)
+            return {"file_path": output_path, "file_size": os.path.getsize(output_path)}
+
+        if output_mode == "stream":
+            start = _tell(output_stream)
+            doc.save(output_stream)
+            end = _tell(output_stream)
+            size = end - start if start is not None and end is not None else None
+            return {"file_path": None, "file_size": size}
+
+        # 一時ファイルを経由せずメモリ上で組み立てる
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        content = buffer.getbuffer() if output_mode == "memoryview" else buffer.getvalue()
+        return {"file_path": None, "file_size": len(content) if output_mode == "bytes" else content.nbytes,
+                "content": content}
+
+    def render_many(self, template_task: Dict[str, Any], rows: Iterable[Dict[str, Any]],
+                    processes: Optional[int] = None, on_document: Any = None,
+                    cancel_token: Any = None) -> Dict[str, Any]:
+        """差し込み印刷: 1つのテンプレートから行ごとに文書を作成
+
+        template_task は create_document と同じ形で、文字列の {{field}} を各行（dict）の値で置き換える。
+        テンプレートの分解は一度だけ行い、文書は processes 個の子プロセスで並列に作る
+        （processes が1以下なら同じプロセスで順に作る）。子プロセスはスレッドを使う呼び出し元でも安全なよう
+        forkserver（なければ spawn）で起動し、スケルトンは子プロセスごとに一度だけ組み立てる。
+        子プロセスには1件ずつ渡し、行は必要になった分だけ読むため、行数が多くてもメモリ使用量は増えない。
+
+        作成が終わった文書は終わった順に on_document(document) に渡す。output_mode が bytes / memoryview の場合、
+        on_document を渡したときは内容をそちらにだけ渡して結果には残さず、渡さないときは結果の output.content に残す。
+        """
+        if template_task.get("output_stream") is not None:
+            return {
+                "status": "error",
+                "worker": self.name,
+                "error": "render_many では output_stream は使えません（output_path か output_mode を指定してください）"
+            }
+
+        started = time.perf_counter()
+        template = dict(template_task, type="create_document")
+        template.setdefault("output_path", f"{template.get('title', '文書')}.docx")
+        compiled = _compile_template(template)
+        # 出力先に差し込みフィールドがなければ、上書きしないよう連番を付ける
+        numbered = compiled is None or "output_path" not in compiled[1]
+        tasks = self._merge_rows(template, compiled, rows, numbered)
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        context = None
+        if processes > 1:
+            # 呼び出し元（オーケストレーター）はスレッドを使うため fork は使わない
+            import multiprocessing
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        documents = (self._render_in_processes(tasks, processes, context, cancel_token) if context is not None
+                     else self._render_in_process(tasks, cancel_token))
+
+        results = []
+        with self._span("render_many", processes=processes if context is not None else 1):
+            for document in documents:
+                if on_document is not None:
+                    on_document(document)
+                    # 内容は on_document に渡したので、結果には残さない
+                    if "content" in document.get("output", {}):
+                        document = dict(document, output={key: value for key, value in document["output"].items()
+                                                          if key != "content"})
+                results.append(document)
+
+        wall_sec = time.perf_counter() - started
+        results.sort(key=lambda document: document["index"])
+        failed = [document for document in results if document["status"] != "success"]
+        render_times = [document["elapsed_sec"] for document in results]
+        output = {
+            "documents": len(results),
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "processes": processes if context is not None else 1,
+            "wall_sec": round(wall_sec, 6),
+            "render_sec_total": round(sum(render_times), 6),
+            "render_sec_mean": round(sum(render_times) / len(render_times), 6) if render_times else 0.0,
+            "render_sec_max": max(render_times, default=0.0),
+            "documents_per_sec": round(len(results) / wall_sec, 2) if wall_sec > 0 else None,
+            "results": results
+        }
+        cancelled = cancel_token is not None and cancel_token.cancelled
+        result = {
+            "status": "cancelled" if cancelled else ("error" if failed else "success"),
+            "worker": self.name,
+            "output": output,
+            "logs": [
+                f"差し込み印刷: {len(results)}件（成功 {output['succeeded']}件、失敗 {len(failed)}件）",
+                f"プロセス数: {output['processes']}、所要時間: {wall_sec:.2f}秒"
+            ]
+        }
+        if cancelled:
+            result["error"] = f"キャンセルされました（{len(results)}件作成済み）"
+        elif failed:
+            result["error"] = f"{len(failed)}件の文書の作成に失敗しました"
+
+        print(f"   [+] 差し込み印刷完了: {output['succeeded']}/{len(results)}件（{wall_sec:.2f}秒）")
+        return result
+
+    def _merge_rows(self, template: Dict[str, Any], compiled: Any, rows: Iterable[Dict[str, Any]],
+                    numbered: bool):
+        """行ごとの (番号, タスク, エラー) を順に返す（差し込みに失敗した行はエラーを返す）"""
+        stem, ext = os.path.splitext(template["output_path"])
+        for index, row in enumerate(rows):
+            try:
+                task = _fill_template(template, compiled, row) if compiled is not None else dict(template)
+            except KeyError as e:
+                yield index, None, f"差し込みフィールドがありません: {e.args[0]}"
+                continue
+            if numbered:
+                task["output_path"] = f"{stem}_{index + 1}{ext}"
+            yield index, task, None
+
+    def _render_one(self, index: int, task: Dict[str, Any]) -> Dict[str, Any]:
+        """1件の文書を作成し、所要時間つきの結果にする"""
+        started = time.perf_counter()
+        result = self._create_document(task)
+        document = {
+            "index": index,
+            "status": result["status"],
+            "elapsed_sec": round(time.perf_counter() - started, 6)
+        }
+        if "output" in result:
+            document["output"] = result["output"]
+        if "error" in result:
+            document["error"] = result["error"]
+        return document
+
+    def _merge_error(self, index: int, error: str) -> Dict[str, Any]:
+        """差し込みに失敗した行の結果"""
+        return {"index": index, "status": "error", "elapsed_sec": 0.0, "error": error}
+
+    def _render_in_process(self, tasks, cancel_token: Any = None):
+        """同じプロセスで1件ずつ作成"""
+        for index, task, error in tasks:
+            if cancel_token is not None and cancel_token.cancelled:
+                break
+            yield self._merge_error(index, error) if error is not None else self._render_one(index, task)
+
+    def _render_in_processes(self, tasks, processes: int, context: Any, cancel_token: Any = None):
+        """子プロセスに1件ずつ渡し、終わった順に返す（子プロセスは必要になった分だけ起動する）"""
+        from multiprocessing.connection import wait
+
+        # 子プロセスの入口は名前でインポートできるモジュールに置いてある（spawn / forkserver は関数を名前で渡すため）
+        worker_dir = os.path.dirname(os.path.abspath(__file__))
+        if worker_dir not in sys.path:
+            sys.path.insert(0, worker_dir)
+        import render_process
+
+        children = {}  # conn -> 子プロセス
+        idle = []
+        busy = {}      # conn -> 行番号
+
+        def collect():
+            """終わった子プロセスから結果を受け取る"""
+            for conn in wait(list(busy)):
+                index = busy.pop(conn)
+                try:
+                    document = conn.recv()
+                except (EOFError, OSError):
+                    # 子プロセスが落ちた: 外して（次の行で起動し直す）エラーを返す
+                    children.pop(conn).join()
+                    conn.close()
+                    document = self._merge_error(index, "文書作成プロセスが異常終了しました")
+                else:
+                    idle.append(conn)
+                yield document
+
+        try:
+            for index, task, error in tasks:
+                if cancel_token is not None and cancel_token.cancelled:
+                    break
+                if error is not None:
+                    yield self._merge_error(index, error)
+                    continue
+                while not idle and len(children) >= processes:
+                    yield from collect()
+                if not idle:
+                    conn, child_conn = context.Pipe()
+                    process = context.Process(target=render_process.main,
+                                              args=(child_conn, os.path.abspath(__file__)),
+                                              name=f"{self.name}-render", daemon=True)
+                    process.start()
+                    child_conn.close()
+                    children[conn] = process
+                    idle.append(conn)
+                conn = idle.pop()
+                conn.send((index, task))
+                busy[conn] = index
+            while busy:
+                yield from collect()
+        finally:
+            for conn, process in children.items():
+                try:
+                    conn.send(None)
+                except (OSError, ValueError):
+                    pass
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                conn.close()
+
+    def _outline_from_inputs(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """前段ステップの出力から構成案（sections を持つ出力）を取り出す"""
+        for worker_output in task.get("inputs", {}).values():
+            output = (worker_output or {}).get("output")
+            if isinstance(output, dict) and isinstance(output.get("sections"), list):
+                return output
+        return None
+
+    def _sections_from_outline(self, outline: Dict[str, Any],
+                               sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """構成案の順に本文のセクションを作る（表紙・目次は別に作るので除く）
+
+        タスクに同じタイトルのセクションがあればその内容を使い、構成案にないセクションは後ろに残す。
+        """
+        given = {section.get("title"): section for section in sections}
+        outline_titles = set()
+        merged = []
+        for section in outline["sections"]:
+            if section.get("type") in ("cover", "toc"):
+                continue
+            outline_titles.add(section["title"])
+            merged.append(given.get(section["title"]) or
+                          {"title": section["title"], "type": "content", "content": f"{section['title']}について記載します。"})
+        merged.extend(section for section in sections if section.get("title") not in outline_titles)
+        return merged
+
+    def _cancelled_result(self, done: int, total: int) -> Dict[str, Any]:
+        """キャンセルされた場合の結果"""
+        print(f"   [!] 文書作成をキャンセルしました（{done}/{total}セクション）")
+        return {
+            "status": "cancelled",
+            "worker": self.name,
+            "error": f"キャンセルされました（{done}/{total}セクション完了）"
+        }
+
+    def _new_document(self, doc_type: str, title: str, metadata: Dict[str, Any]) -> Any:
+        """表紙・目次まで入った新しい文書（doc_type ごとのスケルトンの複製）"""
+        optional = tuple(field for field in ("company", "author") if field in metadata)
+        key = (doc_type if doc_type in self.templates else None, optional)
+        with self._skeleton_lock:
+            skeleton = self._skeletons.get(key)
+            if skeleton is None:
+                with self._span("_build_skeleton", doc_type=doc_type):
+                    skeleton = self._build_skeleton(optional)
+                self._skeletons[key] = skeleton
+                self.skeleton_misses += 1
+            else:
+                self.skeleton_hits += 1
+        skeleton_doc, cover_paragraphs = skeleton
+
+        # Document を直接 deepcopy すると本文とパーツが別々のXMLツリーになるため、パッケージごと複製する
+        doc = copy.deepcopy(skeleton_doc.part.package).main_document_part.document
+
+        values = {
+            "title": title,
+            "company": metadata.get("company", ""),
+            "date": metadata["date"] if "date" in metadata else datetime.now().strftime("%Y年%m月%d日"),
+            "author": metadata.get("author", "")
+        }
+        for paragraph in doc.paragraphs[:cover_paragraphs]:
+            for run in paragraph.runs:
+                for field in COVER_FIELDS:
+                    token = f"{{{{{field}}}}}"
+                    if token in run.text:
+                        run.text = run.text.replace(token, str(values[field]))
+                        break
+        return doc
+
+    def _build_skeleton(self, optional: tuple) -> tuple:
+        """表紙（値はトークン）・目次・改ページまでの文書を組み立てる"""
+        doc = Document()
+
+        # ドキュメント設定
+        self._setup_document_styles(doc)
+
+        # 表紙
+        metadata = {field: f"{{{{{field}}}}}" for field in optional + ("date",)}
+        self._add_cover_page(doc, "{{title}}", metadata)
+        cover_paragraphs = len(doc.paragraphs)
+
+        # 改ページ
+        doc.add_page_break()
+
+        # 目次（プレースホルダー）
+        self._add_toc_placeholder(doc)
+
+        # 改ページ
+        doc.add_page_break()
+        return doc, cover_paragraphs
+
+    def skeleton_stats(self) -> Dict[str, Any]:
+        """スケルトンキャッシュの統計"""
+        with self._skeleton_lock:
+            return {"size": len(self._skeletons), "hits": self.skeleton_hits, "misses": self.skeleton_misses}
+
     def _setup_document_styles(self, doc: Any):
         """ドキュメントのスタイルを設定"""
         # 既存のスタイルを使用
@@ -271,7 +753,82 @@ class DocumentWriterWorker:
         # 実際の目次はWordの機能で生成する必要がある
         # python-docxでは目次フィールドの挿入に制限がある
 
-    def _add_section(self, doc: Any, section: Dict[str, Any]):
+    def _add_section_cached(self, doc: Any, section: Dict[str, Any], cancel_token: Any = None) -> str:
+        """セクションを追加（断片キャッシュにあればそのXMLから要素を作って差し込む）
+
+        "hits" / "misses"（組み立ててキャッシュした）/ "bypassed"（キャッシュしないセクション）を返す。
+        """
+        key = self._fragment_key(section)
+        if key is None:
+            self._add_section(doc, section, cancel_token)
+            return "bypassed"
+
+        body = doc.element.body
+        with self._fragment_lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.fragment_hits += 1
+            else:
+                self.fragment_misses += 1
+
+        if fragment is not None:
+            for xml in fragment:
+                self._append_to_body(body, parse_xml(xml))
+            return "hits"
+
+        # 追加された要素（本文末尾の sectPr の直前に入る）をシリアライズして保持する
+        # （要素のツリーより小さく、保持する量をバイト数で抑えられる）
+        tail = 1 if body.sectPr is not None else 0
+        start = len(body) - tail
+        self._add_section(doc, section, cancel_token)
+        if cancel_token is not None and cancel_token.cancelled:
+            return "misses"
+        fragment = tuple(etree.tostring(element) for element in body[start:len(body) - tail])
+        size = sum(len(xml) for xml in fragment)
+        if size > FRAGMENT_MAX_BYTES:
+            return "misses"
+        with self._fragment_lock:
+            previous = self._fragments.pop(key, None)
+            if previous is not None:
+                self._fragment_bytes -= sum(len(xml) for xml in previous)
+            self._fragments[key] = fragment
+            self._fragment_bytes += size
+            while self._fragment_bytes > FRAGMENT_CACHE_BYTES:
+                _, evicted = self._fragments.popitem(last=False)
+                self._fragment_bytes -= sum(len(xml) for xml in evicted)
+        return "misses"
+
+    def _fragment_key(self, section: Dict[str, Any]) -> Optional[str]:
+        """セクションの内容と書式のハッシュ（キャッシュしないセクションなら None）
+
+        CSV・イテレータの表は内容を読まずにハッシュできず、大きな表は断片も大きいためキャッシュしない。
+        """
+        if section.get("type") == "table":
+            table_data = section.get("table_data", [])
+            if (section.get("table_csv") or not isinstance(table_data, (list, tuple))
+                    or len(table_data) - 1 > FRAGMENT_MAX_TABLE_ROWS):  # 見出しを除いた行数
+                return None
+        canonical = json.dumps(
+            {"section": section, "style": [HEADING_LEVEL, LIST_STYLE, TABLE_STYLE]},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _append_to_body(self, body: Any, element: Any):
+        """本文の末尾（sectPr の前）に要素を追加"""
+        if body.sectPr is not None:
+            body.sectPr.addprevious(element)
+        else:
+            body.append(element)
+
+    def fragment_stats(self) -> Dict[str, Any]:
+        """セクションの断片キャッシュの統計"""
+        with self._fragment_lock:
+            return {"size": len(self._fragments), "bytes": self._fragment_bytes, "max_bytes": FRAGMENT_CACHE_BYTES,
+                    "hits": self.fragment_hits, "misses": self.fragment_misses}
+
+    def _add_section(self, doc: Any, section: Dict[str, Any], cancel_token: Any = None):
         """セクションを追加"""
         section_type = section.get("type", "content")
         title = section.get("title", "")
@@ -279,7 +836,7 @@ class DocumentWriterWorker:
 
         # 見出し
         if title:
-            doc.add_heading(title, level=1)
+            doc.add_heading(title, level=HEADING_LEVEL)
 
         # コンテンツタイプに応じた処理
         if section_type == "content":
@@ -292,43 +849,81 @@ class DocumentWriterWorker:
 
             elif isinstance(content, list):
                 for item in content:
-                    doc.add_paragraph(item, style='List Bullet')
+                    doc.add_paragraph(item, style=LIST_STYLE)
 
         elif section_type == "table":
-            # 表を追加
-            table_data = section.get("table_data", [])
-            if table_data:
-                self._add_table(doc, table_data)
+            # 表を追加（table_data の行、または table_csv のCSVファイルから）
+            if section.get("table_csv"):
+                encoding = section.get("csv_encoding", "utf-8-sig")
+                with open(section["table_csv"], 'r', encoding=encoding, newline='') as f:
+                    self._add_table(doc, csv.reader(f), cancel_token)
+            else:
+                table_data = section.get("table_data", [])
+                if table_data:
+                    self._add_table(doc, table_data, cancel_token)
 
         elif section_type == "list":
             # 箇条書き
             items = content if isinstance(content, list) else [content]
             for item in items:
-                doc.add_paragraph(item, style='List Bullet')
+                doc.add_paragraph(item, style=LIST_STYLE)
 
         # セクション間に余白
         doc.add_paragraph()
 
-    def _add_table(self, doc: Any, table_data: List[List[str]]):
-        """表を追加"""
-        if not table_data:
-            return
-
-        rows = len(table_data)
-        cols = len(table_data[0]) if rows > 0 else 0
+    def _add_table(self, doc: Any, table_data: Iterable[List[Any]], cancel_token: Any = None):
+        """表を追加（1行目が見出し。行のリスト・イテレータ・csv.reader を1回の走査で読む）
 
-        table = doc.add_table(rows=rows, cols=cols)
-        table.style = 'Light Grid Accent 1'
-
-        # データを入力
-        for i, row_data in enumerate(table_data):
-            row = table.rows[i]
-            for j, cell_data in enumerate(row_data):
-                row.cells[j].text = str(cell_data)
-
-                # ヘッダー行は太字
-                if i == 0:
-                    row.cells[j].paragraphs[0].runs[0].font.bold = True
+        セルごとに python-docx のオブジェクトを作ると行数に対して二次的に遅くなるため、
+        TABLE_CHUNK_ROWS 行ずつ行のXMLを文字列で組み立てて、まとめて表に追加する。
+        見出し行の太字は表スタイルの先頭行の書式で付け、ページをまたぐときは見出し行を繰り返す。
+        """
+        rows = iter(table_data)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = list(header)
+        cols = len(header)
+
+        table = doc.add_table(rows=0, cols=cols)
+        table.style = TABLE_STYLE
+        tbl = table._tbl
+        cell_prefixes = [
+            f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{grid_col.w.twips}"/></w:tcPr><w:p>'
+            for grid_col in tbl.tblGrid.gridCol_lst
+        ]
+
+        chunk = [self._table_row_xml(header, cell_prefixes, header=True)]
+        row_number = 1
+        while True:
+            for row_data in islice(rows, TABLE_CHUNK_ROWS - len(chunk)):
+                row_number += 1
+                chunk.append(self._table_row_xml(row_data, cell_prefixes, row_number=row_number))
+            if not chunk:
+                break
+            tbl.extend(list(parse_xml(f'<w:tbl {nsdecls("w")}>{"".join(chunk)}</w:tbl>')))
+            chunk = []
+            # 巨大な表でも行の区切りで打ち切れるようにする
+            if cancel_token is not None and cancel_token.cancelled:
+                break
+
+    def _table_row_xml(self, row_data: Iterable[Any], cell_prefixes: List[str],
+                       header: bool = False, row_number: int = 1) -> str:
+        """表の1行のXML（列が足りない行は空のセルで埋める）"""
+        values = [str(cell_data) for cell_data in row_data]
+        if len(values) > len(cell_prefixes):
+            raise ValueError(f"表の{row_number}行目の列数（{len(values)}）が見出しの列数（{len(cell_prefixes)}）より多くなっています")
+
+        parts = ['<w:tr><w:trPr><w:tblHeader/></w:trPr>' if header else '<w:tr>']
+        for prefix, value in zip(cell_prefixes, values):
+            parts.append(prefix)
+            parts.append(_run_xml(value))
+            parts.append('</w:p></w:tc>')
+        for prefix in cell_prefixes[len(values):]:
+            parts.append(prefix)
+            parts.append('</w:p></w:tc>')
+        parts.append('</w:tr>')
+        return "".join(parts)
 
     def _format_content(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """コンテンツのフォーマット提案"""
@@ -8,18 +8,29 @@ Presentation Builder Worker - プレゼン資料作成ワーカー
 
 import json
 import os
+from contextlib import nullcontext
 from typing import Dict, List, Any, Optional
 
-# python-pptxが利用可能かチェック
-try:
-    from pptx import Presentation
-    from pptx.util import Inches, Pt
-    from pptx.enum.text import PP_ALIGN
-    PPTX_AVAILABLE = True
-except ImportError:
-    PPTX_AVAILABLE = False
-    print("⚠️  python-pptx がインストールされていません")
-    print("   インストール: pip install python-pptx")
+# python-pptxは重いため、初めてPPTXを生成するときにインポートする
+PPTX_AVAILABLE = None
+
+
+def _import_pptx() -> bool:
+    """python-pptxを遅延インポート（利用可能かを返す）"""
+    global PPTX_AVAILABLE, Presentation, Inches, Pt, PP_ALIGN
+
+    if PPTX_AVAILABLE is None:
+        try:
+            from pptx import Presentation
+            from pptx.util import Inches, Pt
+            from pptx.enum.text import PP_ALIGN
+            PPTX_AVAILABLE = True
+        except ImportError:
+            PPTX_AVAILABLE = False
+            print("⚠️  python-pptx がインストールされていません")
+            print("   インストール: pip install python-pptx")
+
+    return PPTX_AVAILABLE
 
 
 class PresentationBuilderWorker:
@@ -29,8 +40,16 @@ class PresentationBuilderWorker:
         """初期化"""
         self.name = "presentation_builder"
         self.description = "PPTX資料の作成を担当"
+        self.version = "1.0.0"
         self.skills = ["presentation-design", "visual-design", "storytelling"]
         self.layouts = self._load_layouts()
+        self.tracer = None  # オーケストレーターのトレーサー（有効時に設定される）
+
+    def _span(self, stage: str, **args):
+        """トレーサーが設定されていれば処理段階をスパンとして記録"""
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span(f"{self.name}.{stage}", category="worker", **args)
 
     def _load_layouts(self) -> Dict[str, Any]:
         """レイアウトパターンをロード"""
@@ -80,8 +99,8 @@ class PresentationBuilderWorker:
         except FileNotFoundError:
             return default_layouts
 
-    def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """タスクを実行"""
+    def execute(self, task: Dict[str, Any], cancel_token: Any = None) -> Dict[str, Any]:
+        """タスクを実行（cancel_token が立つとPPTX生成をスライドの区切りで打ち切る）"""
         print(f"\n[*] {self.name}: タスクを実行中...")
         print(f"   タスク: {task.get('description', 'N/A')}")
 
@@ -89,7 +108,7 @@ class PresentationBuilderWorker:
         task_type = task.get("type", "create_presentation")
 
         if task_type == "create_presentation":
-            return self._create_presentation(task)
+            return self._create_presentation(task, cancel_token)
         elif task_type == "suggest_structure":
             return self._suggest_structure(task)
         elif task_type == "generate_slide":
@@ -190,9 +209,11 @@ class PresentationBuilderWorker:
         print(f"   [+] スライド構成を提案しました（{len(structure)}枚）")
         return result
 
-    def _create_presentation(self, task: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_presentation(self, task: Dict[str, Any], cancel_token: Any = None) -> Dict[str, Any]:
         """PPTXファイルを作成"""
-        if not PPTX_AVAILABLE:
+        with self._span("import_pptx"):
+            pptx_available = _import_pptx()
+        if not pptx_available:
             return {
                 "status": "error",
                 "worker": self.name,
@@ -204,17 +225,33 @@ class PresentationBuilderWorker:
         slides_content = task.get("slides", [])
         output_path = task.get("output_path", f"{topic}.pptx")
 
+        # 前段で構成案が作られていれば、そのセクションをスライドにする
+        outline = self._outline_from_inputs(task)
+        if outline is not None:
+            slides_content = self._slides_from_outline(outline, topic)
+
         try:
-            prs = Presentation()
-            prs.slide_width = Inches(10)
-            prs.slide_height = Inches(7.5)
+            with self._span("new_presentation"):
+                prs = Presentation()
+                prs.slide_width = Inches(10)
+                prs.slide_height = Inches(7.5)
 
             # スライドを追加
-            for slide_data in slides_content:
-                self._add_slide(prs, slide_data)
+            with self._span("slides", count=len(slides_content)):
+                for index, slide_data in enumerate(slides_content):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        print(f"   [!] PPTX作成をキャンセルしました（{index}/{len(slides_content)}枚）")
+                        return {
+                            "status": "cancelled",
+                            "worker": self.name,
+                            "error": f"キャンセルされました（{index}/{len(slides_content)}枚完了）"
+                        }
+                    with self._span("_add_slide", index=index, layout=slide_data.get("layout", "content")):
+                        self._add_slide(prs, slide_data)
 
             # 保存
-            prs.save(output_path)
+            with self._span("save", path=output_path):
+                prs.save(output_path)
 
             result = {
                 "status": "success",
@@ -240,6 +277,25 @@ class PresentationBuilderWorker:
                 "error": str(e)
             }
 
+    def _outline_from_inputs(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """前段ステップの出力から構成案（sections を持つ出力）を取り出す"""
+        for worker_output in task.get("inputs", {}).values():
+            output = (worker_output or {}).get("output")
+            if isinstance(output, dict) and isinstance(output.get("sections"), list):
+                return output
+        return None
+
+    def _slides_from_outline(self, outline: Dict[str, Any], topic: str) -> List[Dict[str, Any]]:
+        """構成案からスライドを作る（表紙 + セクションごとに1枚）"""
+        slides = [{"layout": "title", "title": outline.get("topic") or topic,
+                   "subtitle": outline.get("template_name", "")}]
+        for section in outline["sections"]:
+            if section.get("type") in ("cover", "toc"):
+                continue
+            slides.append({"layout": "content", "title": section["title"],
+                           "content": f"{section['title']}の要点"})
+        return slides
+
     def _add_slide(self, prs: Any, slide_data: Dict[str, Any]):
         """スライドを追加"""
         layout_type = slide_data.get("layout", "content")